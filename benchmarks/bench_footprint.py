@@ -0,0 +1,97 @@
+"""Measure memory per candle of Candle/Ohlc against the old dict based classes.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_footprint
+"""
+
+import json
+import tracemalloc
+from time import perf_counter
+
+from forex_types import FracPips, Price
+from time_int import TimeInt
+
+from oanda_candles.candle import Candle
+
+from .bench_parse import make_body
+
+
+class LegacyOhlc:
+    """Ohlc as it was before __slots__: four eagerly built Price objects."""
+
+    def __init__(self, o: Price, h: Price, l: Price, c: Price):
+        self.o = o
+        self.h = h
+        self.l = l
+        self.c = c
+
+    @property
+    def l_fp(self) -> FracPips:
+        return FracPips.from_price(self.l)
+
+    @classmethod
+    def from_oanda(cls, data: dict) -> "LegacyOhlc":
+        return cls(
+            Price(data["o"]), Price(data["h"]), Price(data["l"]), Price(data["c"])
+        )
+
+
+class LegacyCandle:
+    """Candle as it was before __slots__."""
+
+    def __init__(self, ask, bid, mid, time: TimeInt, complete: bool):
+        self.ask = ask
+        self.bid = bid
+        self.mid = mid
+        self.time = time
+        self.complete = complete
+
+    @property
+    def low_fp(self) -> FracPips:
+        return self.bid.l_fp
+
+    @classmethod
+    def from_oanda(cls, data: dict) -> "LegacyCandle":
+        return cls(
+            LegacyOhlc.from_oanda(data["ask"]),
+            LegacyOhlc.from_oanda(data["bid"]),
+            LegacyOhlc.from_oanda(data["mid"]),
+            TimeInt.from_float_string(data["time"]),
+            data["complete"],
+        )
+
+
+def footprint(candle_class, data: list) -> float:
+    """Bytes allocated per candle to keep a list of candles built from data."""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    candles = [candle_class.from_oanda(_) for _ in data]
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    assert len(candles) == len(data)
+    return (after - before) / len(data)
+
+
+def low_fp_seconds(candles: list) -> float:
+    start = perf_counter()
+    for candle in candles:
+        candle.low_fp
+    return perf_counter() - start
+
+
+def main(count: int = 5000):
+    data = json.loads(make_body(count))["candles"]
+    legacy = footprint(LegacyCandle, data)
+    compact = footprint(Candle, data)
+    print(f"{count} candles")
+    print(f"{'legacy dict based':20} {legacy:9.0f} bytes/candle")
+    print(f"{'__slots__':20} {compact:9.0f} bytes/candle {legacy / compact:6.1f}x")
+    legacy_candles = [LegacyCandle.from_oanda(_) for _ in data]
+    candles = [Candle.from_oanda(_) for _ in data]
+    print(f"{'legacy low_fp':20} {low_fp_seconds(legacy_candles) * 1000:9.2f} ms")
+    print(f"{'__slots__ low_fp':20} {low_fp_seconds(candles) * 1000:9.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compare per-candle parsing of candle responses with bulk parsing.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_parse
+"""
+
+import json
+from time import perf_counter
+
+from forex_types import Pair
+
+from oanda_candles.candle import Candle
+from oanda_candles.candle_parser import iter_frames, loads, parse_candles, parse_frame
+
+START = 1_590_000_000
+
+
+def make_body(count: int, pair: Pair = Pair.EUR_USD) -> bytes:
+    """Make V20 style candle response body with count BAM candles."""
+    places = len(str(pair.quote.fpu)) - 1
+    base = 1.1 if places == 5 else 108.0
+
+    def price(value: float) -> str:
+        return f"{value:.{places}f}"
+
+    candles = []
+    for ndx in range(count):
+        mid = base + (ndx % 100) * 0.0001
+        candles.append(
+            {
+                "complete": ndx < count - 1,
+                "volume": 100 + ndx % 50,
+                "time": f"{START + 60 * ndx}.000000000",
+                "bid": {
+                    "o": price(mid - 0.0001),
+                    "h": price(mid + 0.0004),
+                    "l": price(mid - 0.0006),
+                    "c": price(mid),
+                },
+                "mid": {
+                    "o": price(mid),
+                    "h": price(mid + 0.0005),
+                    "l": price(mid - 0.0005),
+                    "c": price(mid + 0.0001),
+                },
+                "ask": {
+                    "o": price(mid + 0.0001),
+                    "h": price(mid + 0.0006),
+                    "l": price(mid - 0.0004),
+                    "c": price(mid + 0.0002),
+                },
+            }
+        )
+    body = {"instrument": str(pair), "granularity": "M1", "candles": candles}
+    return json.dumps(body).encode()
+
+
+def per_candle(body: bytes):
+    """json decode then Candle.from_oanda per candle."""
+    return [Candle.from_oanda(_) for _ in json.loads(body)["candles"]]
+
+
+def streamed(body: bytes, size: int = 1 << 16):
+    """iter_frames over body split into chunks as a streamed response is."""
+    chunks = (body[_ : _ + size] for _ in range(0, len(body), size))
+    return list(iter_frames(chunks, Pair.EUR_USD))
+
+
+def best_of(repeat: int, func, *args) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        func(*args)
+        best = min(best, perf_counter() - start)
+    return best
+
+
+def main(count: int = 5000, repeat: int = 5):
+    body = make_body(count)
+    print(f"{count} candles, {len(body)} bytes, decoder: {loads.__module__}")
+    results = [
+        ("per candle (json + Candle.from_oanda)", best_of(repeat, per_candle, body)),
+        ("parse_candles", best_of(repeat, parse_candles, body)),
+        ("parse_frame", best_of(repeat, parse_frame, body, Pair.EUR_USD)),
+        ("iter_frames (64 KiB chunks)", best_of(repeat, streamed, body)),
+    ]
+    baseline = results[0][1]
+    for name, seconds in results:
+        print(f"{name:40} {seconds * 1000:9.2f} ms {baseline / seconds:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
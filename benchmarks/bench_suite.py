@@ -0,0 +1,153 @@
+"""Benchmark grab scenarios end to end against a local mock V20 server.
+
+For each scenario, with list and with columnar caches, reports the number
+of requests issued and bytes received, wall time, time spent waiting on
+and parsing responses (from a CandleStats observer), and peak memory
+allocated (measured on a separate run, as tracing slows it down).
+The server runs in a child process so its work is not counted.
+
+Run from the repository root with:
+
+    python -m benchmarks.bench_suite
+"""
+
+import multiprocessing
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+from time import monotonic, perf_counter
+from typing import Callable, Dict, NamedTuple
+
+from forex_types import Pair
+
+from oanda_candles import CandleClient, CandleStats, Gran
+
+from tests.mock_v20 import MockV20Server
+
+# Wednesday 2020-09-16 12:00 UTC.
+NOW = 1_600_257_600
+PAIRS = [
+    Pair.EUR_USD,
+    Pair.GBP_USD,
+    Pair.USD_JPY,
+    Pair.AUD_USD,
+    Pair.USD_CAD,
+    Pair.USD_CHF,
+    Pair.NZD_USD,
+    Pair.EUR_JPY,
+]
+
+
+class Scenario(NamedTuple):
+    name: str
+    setup: Callable[[CandleClient], None]
+    run: Callable[[CandleClient], None]
+    options: Dict = {}
+
+
+class Result(NamedTuple):
+    stats: CandleStats
+    seconds: float
+    peak_bytes: int = 0
+
+
+def make_stale(client: CandleClient):
+    """Make all collectors due for a refresh, by grab and by scheduler."""
+    for collector in client.collectors():
+        stale = max(collector.LONG_ENOUGH, collector.gran.freshness) + 1
+        collector.last_update = monotonic() - stale
+
+
+def cold_setup(client: CandleClient):
+    pass
+
+
+def cold_run(client: CandleClient):
+    client.grab(Pair.EUR_USD, Gran.M5, 2000)
+
+
+def warm_setup(client: CandleClient):
+    client.grab(Pair.EUR_USD, Gran.M5, 2000)
+    make_stale(client)
+
+
+def deep_run(client: CandleClient):
+    client.grab_offset(Pair.EUR_USD, Gran.M1, 20000, 500)
+
+
+def multi_setup(client: CandleClient):
+    for pair in PAIRS:
+        client.grab(pair, Gran.M5, 500)
+    make_stale(client)
+
+
+def multi_run(client: CandleClient):
+    with ThreadPoolExecutor(max_workers=client.scheduler.workers) as pool:
+        client.scheduler.run_pending(pool)
+
+
+SCENARIOS = [
+    Scenario("cold grab 2000 M5", cold_setup, cold_run),
+    Scenario("warm grab 2000 M5", warm_setup, cold_run),
+    Scenario("deep grab_offset 20000 M1", cold_setup, deep_run),
+    Scenario(
+        "deep grab_offset, 4 workers", cold_setup, deep_run, {"backfill_workers": 4}
+    ),
+    Scenario("refresh 8 pairs M5", multi_setup, multi_run),
+]
+
+
+def serve(now: int, urls):
+    server = MockV20Server(now).start()
+    urls.put(server.url)
+    Event().wait()
+
+
+def measure(url: str, scenario: Scenario, columnar: bool, trace: bool) -> Result:
+    stats = CandleStats()
+    client = CandleClient(
+        "token", columnar=columnar, root_url=url, observer=stats, **scenario.options
+    )
+    scenario.setup(client)
+    stats.reset()
+    if trace:
+        tracemalloc.start()
+    start = perf_counter()
+    scenario.run(client)
+    seconds = perf_counter() - start
+    peak = 0
+    if trace:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    client.session.close()
+    return Result(stats, seconds, peak)
+
+
+def main():
+    urls = multiprocessing.Queue()
+    process = multiprocessing.Process(target=serve, args=(NOW, urls), daemon=True)
+    process.start()
+    url = urls.get()
+    try:
+        print(
+            f"{'scenario':30} {'cache':8} {'requests':>8} {'KiB':>7} "
+            f"{'wall ms':>9} {'net ms':>9} {'parse ms':>9} {'peak KiB':>9}"
+        )
+        for scenario in SCENARIOS:
+            for columnar in (False, True):
+                result = measure(url, scenario, columnar, trace=False)
+                peak = measure(url, scenario, columnar, trace=True).peak_bytes
+                stats = result.stats
+                print(
+                    f"{scenario.name:30} {'columnar' if columnar else 'list':8} "
+                    f"{stats.requests:8d} {stats.bytes / 1024:7.0f} "
+                    f"{result.seconds * 1000:9.1f} "
+                    f"{stats.request_seconds * 1000:9.1f} "
+                    f"{stats.parse_seconds * 1000:9.1f} {peak / 1024:9.0f}"
+                )
+    finally:
+        process.terminate()
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,27 @@ __version__ = "0.1.0"
 from forex_types import Pair, Price, FracPips
 from time_int import TimeInt
 
+from .async_candle_client import AsyncCandleClient
 from .candle import Candle, PriceKind
+from .candle_batch import CandleBatch
+from .candle_budget import CandleBudget
 from .candle_client import CandleClient
 from .candle_collector import CandleCollector
 from .candle_meister import CandleMeister
+from .candle_indicators import Atr, Bollinger, Ema, Indicator, Sma
+from .candle_observer import CandleObserver, CandleStats
+from .candle_panel import CandlePanel
+from .candle_resample import ResampledCollector
+from .candle_replay import ReplayClient, ReplayClock, ReplayCollector
+
+try:
+    from .candle_shared import SharedCandlePublisher, SharedCandleReader
+except ImportError:  # pragma: no cover - multiprocessing.shared_memory is 3.8+
+    pass
+from .candle_store import CandleFrame, CandleStore
 from .gran import Gran, GRAN_DICT, GRAN_SET, GRAN_TUPLE
 from .gran_unit import GranUnit
+from .market_calendar import FOREX_CALENDAR, MarketCalendar
 from .ohlc import Ohlc
+from .price_streamer import PriceStreamer
 from .quote_kind import QuoteKind
@@ -0,0 +1,135 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from requests.adapters import HTTPAdapter
+
+from forex_types import Pair
+
+from oanda_candles.candle import Candle
+from oanda_candles.gran import Gran
+
+from .candle_client import CandleClient
+from .candle_collector import CandleCollector
+from .candle_observer import CandleObserver
+from .market_calendar import MarketCalendar
+
+
+class AsyncCandleClient:
+    """Asyncio wrapper running a CandleClient's grabs on a thread pool.
+
+    This is not non-blocking I/O: each grab is the blocking CandleClient
+    one, run with run_in_executor on a pool of max_concurrency worker
+    threads. The threads share one session whose connection pool is sized
+    to match, so up to max_concurrency requests are in flight over
+    kept-alive connections, and the event loop is free while they are.
+    Calls for the same pair and gran are run one at a time so they do not
+    step on each other's cache.
+    """
+
+    def __init__(
+        self,
+        token: str,
+        real: bool = False,
+        max_concurrency: int = 8,
+        columnar: bool = False,
+        cache_dir: Optional[str] = None,
+        backfill_workers: int = 1,
+        max_candles: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        root_url: Optional[str] = None,
+        observer: Optional[CandleObserver] = None,
+        calendar: Optional[MarketCalendar] = None,
+        resample: Optional[Dict[Gran, Gran]] = None,
+        read_ahead: int = 0,
+    ):
+        """Initialize client.
+
+        Args:
+            token: Oanda access token.
+            real: True for real account, False for practice/demo account.
+            max_concurrency: maximum number of requests in flight at once.
+            columnar: passed along to the underlying CandleClient.
+            cache_dir: passed along to the underlying CandleClient.
+            backfill_workers: passed along to the underlying CandleClient.
+            max_candles: passed along to the underlying CandleClient.
+            max_bytes: passed along to the underlying CandleClient.
+            root_url: passed along to the underlying CandleClient.
+            observer: passed along to the underlying CandleClient.
+            calendar: passed along to the underlying CandleClient.
+            resample: passed along to the underlying CandleClient.
+            read_ahead: passed along to the underlying CandleClient.
+        """
+        self.client = CandleClient(
+            token,
+            real,
+            columnar=columnar,
+            cache_dir=cache_dir,
+            backfill_workers=backfill_workers,
+            max_candles=max_candles,
+            max_bytes=max_bytes,
+            root_url=root_url,
+            observer=observer,
+            calendar=calendar,
+            resample=resample,
+            read_ahead=read_ahead,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+        self.client.session.mount("https://", adapter)
+        self.client.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_concurrency)
+        self.__locks: Dict[Tuple[Pair, Gran], asyncio.Lock] = {}
+
+    async def __aenter__(self) -> "AsyncCandleClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """Shut down worker threads and close the session."""
+        self.executor.shutdown(wait=True)
+        self.client.session.close()
+
+    def get_collector(
+        self, pair: Pair, gran: Gran, kinds: Optional[Iterable] = None
+    ) -> CandleCollector:
+        """Get collector for pair and gran (see CandleClient.get_collector).
+
+        This blocks while an existing collector is upgraded to more kinds.
+        """
+        return self.client.get_collector(pair, gran, kinds)
+
+    async def grab(self, pair: Pair, gran: Gran, count: int) -> Sequence[Candle]:
+        return await self._run(pair, gran, "grab", count)
+
+    async def grab_offset(
+        self, pair: Pair, gran: Gran, offset: int, count: int
+    ) -> Sequence[Candle]:
+        return await self._run(pair, gran, "grab_offset", offset, count)
+
+    async def grab_many(
+        self, specs: Iterable[Tuple[Pair, Gran, int]]
+    ) -> List[Sequence[Candle]]:
+        """Grab candles for many pair/gran combinations concurrently.
+
+        Args:
+            specs: (pair, gran, count) tuples, like the args to grab.
+        Returns:
+            list of grab results in the same order as specs.
+        """
+        return list(await asyncio.gather(*(self.grab(*_) for _ in specs)))
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    async def _run(self, pair: Pair, gran: Gran, method: str, *args):
+        collector = self.get_collector(pair, gran)
+        key = (pair, gran)
+        if key not in self.__locks:
+            self.__locks[key] = asyncio.Lock()
+        async with self.__locks[key]:
+            loop = asyncio.get_running_loop()
+            func = getattr(collector, method)
+            return await loop.run_in_executor(self.executor, func, *args)
@@ -1,6 +1,6 @@
 from datetime import datetime
 from time import struct_time
-from typing import Tuple
+from typing import Iterable, Optional, Tuple
 
 from forex_types import FracPips, Price
 from magic_kind import MagicKind
@@ -16,8 +16,49 @@ class PriceKind(MagicKind):
     MID: str = "mid"
 
 
+# All the price kinds, in the order used throughout this package.
+PRICE_KINDS: Tuple[str, ...] = (PriceKind.ASK, PriceKind.BID, PriceKind.MID)
+
+# Letters for each price kind in the "price" parameter of V20 candle queries.
+OANDA_LETTERS = {PriceKind.BID: "B", PriceKind.ASK: "A", PriceKind.MID: "M"}
+
+
+def to_price_kinds(kinds: Optional[Iterable] = None) -> Tuple[str, ...]:
+    """Normalize price kinds given as PriceKind or QuoteKind values.
+
+    Args:
+        kinds: iterable of price kinds, None for all of them.
+    Returns:
+        Tuple of distinct PriceKind values in PRICE_KINDS order.
+    Raises:
+        ValueError: if a kind is not recognized or none are given.
+    """
+    if kinds is None:
+        return PRICE_KINDS
+    names = {str(_).lower() for _ in kinds}
+    unknown = names.difference(PRICE_KINDS)
+    if unknown or not names:
+        raise ValueError(f"Expected some of {PRICE_KINDS} but got {sorted(names)}")
+    return tuple(_ for _ in PRICE_KINDS if _ in names)
+
+
+def oanda_price(kinds: Iterable[str]) -> str:
+    """Get V20 "price" query parameter for price kinds (e.g. "BAM")."""
+    return "".join(v for k, v in OANDA_LETTERS.items() if k in kinds)
+
+
 class Candle:
-    def __init__(self, ask: Ohlc, bid: Ohlc, mid: Ohlc, time: TimeInt, complete: bool):
+    __slots__ = ("ask", "bid", "mid", "time", "complete")
+
+    def __init__(
+        self,
+        ask: Optional[Ohlc],
+        bid: Optional[Ohlc],
+        mid: Optional[Ohlc],
+        time: TimeInt,
+        complete: bool,
+    ):
+        """Initialize candle, sides that were not requested can be None."""
         self.ask = ask
         self.bid = bid
         self.mid = mid
@@ -31,20 +72,26 @@ class Candle:
         Args:
             data: dictionary from candle query with candle specific data.
         """
+        ask, bid, mid = (data.get(_) for _ in PRICE_KINDS)
         return Candle(
-            Ohlc.from_oanda(data["ask"]),
-            Ohlc.from_oanda(data["bid"]),
-            Ohlc.from_oanda(data["mid"]),
+            None if ask is None else Ohlc.from_oanda(ask),
+            None if bid is None else Ohlc.from_oanda(bid),
+            None if mid is None else Ohlc.from_oanda(mid),
             TimeInt.from_float_string(data["time"]),
             data["complete"],
         )
 
+    @property
+    def kinds(self) -> Tuple[str, ...]:
+        """Price kinds this candle has (those that are not None)."""
+        return tuple(_ for _ in PRICE_KINDS if getattr(self, _) is not None)
+
     def to_tuple(self) -> Tuple[Tuple, Tuple, Tuple, int, bool]:
         """Get tuple that can be used in json serialization of Candle."""
         return (
-            self.ask.to_tuple(),
-            self.bid.to_tuple(),
-            self.mid.to_tuple(),
+            None if self.ask is None else self.ask.to_tuple(),
+            None if self.bid is None else self.bid.to_tuple(),
+            None if self.mid is None else self.mid.to_tuple(),
             int(self.time),
             self.complete,
         )
@@ -53,14 +100,14 @@ class Candle:
     def from_tuple(cls, data: Tuple[Tuple, Tuple, Tuple, int, bool]) -> "Candle":
         """Create Candle object from tuple like one created by to_tuple method."""
         return cls(
-            Ohlc.from_tuple(data[0]),
-            Ohlc.from_tuple(data[1]),
-            Ohlc.from_tuple(data[2]),
+            None if data[0] is None else Ohlc.from_tuple(data[0]),
+            None if data[1] is None else Ohlc.from_tuple(data[1]),
+            None if data[2] is None else Ohlc.from_tuple(data[2]),
             TimeInt(data[3]),
             data[4],
         )
 
-    def quote(self, kind: QuoteKind):
+    def quote(self, kind: QuoteKind) -> Optional[Ohlc]:
         if kind == QuoteKind.ASK:
             return self.ask
         elif kind == QuoteKind.BID:
@@ -90,23 +137,23 @@ class Candle:
 
     @property
     def high(self) -> Price:
-        """highest ask price."""
-        return self.ask.h
+        """highest ask price (or mid, then bid, if no ask)."""
+        return (self.ask or self.mid or self.bid).h
 
     @property
     def low(self) -> Price:
-        """lowest bid price."""
-        return self.bid.l
+        """lowest bid price (or mid, then ask, if no bid)."""
+        return (self.bid or self.mid or self.ask).l
 
     @property
     def high_fp(self) -> FracPips:
-        """highest ask price as fraction pips"""
-        return self.ask.h_fp
+        """highest ask price as fraction pips (or mid, then bid, if no ask)"""
+        return (self.ask or self.mid or self.bid).h_fp
 
     @property
     def low_fp(self) -> FracPips:
-        """lowest bid price as fractional pips"""
-        return self.bid.l_fp
+        """lowest bid price as fractional pips (or mid, then ask, if no bid)"""
+        return (self.bid or self.mid or self.ask).l_fp
 
     @property
     def time_dt(self) -> datetime:
@@ -0,0 +1,191 @@
+import mmap
+import os
+from array import array
+from struct import Struct
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+from forex_types import Pair
+
+from oanda_candles.candle import Candle, PRICE_KINDS, oanda_price
+from oanda_candles.gran import Gran
+
+from .candle_store import (
+    CandleFrame,
+    ColumnKey,
+    FLAG_TYPE,
+    PRICE_TYPE,
+    TIME_TYPE,
+    kind_columns,
+)
+
+
+class CandleArchive:
+    """Directory of append-only files of completed candles.
+
+    There is one file per pair, gran, and set of price kinds. Each file is
+    a short magic header followed by fixed width records of the candle time
+    and four fractional pip prices per kind (ask, bid, then mid, each as
+    open, high, low, close). Only complete candles are written, so the
+    records never change once written and new ones are just appended.
+    """
+
+    MAGIC = b"OACNDL01"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        # Span of time between the last candle stored and the first of the
+        # candles given to save, for each path save skipped for the gap.
+        self.gaps: Dict[str, Tuple[int, int]] = {}
+
+    def path(self, pair: Pair, gran: Gran, kinds: Iterable[str] = PRICE_KINDS) -> str:
+        """Get path of the file for pair, gran, and price kinds."""
+        name = f"{pair}_{gran}_{oanda_price(kinds)}.candles"
+        return os.path.join(self.directory, name)
+
+    def load(
+        self, pair: Pair, gran: Gran, kinds: Iterable[str] = PRICE_KINDS
+    ) -> CandleFrame:
+        """Read all the candles stored for pair and gran.
+
+        The file is memory mapped and decoded straight into columns. A
+        partial record at the end (from an interrupted write) is ignored.
+
+        Returns:
+            CandleFrame of the stored candles, empty if there are none.
+        """
+        columns = kind_columns(kinds)
+        record = self._record(columns)
+        rows = []
+        path = self.path(pair, gran, kinds)
+        if self._size(path) > len(self.MAGIC):
+            with open(path, "rb") as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    if data[: len(self.MAGIC)] != self.MAGIC:
+                        raise ValueError(f"Not a candle archive file: {path}")
+                    end = self._aligned(len(data), record)
+                    with memoryview(data)[len(self.MAGIC) : end] as view:
+                        rows = list(zip(*record.iter_unpack(view)))
+        if not rows:
+            rows = [()] * (len(columns) + 1)
+        times = array(TIME_TYPE, rows[0])
+        flags = array(FLAG_TYPE, b"\x01" * len(times))
+        prices = {col: array(PRICE_TYPE, rows[1 + n]) for n, col in enumerate(columns)}
+        return CandleFrame.from_arrays(pair, times, flags, prices)
+
+    def save(
+        self,
+        pair: Pair,
+        gran: Gran,
+        candles: Sequence[Candle],
+        kinds: Iterable[str] = PRICE_KINDS,
+    ) -> int:
+        """Store the complete candles of a contiguous cache of candles.
+
+        Candles newer than the last one stored are appended. If the candles
+        start before the stored ones (history was prepended) and reach the
+        last one stored, the file is rewritten instead. The file never ends
+        up with a shorter history: if the candles start after the last one
+        stored (e.g. the cache was trimmed before it was saved) nothing is
+        written and the gap is noted in gaps, until save is given candles
+        reaching back to the stored ones again.
+
+        Args:
+            pair: pair of the candles.
+            gran: granularity of the candles.
+            candles: cache of candles in time order, last may be incomplete.
+            kinds: price kinds to store, the candles must have these.
+        Returns:
+            Number of candles written.
+        """
+        complete = len(candles)
+        if complete and not candles[-1].complete:
+            complete -= 1
+        if complete <= 0:
+            return 0
+        columns = kind_columns(kinds)
+        record = self._record(columns)
+        path = self.path(pair, gran, kinds)
+        bounds = self._bounds(path, record)
+        if bounds is not None and candles[0].time > bounds[1]:
+            self.gaps[path] = (bounds[1], candles[0].time)
+            return 0
+        self.gaps.pop(path, None)
+        if bounds is None or candles[0].time < bounds[0]:
+            if bounds is not None and candles[complete - 1].time < bounds[1]:
+                # Rewriting would drop the newest candles stored.
+                return 0
+            self._rewrite(path, record, columns, candles[:complete])
+            return complete
+        start = complete
+        while start > 0 and candles[start - 1].time > bounds[1]:
+            start -= 1
+        if start < complete:
+            with open(path, "r+b") as file:
+                file.truncate(self._aligned(self._size(path), record))
+                file.seek(0, os.SEEK_END)
+                file.write(self._pack(record, columns, candles[start:complete]))
+        return complete - start
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    @staticmethod
+    def _size(path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+
+    @staticmethod
+    def _record(columns: Tuple[ColumnKey, ...]) -> Struct:
+        return Struct(f"<q{len(columns)}i")
+
+    def _aligned(self, size: int, record: Struct) -> int:
+        """Round file size down to end of last whole record."""
+        header = len(self.MAGIC)
+        return header + (size - header) // record.size * record.size
+
+    def _bounds(self, path: str, record: Struct) -> Optional[Tuple[int, int]]:
+        """Get times of first and last candles in file (None if it has none)."""
+        end = self._aligned(self._size(path), record)
+        if end <= len(self.MAGIC):
+            return None
+        with open(path, "rb") as file:
+            file.seek(len(self.MAGIC))
+            first = record.unpack(file.read(record.size))[0]
+            file.seek(end - record.size)
+            last = record.unpack(file.read(record.size))[0]
+        return first, last
+
+    def _rewrite(
+        self,
+        path: str,
+        record: Struct,
+        columns: Tuple[ColumnKey, ...],
+        candles: Sequence[Candle],
+    ):
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(self.MAGIC)
+            file.write(self._pack(record, columns, candles))
+        os.replace(temp_path, path)
+
+    def _pack(
+        self, record: Struct, columns: Tuple[ColumnKey, ...], candles: Sequence[Candle]
+    ) -> bytes:
+        pack = record.pack
+        return b"".join(pack(*row) for row in self._rows(columns, candles))
+
+    @staticmethod
+    def _rows(
+        columns: Tuple[ColumnKey, ...], candles: Sequence[Candle]
+    ) -> Iterable[Tuple[int, ...]]:
+        if isinstance(candles, CandleFrame):
+            return zip(candles.times, *(candles.prices[col] for col in columns))
+        kinds = tuple(kind for kind, field in columns if field == "o")
+        return (
+            (candle.time, *(_ for k in kinds for _ in getattr(candle, k).to_fp()))
+            for candle in candles
+        )
@@ -0,0 +1,181 @@
+"""Packed binary serialization of batches of candles.
+
+A batch is a fixed size header (magic, pair, gran, price kinds, and
+candle count) followed by columnar blocks: the times as int64, complete
+flags as uint8, then one int32 block of fractional pips per price column
+(open, high, low, close of each price kind in ask, bid, mid order). All
+numbers are little endian. Candles round trip exactly, as prices are the
+fractional pips they were built from.
+
+Batches can also be exported to Arrow tables (and Parquet files) when
+pyarrow is installed (pip install oanda-candles[arrow]).
+"""
+
+import sys
+from array import array
+from struct import Struct
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+from forex_types import Pair
+
+from oanda_candles.candle import (
+    Candle,
+    OANDA_LETTERS,
+    oanda_price,
+    to_price_kinds,
+)
+from oanda_candles.gran import Gran, GRAN_DICT
+
+from .candle_store import (
+    CandleFrame,
+    FLAG_TYPE,
+    PRICE_TYPE,
+    TIME_TYPE,
+    kind_columns,
+    to_frame,
+)
+
+try:
+    import pyarrow
+except ImportError:  # pragma: no cover - depends on environment
+    pyarrow = None
+
+MAGIC = b"OACBAT01"
+# Magic, pair (e.g. EUR_USD), gran (e.g. M15), price letters (e.g. BAM),
+# and candle count.
+HEADER = Struct("<8s7s4s3sQ")
+KIND_OF_LETTER = {letter: kind for kind, letter in OANDA_LETTERS.items()}
+
+
+class CandleBatch(NamedTuple):
+    """Candles loaded from a batch, with the pair and gran they are for."""
+
+    pair: Pair
+    gran: Gran
+    candles: CandleFrame
+
+
+def dump(
+    candles: Sequence[Candle],
+    pair: Pair,
+    gran: Gran,
+    kinds: Optional[Iterable[str]] = None,
+) -> bytes:
+    """Pack candles into a batch.
+
+    Args:
+        candles: list of candles, CandleStore, or CandleFrame.
+        pair: pair of the candles.
+        gran: granularity of the candles.
+        kinds: price kinds to pack, the candles must have these. None for
+            the kinds of a frame or store, or of the first candle of a list.
+    Returns:
+        bytes of the batch.
+    """
+    candles = to_frame(candles, pair, kinds)
+    kinds = candles.kinds
+    columns = kind_columns(kinds)
+    header = HEADER.pack(
+        MAGIC,
+        str(pair).encode(),
+        gran.oanda.encode(),
+        oanda_price(kinds).encode(),
+        len(candles),
+    )
+    blocks = [
+        _little(TIME_TYPE, candles.times),
+        _little(FLAG_TYPE, candles.flags),
+        *(_little(PRICE_TYPE, candles.prices[_]) for _ in columns),
+    ]
+    return b"".join([header, *blocks])
+
+
+def load(data: bytes) -> CandleBatch:
+    """Unpack a batch made by dump.
+
+    Args:
+        data: bytes (or other buffer) of the batch.
+    Returns:
+        CandleBatch of the pair, gran, and a CandleFrame of the candles.
+    """
+    view = memoryview(data).cast("B")
+    if len(view) < HEADER.size:
+        raise ValueError("Candle batch is too short for its header.")
+    magic, pair, gran, letters, count = HEADER.unpack(view[: HEADER.size])
+    if magic != MAGIC:
+        raise ValueError("Not a candle batch.")
+    pair = Pair(pair.decode())
+    gran = GRAN_DICT[gran.rstrip(b"\x00").decode()]
+    kinds = to_price_kinds(KIND_OF_LETTER[_] for _ in letters.rstrip(b"\x00").decode())
+    columns = kind_columns(kinds)
+    offset = HEADER.size
+    blocks = []
+    for typecode in [TIME_TYPE, FLAG_TYPE, *(PRICE_TYPE for _ in columns)]:
+        block = array(typecode)
+        end = offset + count * block.itemsize
+        if end > len(view):
+            raise ValueError("Candle batch is truncated.")
+        block.frombytes(view[offset:end])
+        if sys.byteorder == "big":
+            block.byteswap()
+        blocks.append(block)
+        offset = end
+    times, flags, *prices = blocks
+    frame = CandleFrame.from_arrays(pair, times, flags, dict(zip(columns, prices)))
+    return CandleBatch(pair, gran, frame)
+
+
+def to_arrow(candles: Sequence[Candle], pair: Pair, kinds: Optional[Iterable] = None):
+    """Make a pyarrow Table of candles (needs pyarrow).
+
+    The table has a time column (int64 epoch seconds), a complete column,
+    and a float64 column of prices for each price field of each kind, named
+    like "bid_o" and "mid_c".
+
+    Args:
+        candles: list of candles, CandleStore, or CandleFrame.
+        pair: pair of the candles.
+        kinds: price kinds to include, None as with dump.
+    """
+    if pyarrow is None:
+        raise ImportError(
+            "pyarrow is needed for Arrow export: pip install oanda-candles[arrow]"
+        )
+    frame = to_frame(candles, pair, kinds)
+    unit = float(pair.quote.rounder)
+    table = {
+        "time": pyarrow.array(frame.times.tolist(), pyarrow.int64()),
+        "complete": pyarrow.array([bool(_) for _ in frame.flags], pyarrow.bool_()),
+    }
+    for (kind, field), view in frame.prices.items():
+        table[f"{kind}_{field}"] = pyarrow.array(
+            [_ * unit for _ in view], pyarrow.float64()
+        )
+    return pyarrow.table(table)
+
+
+def write_parquet(
+    candles: Sequence[Candle],
+    pair: Pair,
+    path: str,
+    kinds: Optional[Iterable] = None,
+):
+    """Write candles to a Parquet file (needs pyarrow), see to_arrow."""
+    table = to_arrow(candles, pair, kinds)
+    import pyarrow.parquet
+
+    pyarrow.parquet.write_table(table, path)
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _little(typecode: str, view: memoryview) -> bytes:
+    """Get bytes of column in little endian order."""
+    if sys.byteorder == "little":
+        return view.tobytes()
+    column = array(typecode, view)
+    column.byteswap()
+    return column.tobytes()
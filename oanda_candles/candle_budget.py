@@ -0,0 +1,105 @@
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, List, Optional, Tuple
+
+
+class CandleBudget:
+    """Limit on the candles cached across the collectors of a client.
+
+    Collectors report to the budget each time they are grabbed from. Once
+    the collectors together hold more than the limit, the least recently
+    used ones are emptied, and if the one just used is over the limit on
+    its own its oldest candles are trimmed. Emptied and trimmed collectors
+    reset end_of_history, so their candles are requested again if grabbed.
+    """
+
+    def __init__(
+        self, max_candles: Optional[int] = None, max_bytes: Optional[int] = None
+    ):
+        """Initialize budget, None for no limit.
+
+        Args:
+            max_candles: most candles to cache across collectors.
+            max_bytes: most bytes (estimated by collector nbytes) to cache.
+        """
+        self.max_candles = max_candles
+        self.max_bytes = max_bytes
+        # Collectors by id, from least to most recently used.
+        self._collectors: "OrderedDict[int, Any]" = OrderedDict()
+        self._lock = Lock()
+
+    @property
+    def candles(self) -> int:
+        """Number of candles cached by the collectors."""
+        return sum(len(_) for _ in self._collectors.values())
+
+    @property
+    def nbytes(self) -> int:
+        """Estimated bytes cached by the collectors."""
+        return sum(_.nbytes for _ in self._collectors.values())
+
+    def over(self) -> bool:
+        """Check if the collectors hold more than the budget allows."""
+        return self._over(self.candles, self.nbytes)
+
+    def used(self, collector: Any):
+        """Mark collector as most recently used, then enforce the budget."""
+        with self._lock:
+            self._collectors.pop(id(collector), None)
+            self._collectors[id(collector)] = collector
+        self._enforce(collector)
+
+    def enforce(self):
+        """Empty (or trim) collectors until within the budget."""
+        self._enforce(None)
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    def _enforce(self, keep: Any):
+        """Empty (or trim) collectors until within the budget, except keep
+        is only trimmed once the others are empty.
+
+        The collectors are picked while holding the lock, and emptied after
+        letting go of it, as collectors tell the budget they were used while
+        holding locks of their own (e.g. a ResampledCollector grabbing from
+        its source), which emptying them takes.
+        """
+        with self._lock:
+            clear, room = self._pick(keep)
+        for collector in clear:
+            collector.clear()
+        if room is not None:
+            keep.trim(room)
+
+    def _pick(self, keep: Any) -> Tuple[List[Any], Optional[int]]:
+        """Get the collectors to empty, and how many candles keep can keep
+        (None if it need not be trimmed), to be within the budget."""
+        candles = {id(_): len(_) for _ in self._collectors.values()}
+        nbytes = {id(_): _.nbytes for _ in self._collectors.values()}
+        clear = []
+        for key, collector in self._collectors.items():
+            if not self._over(sum(candles.values()), sum(nbytes.values())):
+                return clear, None
+            if collector is not keep:
+                clear.append(collector)
+                candles[key] = nbytes[key] = 0
+        if keep is not None and self._over(sum(candles.values()), sum(nbytes.values())):
+            return clear, self._room(keep)
+        return clear, None
+
+    def _over(self, candles: int, nbytes: int) -> bool:
+        if self.max_candles is not None and candles > self.max_candles:
+            return True
+        return self.max_bytes is not None and nbytes > self.max_bytes
+
+    def _room(self, collector: Any) -> int:
+        """Get how many candles collector can keep once the others are empty."""
+        room = len(collector)
+        if self.max_candles is not None:
+            room = min(room, self.max_candles)
+        if self.max_bytes is not None and len(collector):
+            per_candle = collector.nbytes / len(collector)
+            room = min(room, int(self.max_bytes // per_candle))
+        return room
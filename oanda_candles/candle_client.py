@@ -1,25 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from requests import Session
-from typing import Dict, List, Tuple
+from threading import Lock
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 
 from forex_types import Pair
 
 from oanda_candles.candle import Candle
 from oanda_candles.gran import Gran
 
+from .candle_archive import CandleArchive
+from .candle_budget import CandleBudget
 from .candle_collector import CandleCollector
+from .candle_observer import CandleObserver
+from .candle_panel import CandlePanel, panel_of
+from .candle_requester import UrlRoot
+from .candle_resample import ResampledCollector, can_resample
+from .candle_scheduler import RefreshScheduler
+from .market_calendar import FOREX_CALENDAR, MarketCalendar
 
 
 class CandleClient:
-    def __init__(self, token: str, real: bool = False):
+
+    # Class of the collectors made by get_collector.
+    collector_class = CandleCollector
+
+    def __init__(
+        self,
+        token: str,
+        real: bool = False,
+        columnar: bool = False,
+        cache_dir: Optional[str] = None,
+        backfill_workers: int = 1,
+        max_candles: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        root_url: Optional[str] = None,
+        observer: Optional[CandleObserver] = None,
+        calendar: Optional[MarketCalendar] = None,
+        resample: Optional[Dict[Gran, Gran]] = None,
+        read_ahead: int = 0,
+    ):
+        """Initialize client.
+
+        Args:
+            token: Oanda access token.
+            real: True for real account, False for practice/demo account.
+            columnar: True to have collectors cache candles in columnar
+                CandleStore objects and grab CandleFrame views from them.
+            cache_dir: directory to persist completed candles in, so that new
+                clients start with them and only fetch the candles since.
+            backfill_workers: number of concurrent requests collectors use to
+                fetch deep history (1 fetches it one page at a time).
+            max_candles: If given, most candles to cache across collectors,
+                least recently used collectors are emptied (or the oldest
+                history of a large one trimmed) to stay within it.
+            max_bytes: If given, most bytes to cache across collectors,
+                enforced the same way.
+            root_url: If given, URL to send requests to instead of Oanda's
+                (e.g. a local stand-in server for testing).
+            observer: If given, told about the grabs, requests, and pages of
+                all the collectors (e.g. a CandleStats).
+            calendar: market hours collectors skip refreshing outside of
+                (FOREX_CALENDAR if None).
+            resample: If given, granularities to build from candles of a
+                finer one rather than request, e.g. {Gran.H4: Gran.M15} has
+                H4 candles resampled from the M15 candles collected.
+            read_ahead: pages of older history collectors fetch in the
+                background when grab_offset pages back through history, a
+                page being the step between offsets (0 for none).
+        Raises:
+            ValueError: if a granularity can not be resampled from the other.
+        """
+        self.__resample = dict(resample or {})
+        for gran, source_gran in self.__resample.items():
+            if not can_resample(source_gran, gran):
+                raise ValueError(f"Can not resample {source_gran} candles to {gran}")
         self.__token = token
         self.__real = real
+        if root_url is None:
+            root_url = UrlRoot.real_url if real else UrlRoot.practice_url
+        self.__root_url = root_url
+        self.__observer = observer
+        self.__calendar = FOREX_CALENDAR if calendar is None else calendar
+        self.__columnar = columnar
+        self.__archive = None if cache_dir is None else CandleArchive(cache_dir)
+        self.__backfill_workers = backfill_workers
+        self.__read_ahead = read_ahead
+        self.__budget = (
+            None
+            if max_candles is None and max_bytes is None
+            else CandleBudget(max_candles, max_bytes)
+        )
         self.__session = Session()
         self.__collections: Dict[Tuple[Pair, Gran], CandleCollector] = {}
+        self.__collections_lock = Lock()
+        self.__scheduler = RefreshScheduler(self)
 
     @property
     def real(self):
         return self.__real
 
+    @property
+    def root_url(self) -> str:
+        """URL requests are sent to."""
+        return self.__root_url
+
+    @property
+    def archive(self) -> Optional[CandleArchive]:
+        return self.__archive
+
+    @property
+    def budget(self) -> Optional[CandleBudget]:
+        """Limit on candles cached by the collectors (None if unlimited)."""
+        return self.__budget
+
+    @property
+    def observer(self) -> Optional[CandleObserver]:
+        return self.__observer
+
+    @property
+    def calendar(self) -> MarketCalendar:
+        return self.__calendar
+
+    @property
+    def resample(self) -> Dict[Gran, Gran]:
+        """Granularities resampled from finer ones, to the ones they are from."""
+        return dict(self.__resample)
+
+    @property
+    def columnar(self):
+        return self.__columnar
+
+    @property
+    def scheduler(self) -> RefreshScheduler:
+        """Scheduler that can keep collectors fresh in the background."""
+        return self.__scheduler
+
     @property
     def session(self):
         return self.__session
@@ -28,18 +144,96 @@ class CandleClient:
     def token(self):
         return self.__token
 
-    def get_collector(self, pair: Pair, gran: Gran) -> CandleCollector:
+    def get_collector(
+        self, pair: Pair, gran: Gran, kinds: Optional[Iterable] = None
+    ) -> CandleCollector:
+        """Get collector for pair and gran, making it if need be.
+
+        Args:
+            pair: pair of the candles.
+            gran: granularity of the candles.
+            kinds: price kinds (PriceKind or QuoteKind) needed. A new collector
+                gets only these, or all kinds if None. An existing collector
+                is upgraded if it is missing any of them.
+        """
         key_tuple = (pair, gran)
-        if key_tuple not in self.__collections:
-            self.__collections[key_tuple] = CandleCollector(self, pair, gran)
-        return self.__collections[key_tuple]
+        with self.__collections_lock:
+            collector = self.__collections.get(key_tuple)
+            if collector is None:
+                if gran in self.__resample:
+                    make = partial(
+                        ResampledCollector, source_gran=self.__resample[gran]
+                    )
+                else:
+                    make = self.collector_class
+                collector = self.__collections[key_tuple] = make(
+                    self,
+                    pair,
+                    gran,
+                    columnar=self.__columnar,
+                    archive=self.__archive,
+                    backfill_workers=self.__backfill_workers,
+                    kinds=kinds,
+                    budget=self.__budget,
+                    observer=self.__observer,
+                    calendar=self.__calendar,
+                    read_ahead=self.__read_ahead,
+                )
+                return collector
+        if kinds is not None:
+            collector.add_kinds(kinds)
+        return collector
+
+    def collectors(self) -> List[CandleCollector]:
+        """Get list of the collectors made so far."""
+        with self.__collections_lock:
+            return list(self.__collections.values())
 
-    def grab(self, pair: Pair, gran: Gran, count: int) -> List[Candle]:
+    def grab(self, pair: Pair, gran: Gran, count: int) -> Sequence[Candle]:
         collector = self.get_collector(pair, gran)
         return collector.grab(count)
 
     def grab_offset(
         self, pair: Pair, gran: Gran, offset: int, count: int
-    ) -> List[Candle]:
+    ) -> Sequence[Candle]:
         collector = self.get_collector(pair, gran)
         return collector.grab_offset(offset, count)
+
+    def panel(
+        self,
+        pairs: Iterable[Pair],
+        gran: Gran,
+        count: int,
+        side: str = "mid",
+        field: str = "c",
+        missing: str = "nan",
+        workers: int = 8,
+    ) -> CandlePanel:
+        """Grab prices of many pairs aligned on their candle times.
+
+        The pairs are grabbed concurrently (each from its collector's cache
+        when it already has the candles), then put in one table.
+
+        Args:
+            pairs: pairs of the columns, in order.
+            gran: granularity of the candles.
+            count: number of candles grabbed per pair, and most rows.
+            side: price kind, such as PriceKind.MID (or QuoteKind.MID).
+            field: one of "o", "h", "l", or "c".
+            missing: "nan", "ffill", or "drop" (see candle_panel.panel_of).
+            workers: most pairs grabbed at once.
+        Returns:
+            CandlePanel of times by pairs, e.g. panel.to_numpy()[:, 0] are
+            the prices of the first pair.
+        """
+        collectors = [self.get_collector(_, gran) for _ in pairs]
+        # New collectors collect every kind as usual, so only collectors
+        # made for fewer kinds before are widened to have side.
+        for collector in collectors:
+            collector.add_kinds([side])
+        with ThreadPoolExecutor(
+            max_workers=max(1, min(workers, len(collectors)))
+        ) as pool:
+            grabbed = pool.map(lambda _: _.grab(count), collectors)
+            candles = {c.pair: got for c, got in zip(collectors, grabbed)}
+        return panel_of(candles, count, side, field, missing)
@@ -1,13 +1,26 @@
-from typing import Any, List
-from time import monotonic
+import logging
+from typing import Any, Dict, Iterable, Optional, Sequence, Set, Tuple, Union
+from threading import Condition, Event, RLock, Thread, get_ident
+from time import monotonic, perf_counter
 
 from forex_types import Pair
 
-from oanda_candles.gran import Gran
-from oanda_candles.candle import Candle
+from oanda_candles.gran import Gran, bucket_start
+from oanda_candles.candle import Candle, PRICE_KINDS, to_price_kinds
 
 
+from .candle_archive import CandleArchive
+from .candle_budget import CandleBudget
+from .candle_indicators import Indicator
+from .candle_intervals import CandleIntervals, bisect_time
+from .candle_observer import CandleObserver
 from .candle_requester import CandleRequester
+from .candle_segments import CandleSegments
+from .candle_store import CandleStore
+from .market_calendar import FOREX_CALENDAR, MarketCalendar
+from .ohlc import Ohlc
+
+logger = logging.getLogger(__name__)
 
 
 class CandleCollector:
@@ -16,44 +29,666 @@ class CandleCollector:
     # unless its been this many seconds since we last retrieved them.
     LONG_ENOUGH = 3.0
 
-    def __init__(self, client: Any, pair: Pair, gran: Gran):
-        self.requester = CandleRequester(client, pair, gran)
-        self._cache: List[Candle] = []
+    # Rough bytes per candle per price kind when the cache is a list of
+    # Candle objects (see benchmarks.bench_footprint).
+    LIST_BYTES_PER_KIND = 240
+
+    # Seconds between asking the candles endpoint for a candle that prices
+    # from the pricing stream say has started, while it does not have it.
+    RECONCILE_WAIT = 1.0
+
+    def __init__(
+        self,
+        client: Any,
+        pair: Pair,
+        gran: Gran,
+        columnar: bool = False,
+        archive: Optional[CandleArchive] = None,
+        backfill_workers: int = 1,
+        kinds: Optional[Iterable[str]] = None,
+        budget: Optional[CandleBudget] = None,
+        observer: Optional[CandleObserver] = None,
+        calendar: Optional[MarketCalendar] = None,
+        read_ahead: int = 0,
+    ):
+        """Initialize collector, with cache loaded from archive if given.
+
+        Args:
+            client: CandleClient (or similar) providing session, token, and
+                root_url (the URL requests are sent to).
+            pair: pair the candles are for.
+            gran: granularity of the candles.
+            columnar: If True cache candles in a CandleStore, in which case
+                grab and grab_offset return CandleFrame views instead of lists.
+            archive: If given, the cache starts with the candles stored in it
+                and newly completed candles are saved back to it.
+            backfill_workers: If more than 1, history beyond a single page is
+                fetched with this many concurrent requests (see backfill).
+            kinds: price kinds (PriceKind or QuoteKind) to request, None for
+                all three. Candles have None in place of the other kinds.
+            budget: If given, the collector reports to it after each grab,
+                and it may empty or trim the cache to keep within it.
+            observer: If given, told about each grab, request, and page.
+            calendar: market hours to skip refreshing outside of, and to
+                size history requests by (FOREX_CALENDAR if None).
+            read_ahead: pages of older history to fetch in the background
+                when grab_offset pages back through history, a page being
+                the step between its offsets (0 for none).
+        """
+        self.requester = CandleRequester(
+            client, pair, gran, columnar=columnar, kinds=kinds, observer=observer
+        )
+        self._cache: Union[CandleSegments, CandleStore] = (
+            CandleStore(pair, kinds=self.kinds) if columnar else CandleSegments()
+        )
+        self.pair = pair
+        self.gran = gran
+        self.archive = archive
+        self.backfill_workers = backfill_workers
+        self.budget = budget
+        self.calendar = FOREX_CALENDAR if calendar is None else calendar
+        # Held while the cache is read or changed, so only one thread at a
+        # time requests candles for the collector and others then find them
+        # in the cache rather than requesting them again.
+        self._lock = RLock()
+        # Count of refreshes done, and the thread doing one in flight (if
+        # any), so that refresh calls made during one wait for it instead of
+        # repeating it. Both are only used while holding _refreshed.
+        self._refreshed = Condition()
+        self._refreshes = 0
+        self._refreshing: Optional[int] = None
+        # Count of changes to the cached candles, so that copies of them
+        # (e.g. in shared memory) can tell when they are out of date.
+        self.version = 0
+        self.indicators: Dict[str, Indicator] = {}
+        # Older candles requested apart from the cache by grab_range, moved
+        # into it when it grows back to them.
+        self.intervals = CandleIntervals(pair, columnar, self.kinds)
+        self._load()
         self.last_update: float = monotonic() - self.LONG_ENOUGH - 1
+        # Market time (per calendar) of the latest request for the recent
+        # candles, None if none since the cache was emptied.
+        self.updated_at: Optional[int] = None
         self.end_of_history: bool = False
+        # RefreshSchedulers and PriceStreamers keeping the recent candles up
+        # to date (see scheduled).
+        self._holders: Set[Any] = set()
+        # Start of the candle apply_price last refreshed to get.
+        self._reconciling: Optional[int] = None
+        self.read_ahead = read_ahead
+        # Candles the last grab_offset reached back to, and the thread (and
+        # its cancel event) fetching older history ahead of grab_offset.
+        self._paged_to: Optional[int] = None
+        self._reading: Optional[Thread] = None
+        self._cancel_reading = Event()
+        # Notified as each page read ahead is prepended, and when it stops.
+        self._read_page = Condition()
 
     def __len__(self):
         return len(self._cache)
 
+    @property
+    def nbytes(self) -> int:
+        """Estimated number of bytes used by the cached candles."""
+        nbytes = sum(_.nbytes for _ in self.indicators.values())
+        if isinstance(self._cache, CandleStore):
+            return nbytes + self._cache.nbytes + self.intervals.nbytes
+        candles = len(self._cache) + len(self.intervals)
+        return nbytes + candles * len(self.kinds) * self.LIST_BYTES_PER_KIND
+
+    @property
+    def observer(self) -> Optional[CandleObserver]:
+        """Observer told about grabs, requests, and pages (None if none)."""
+        return self.requester.observer
+
+    @property
+    def closed_until(self) -> Optional[int]:
+        """Time the market opens next if it is closed and the cache already
+        has the final candle from before it closed, otherwise None.
+
+        The cache has it if its latest candle is complete and ends at or
+        after the close, or if the recent candles were requested since the
+        close. The latter covers W and M candles, which stay incomplete
+        over the weekend as they span it.
+        """
+        with self._lock:
+            now = self.calendar.now()
+            if not self._cache or self.calendar.is_open(now):
+                return None
+            last_close = self.calendar.last_close(now)
+            if self.updated_at is not None and self.updated_at >= last_close:
+                return self.calendar.next_open(now)
+            last = self._cache[-1]
+            if not last.complete:
+                return None
+            if last.time + self.gran.duration < last_close:
+                return None
+            return self.calendar.next_open(now)
+
+    @property
+    def scheduled(self) -> bool:
+        """True while a RefreshScheduler or PriceStreamer keeps the recent
+        candles up to date, in which case grab does not refresh them itself."""
+        return bool(self._holders)
+
+    def hold(self, holder: Any):
+        """Note that holder keeps the recent candles up to date from now on."""
+        self._holders.add(holder)
+
+    def release(self, holder: Any):
+        """Note that holder no longer keeps the recent candles up to date.
+
+        They are still scheduled if any other holder keeps them up to date.
+        """
+        self._holders.discard(holder)
+
+    @property
+    def kinds(self) -> Tuple[str, ...]:
+        """Price kinds of the candles collected."""
+        return self.requester.kinds
+
+    def add_indicator(self, name: str, indicator: Indicator) -> Indicator:
+        """Register indicator to be kept up to date with the cached candles.
+
+        Its arrays of values are aligned to the cache, so the value for the
+        candle at grab(n)[-k] is at indicator[-k].
+
+        Args:
+            name: key of the indicator in indicators.
+            indicator: indicator (e.g. Sma(20)) with no values yet.
+        Returns:
+            The indicator, with values computed for the cached candles.
+        Raises:
+            ValueError: if the candles collected lack the indicator's kind.
+        """
+        if indicator.kind not in self.kinds:
+            raise ValueError(
+                f"Indicator needs {indicator.kind} prices, collector has {self.kinds}"
+            )
+        with self._lock:
+            indicator.reset(self._cache)
+            self.indicators[name] = indicator
+            return indicator
+
+    def remove_indicator(self, name: str) -> Indicator:
+        with self._lock:
+            return self.indicators.pop(name)
+
+    def add_kinds(self, kinds: Iterable) -> Tuple[str, ...]:
+        """Start collecting more price kinds for the candles.
+
+        Only the new price kinds are requested for the candles already in
+        the cache (by time, a window at a time as with get_between) and
+        merged into them, then the recent candles are refreshed with all
+        the kinds. Should a response lack a cached candle, the candles
+        before it are dropped (with a warning) to be requested again if
+        grabbed.
+
+        Args:
+            kinds: price kinds (PriceKind or QuoteKind) to add.
+        Returns:
+            The price kinds collected from now on.
+        """
+        with self._lock:
+            kinds = to_price_kinds([*self.kinds, *to_price_kinds(kinds)])
+            new_kinds = tuple(_ for _ in kinds if _ not in self.kinds)
+            if not new_kinds:
+                return self.kinds
+            extra = {}
+            if self._cache:
+                start = self._cache[0].time
+                end = self._cache[-1].time + 1
+                candles = self.requester.get_between(start, end, kinds=new_kinds)
+                extra = {_.time: _ for _ in candles}
+            merged = []
+            for candle in self._cache:
+                other = extra.get(candle.time)
+                if other is None:
+                    merged = []
+                    continue
+                sides = [getattr(candle, _) or getattr(other, _) for _ in PRICE_KINDS]
+                merged.append(Candle(*sides, candle.time, candle.complete))
+            dropped = len(self._cache) - len(merged)
+            if dropped:
+                logger.warning(
+                    "Dropped %d %s %s candles before a gap in their %s prices",
+                    dropped,
+                    self.pair,
+                    self.gran,
+                    ",".join(new_kinds),
+                )
+                self.end_of_history = False
+            self.requester.kinds = kinds
+            if isinstance(self._cache, CandleStore):
+                self._cache = CandleStore(self.pair, merged, kinds)
+            else:
+                self._cache[:] = merged
+            self._indicate("reset")
+            self.intervals = CandleIntervals(self.pair, self.requester.columnar, kinds)
+            self.refresh()
+            return kinds
+
     def update_recent(self) -> bool:
-        mono_time: float = monotonic()
-        if mono_time > self.last_update + self.LONG_ENOUGH:
-            self.last_update = mono_time
-            self.requester.extend(self._cache)
+        """Refresh if it has been LONG_ENOUGH since the last time, unless
+        the market is closed and the candles from before it closed are in."""
+        with self._lock:
+            mono_time: float = monotonic()
+            if (
+                mono_time > self.last_update + self.LONG_ENOUGH
+                and self.closed_until is None
+            ):
+                self.refresh()
+                return True
+            return False
+
+    def refresh(self):
+        """Get the most recent candles now, regardless of when last done.
+
+        If another thread is already refreshing, wait for it to finish and
+        share its candles instead of requesting them again. The same goes
+        for threads waiting for the lock while another thread refreshes.
+        """
+        with self._refreshed:
+            if self._refreshing not in (None, get_ident()):
+                # The refreshing thread holds _lock, so this one can not be.
+                refreshes = self._refreshes
+                self._refreshed.wait_for(lambda: self._refreshes > refreshes)
+                return
+            refreshes = self._refreshes
+        with self._lock:
+            with self._refreshed:
+                if self._refreshes > refreshes:
+                    # Refreshed by a thread that got the lock first, after
+                    # this one was called.
+                    return
+                self._refreshing = get_ident()
+            try:
+                self.last_update = monotonic()
+                self.updated_at = self.calendar.now()
+                size = len(self._cache)
+                self.requester.extend(self._cache)
+                # Extending replaces the last candle onward.
+                self._indicate("extend", max(0, size - 1))
+                self.save()
+            finally:
+                with self._refreshed:
+                    self._refreshing = None
+                    self._refreshes += 1
+                    self._refreshed.notify_all()
+
+    def apply_price(self, time: int, bid: int, ask: int) -> bool:
+        """Update the latest candle with a price from the pricing stream.
+
+        A price within the latest (incomplete) candle moves its high, low,
+        and close, without any request. A price after it means that candle
+        has completed, so the candles are refreshed to get it as final
+        from the candles endpoint (at most once per RECONCILE_WAIT while
+        the endpoint does not have the next candle yet).
+
+        Args:
+            time: epoch time of the price.
+            bid: bid in fractional pips.
+            ask: ask in fractional pips.
+        Returns:
+            True if the cached candles changed.
+        """
+        with self._lock:
+            if not self._cache:
+                return False
+            last = self._cache[-1]
+            start = bucket_start(time, self.gran)
+            if start > last.time:
+                waiting = monotonic() < self.last_update + self.RECONCILE_WAIT
+                if start == self._reconciling and waiting:
+                    return False
+                self._reconciling = start
+                self.refresh()
+                return True
+            if start < last.time or last.complete:
+                return False
+            self._cache[-1:] = [self._priced(last, bid, ask)]
+            self._indicate("extend", len(self._cache) - 1)
             return True
-        return False
+
+    def update_history_to(self, time: int) -> bool:
+        """Prepend candles until the cache reaches back to time.
+
+        Only the candles between time and the earliest cached candle are
+        requested, with count from the market calendar.
+
+        Returns:
+            False if Oanda ran out of candles before reaching time.
+        """
+        with self._lock:
+            size = len(self._cache)
+            try:
+                while (
+                    not self.end_of_history
+                    and self._cache
+                    and self._cache[0].time > time
+                ):
+                    if self.intervals.absorb(self._cache):
+                        continue
+                    first_time = self._cache[0].time
+                    count = self.calendar.candle_count(time, first_time, self.gran)
+                    if count <= 0:
+                        # The market was closed all that time.
+                        break
+                    count = min(5000, count)
+                    candles = self.requester.get_before(first_time, count)
+                    self._cache[0:0] = candles
+                    self.end_of_history = len(candles) < count
+                    self.intervals.absorb(self._cache)
+                    self.save()
+            finally:
+                # Indicators are told once about all the pages, as recursive
+                # ones recompute every value whenever history is prepended.
+                if len(self._cache) > size:
+                    self._indicate("prepend", len(self._cache) - size)
+            return not self.end_of_history
 
     def update_history(self, count: int) -> bool:
-        if not self.end_of_history:
-            self.end_of_history = not self.requester.prepend(self._cache, count)
-        return not self.end_of_history
-
-    def grab(self, count: int) -> List[Candle]:
-        if not self._cache and count <= 5000:
-            self._cache = self.requester.get(count)
-            self.last_update = monotonic()
-        self.update_recent()
-        missing = count - len(self._cache)
-        self.update_history(missing)
-        return self._cache[-count:]
-
-    def grab_offset(self, offset: int, count: int) -> List[Candle]:
-        total = offset + count
-        if not self._cache and total <= 5000:
-            self._cache = self.requester.get(total)
-            self.last_update = monotonic()
-        self.update_recent()
-        total_needed = offset + count
-        missing = total_needed - len(self._cache)
-        self.update_history(missing)
-        return self._cache[-total_needed:-offset]
+        with self._lock:
+            if not self.end_of_history and count > 0:
+                size = len(self._cache)
+                if self.backfill_workers > 1 and count > 5000:
+                    provided = self.requester.backfill(
+                        self._cache, count, self.backfill_workers, self.calendar
+                    )
+                else:
+                    provided = self.requester.prepend(self._cache, count)
+                self._indicate("prepend", len(self._cache) - size)
+                self.end_of_history = not provided
+                self._absorb()
+                self.save()
+            return not self.end_of_history
+
+    def trim(self, count: int):
+        """Drop the oldest cached candles, keeping the latest count of them.
+
+        The dropped candles are requested again if they are grabbed.
+        """
+        with self._lock:
+            if count <= 0:
+                self.clear()
+            elif len(self._cache) > count:
+                trimmed = len(self._cache) - count
+                del self._cache[:trimmed]
+                self._indicate("trim", trimmed)
+                self.intervals.clear()
+                self.end_of_history = False
+                self.cancel_read_ahead(wait=False)
+
+    def clear(self):
+        """Drop all cached candles, they are requested again when grabbed."""
+        with self._lock:
+            del self._cache[:]
+            self._indicate("reset")
+            self.intervals.clear()
+            self.end_of_history = False
+            self.last_update = monotonic() - self.LONG_ENOUGH - 1
+            self.updated_at = None
+            self.cancel_read_ahead(wait=False)
+
+    def save(self) -> int:
+        """Save newly completed candles to archive (if collector has one)."""
+        if self.archive is None:
+            return 0
+        with self._lock:
+            return self.archive.save(self.pair, self.gran, self._cache, self.kinds)
+
+    def grab(self, count: int) -> Sequence[Candle]:
+        observed = self._start()
+        # The lock is let go before the budget is told, as it takes the
+        # locks of the collectors it empties.
+        candles = self._grab(count)
+        self._used("grab", observed)
+        return candles
+
+    def grab_offset(self, offset: int, count: int) -> Sequence[Candle]:
+        observed = self._start()
+        self._await_read_ahead(offset + count)
+        with self._lock:
+            total = offset + count
+            if not self._cache:
+                self._load()
+            if not self._cache and total <= 5000:
+                self._cache[:] = self.requester.get(total)
+                self._indicate("reset")
+                self.last_update = monotonic()
+                self.updated_at = self.calendar.now()
+                self.save()
+            if not self.scheduled:
+                self.update_recent()
+            total_needed = offset + count
+            missing = total_needed - len(self._cache)
+            self.update_history(missing)
+            candles = self._cache[-total_needed : len(self._cache) - offset]
+            self._page(total_needed)
+        self._used("grab_offset", observed)
+        return candles
+
+    def grab_range(self, start: int, end: Optional[int] = None) -> Sequence[Candle]:
+        """Grab the candles with start times from start up to (not including) end.
+
+        Any part of the range not cached yet is requested, older candles
+        only back to start, and recent candles (if end is after the latest
+        cached candle) as with grab. A range ending before the earliest
+        cached candle is requested on its own and kept in intervals, rather
+        than requesting all the candles between it and the cache.
+
+        Args:
+            start: time (e.g. TimeInt) of earliest candle wanted.
+            end: time to stop before, None for up to the latest candle.
+        """
+        observed = self._start()
+        candles = self._grab_range(start, end)
+        self._used("grab_range", observed)
+        return candles
+
+    def grab_since(self, time: int) -> Sequence[Candle]:
+        """Grab candles that started at or after time, up to the latest."""
+        return self.grab_range(time)
+
+    def cancel_read_ahead(self, wait: bool = True):
+        """Stop fetching history in the background (see read_ahead).
+
+        The page being requested is dropped rather than prepended.
+
+        Args:
+            wait: If True wait for the request in flight to finish.
+        """
+        self._cancel_reading.set()
+        self._paged_to = None
+        reading = self._reading
+        if wait and reading is not None:
+            reading.join()
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    def _grab(self, count: int) -> Sequence[Candle]:
+        """Grab without telling the observer or budget, as a collector
+        grabbing from this one while holding its own lock does (see grab)."""
+        self._await_read_ahead(count)
+        with self._lock:
+            if not self._cache:
+                self._load()
+            if not self._cache and count <= 5000:
+                self._cache[:] = self.requester.get(count)
+                self._indicate("reset")
+                self.last_update = monotonic()
+                self.updated_at = self.calendar.now()
+                self.save()
+            if not self.scheduled:
+                self.update_recent()
+            missing = count - len(self._cache)
+            self.update_history(missing)
+            candles = self._cache[-count:]
+        return candles
+
+    def _grab_range(self, start: int, end: Optional[int]) -> Sequence[Candle]:
+        """Grab range without telling the observer or budget (see _grab)."""
+        with self._lock:
+            if not self._cache:
+                self._load()
+            if not self._cache:
+                self.refresh()
+            elif not self.scheduled and (end is None or end > self._cache[-1].time):
+                self.update_recent()
+            if self._separate(start, end):
+                candles = self._grab_interval(start, end)
+            else:
+                self.update_history_to(start)
+                first = bisect_time(self._cache, start)
+                last = (
+                    len(self._cache) if end is None else bisect_time(self._cache, end)
+                )
+                candles = self._cache[first:last]
+        return candles
+
+    def _page(self, total: int):
+        """Read ahead if grab_offset is paging back, now reaching total candles.
+
+        Once the candles cached beyond total are down to half of read_ahead
+        pages, older history is fetched in the background up to read_ahead
+        pages beyond total.
+        """
+        last, self._paged_to = self._paged_to, total
+        if not self.read_ahead or last is None or total <= last:
+            return
+        if self.end_of_history or (self._reading and self._reading.is_alive()):
+            return
+        ahead = self.read_ahead * (total - last)
+        if 2 * (len(self._cache) - total) < ahead:
+            self._cancel_reading = Event()
+            self._reading = Thread(
+                target=self._read_ahead,
+                args=(total + ahead - len(self._cache), self._cancel_reading),
+                name="ReadAhead",
+                daemon=True,
+            )
+            self._reading.start()
+
+    def _read_ahead(self, count: int, cancel: Event):
+        """Prepend count candles a page at a time, requesting each page
+        without the lock and only taking it to prepend the page.
+
+        Stops if the read ahead is cancelled, or the front of the cache
+        changed while a page was requested (e.g. it was trimmed), in which
+        case that page is dropped.
+        """
+        try:
+            with self._lock:
+                if cancel.is_set() or self.end_of_history or not self._cache:
+                    return
+                before = self._cache[0].time
+            while count > 0 and not cancel.is_set():
+                size = min(count, 5000)
+                page = self.requester.get_before(before, size)
+                if self.observer is not None:
+                    self.observer.on_page(self.pair, self.gran, "read_ahead", len(page))
+                with self._lock:
+                    if cancel.is_set() or not self._cache:
+                        return
+                    if self._cache[0].time != before:
+                        return
+                    total = len(self._cache)
+                    self._cache[0:0] = page
+                    self.end_of_history = len(page) < size
+                    self.intervals.absorb(self._cache)
+                    self._indicate("prepend", len(self._cache) - total)
+                    self.save()
+                    if self.end_of_history:
+                        return
+                    before = self._cache[0].time
+                with self._read_page:
+                    self._read_page.notify_all()
+                count -= size
+        except Exception:
+            logger.exception("Failed to read ahead %s %s", self.pair, self.gran)
+        finally:
+            with self._read_page:
+                # Also marks the read ahead as over for _await_read_ahead.
+                cancel.set()
+                self._read_page.notify_all()
+
+    def _await_read_ahead(self, count: int):
+        """Wait until count candles are cached if a grab needs candles from
+        a page being read ahead, or until the read ahead stops."""
+        if self._reading is None:
+            return
+        over = self._cancel_reading
+        with self._read_page:
+            self._read_page.wait_for(lambda: len(self._cache) >= count or over.is_set())
+
+    def _load(self):
+        """Fill empty cache with the candles in the archive (if there is one)."""
+        if self.archive is not None:
+            self._cache[:] = self.archive.load(self.pair, self.gran, self.kinds)
+            self._indicate("reset")
+
+    def _priced(self, candle: Candle, bid: int, ask: int) -> Candle:
+        """Get candle with its high, low, and close moved by a price."""
+        unit = self.pair.quote.rounder
+        prices = {"ask": ask, "bid": bid, "mid": (bid + ask) // 2}
+        sides = []
+        for kind in PRICE_KINDS:
+            ohlc = getattr(candle, kind)
+            if ohlc is not None:
+                o, h, l, _ = ohlc.to_fp()
+                price = prices[kind]
+                ohlc = Ohlc.from_fp(o, max(h, price), min(l, price), price, unit)
+            sides.append(ohlc)
+        return Candle(*sides, candle.time, False)
+
+    def _indicate(self, method: str, *args):
+        """Count a change to the cache and update indicators to match it
+        (see Indicator methods)."""
+        self.version += 1
+        for indicator in self.indicators.values():
+            getattr(indicator, method)(self._cache, *args)
+
+    def _start(self) -> Optional[Tuple[float, int]]:
+        """Note time and request count at start of grab if it is observed."""
+        if self.requester.observer is None:
+            return None
+        return perf_counter(), self.requester.request_count
+
+    def _used(self, method: str, observed: Optional[Tuple[float, int]]):
+        if observed is not None:
+            seconds = perf_counter() - observed[0]
+            hit = self.requester.request_count == observed[1]
+            self.observer.on_grab(self.pair, self.gran, method, hit, seconds)
+        if self.budget is not None:
+            self.budget.used(self)
+
+    def _separate(self, start: int, end: Optional[int]) -> bool:
+        """Tell if start to end is to be requested apart from the cache."""
+        return (
+            end is not None
+            and start < end
+            and not self.end_of_history
+            and bool(self._cache)
+            and end <= self._cache[0].time
+        )
+
+    def _grab_interval(self, start: int, end: int) -> Sequence[Candle]:
+        """Get candles of start to end from intervals, requesting what is not."""
+        for gap_start, gap_end in self.intervals.gaps(start, end):
+            candles = self.requester.get_between(gap_start, gap_end)
+            self.intervals.add(gap_start, gap_end, candles)
+        self._absorb()
+        if self.intervals.find(start, end) is None:
+            # Merged into the cache.
+            first = bisect_time(self._cache, start)
+            return self._cache[first : bisect_time(self._cache, end)]
+        return self.intervals.grab(start, end)
+
+    def _absorb(self) -> int:
+        """Move intervals that reach the cache into it."""
+        count = self.intervals.absorb(self._cache)
+        if count:
+            self._indicate("prepend", count)
+        return count
@@ -0,0 +1,267 @@
+from array import array
+from math import sqrt
+from typing import Dict, List, Sequence, Tuple
+
+from oanda_candles.candle import Candle, to_price_kinds
+
+from .candle_store import FIELDS, CandleFrame, CandleStore
+
+NAN = float("nan")
+
+
+def price_series(
+    candles: Sequence[Candle], kind: str, field: str, start: int, stop: int
+) -> List[float]:
+    """Get one price field of one side of candles[start:stop] as floats.
+
+    Args:
+        candles: list of candles, CandleStore, or CandleFrame.
+        kind: side of the quote, one of "ask", "bid", or "mid".
+        field: one of "o", "h", "l", or "c".
+        start: index of first candle.
+        stop: index to stop before.
+    """
+    if isinstance(candles, CandleStore):
+        candles = candles.frame()
+    if isinstance(candles, CandleFrame):
+        unit = float(candles.pair.quote.rounder)
+        return [_ * unit for _ in candles.column(kind, field)[start:stop]]
+    ndx = FIELDS.index(field)
+    series = []
+    for candle in candles[start:stop]:
+        ohlc = getattr(candle, kind)
+        series.append(ohlc.to_fp()[ndx] * float(ohlc.unit))
+    return series
+
+
+class Indicator:
+    """Indicator with values in arrays aligned to a collector's candles.
+
+    Register one with CandleCollector.add_indicator and the collector
+    keeps it up to date: only values for appended or replaced candles are
+    computed, and those of prepended ones (for indicators whose values
+    depend on all before them, all of them) when history is prepended.
+    Values are NaN where there are not yet enough candles.
+
+    Subclasses set names (one array for each) and recursive, and
+    implement _compute.
+    """
+
+    # Names of the arrays of values, the first is the main one.
+    names: Tuple[str, ...] = ("value",)
+    # True if each value depends on the value before it, in which case all
+    # values are recomputed when history is prepended.
+    recursive: bool = False
+
+    def __init__(self, period: int, kind: str = "mid", field: str = "c"):
+        """Initialize indicator with no values.
+
+        Args:
+            period: number of candles the indicator looks back over.
+            kind: side of the quote (PriceKind or QuoteKind) to compute from.
+            field: one of "o", "h", "l", or "c" to compute from.
+        """
+        if period < 1:
+            raise ValueError(f"Indicator period must be positive: {period}")
+        if field not in FIELDS:
+            raise ValueError(f"Price field must be one of {FIELDS}: {field}")
+        self.period = period
+        self.kind = to_price_kinds([kind])[0]
+        self.field = field
+        self.arrays: Dict[str, array] = {_: array("d") for _ in self.names}
+
+    @property
+    def values(self) -> array:
+        """Main array of values, one for each candle."""
+        return self.arrays[self.names[0]]
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, ndx: int) -> float:
+        return self.values[ndx]
+
+    @property
+    def nbytes(self) -> int:
+        return sum(len(_) * _.itemsize for _ in self.arrays.values())
+
+    def reset(self, candles: Sequence[Candle]):
+        """Compute values for all of candles."""
+        self.extend(candles, 0)
+
+    def extend(self, candles: Sequence[Candle], start: int):
+        """Compute values from start on, after candles from there changed."""
+        for values in self.arrays.values():
+            del values[start:]
+        self._append(self._compute(candles, start, len(candles)))
+
+    def prepend(self, candles: Sequence[Candle], count: int):
+        """Compute values of count candles prepended to candles."""
+        if self.recursive:
+            self.reset(candles)
+            return
+        # The first values (up to period - 1) lacked candles before them.
+        redo = min(self.period - 1, len(self))
+        rows = self._compute(candles, 0, count + redo)
+        for values, column in zip(self.arrays.values(), self._columns(rows)):
+            values[0:redo] = column
+
+    def trim(self, candles: Sequence[Candle], count: int):
+        """Drop the values of count candles trimmed from front of candles."""
+        for values in self.arrays.values():
+            del values[:count]
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self.period}, {self.kind!r}, {self.field!r})"
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    def _compute(self, candles: Sequence[Candle], start: int, stop: int) -> list:
+        """Get rows of values (one for each name) for candles start to stop.
+
+        Recursive indicators can use the values before start.
+        """
+        raise NotImplementedError
+
+    def _columns(self, rows: list) -> List[array]:
+        if not rows:
+            return [array("d") for _ in self.names]
+        return [array("d", _) for _ in zip(*rows)]
+
+    def _append(self, rows: list):
+        for values, column in zip(self.arrays.values(), self._columns(rows)):
+            values.extend(column)
+
+    def _window(self, candles: Sequence[Candle], start: int, stop: int):
+        """Get series from period - 1 before start and index of start in it."""
+        first = max(0, start - self.period + 1)
+        return price_series(candles, self.kind, self.field, first, stop), first
+
+
+class Sma(Indicator):
+    """Simple moving average."""
+
+    def _compute(self, candles: Sequence[Candle], start: int, stop: int) -> list:
+        series, first = self._window(candles, start, stop)
+        period = self.period
+        rows = []
+        total = 0.0
+        for ndx in range(first, stop):
+            total += series[ndx - first]
+            if ndx - period >= first:
+                total -= series[ndx - period - first]
+            if ndx >= start:
+                rows.append((total / period if ndx >= period - 1 else NAN,))
+        return rows
+
+
+class Ema(Indicator):
+    """Exponential moving average, seeded with the simple average of the
+    first period candles."""
+
+    recursive = True
+
+    def _compute(self, candles: Sequence[Candle], start: int, stop: int) -> list:
+        period = self.period
+        first = 0 if start < period else start
+        series = price_series(candles, self.kind, self.field, first, stop)
+        alpha = 2.0 / (period + 1)
+        previous = self.values[start - 1] if start >= period else NAN
+        rows = []
+        for ndx in range(start, stop):
+            if ndx < period - 1:
+                value = NAN
+            elif ndx == period - 1:
+                value = sum(series[:period]) / period
+            else:
+                value = previous + alpha * (series[ndx - first] - previous)
+            rows.append((value,))
+            previous = value
+        return rows
+
+
+class Atr(Indicator):
+    """Average true range with Wilder's smoothing (field is not used)."""
+
+    recursive = True
+
+    def _compute(self, candles: Sequence[Candle], start: int, stop: int) -> list:
+        period = self.period
+        first = 0 if start < period else start - 1
+        highs, lows, closes = [
+            price_series(candles, self.kind, _, first, stop) for _ in "hlc"
+        ]
+        ranges = []
+        for ndx in range(len(highs)):
+            high, low = highs[ndx], lows[ndx]
+            if ndx + first == 0:
+                ranges.append(high - low)
+            elif ndx:
+                close = closes[ndx - 1]
+                ranges.append(max(high - low, abs(high - close), abs(low - close)))
+            else:
+                # Only there for its close, its range was used before.
+                ranges.append(NAN)
+        previous = self.values[start - 1] if start >= period else NAN
+        rows = []
+        for ndx in range(start, stop):
+            true_range = ranges[ndx - first]
+            if ndx < period - 1:
+                value = NAN
+            elif ndx == period - 1:
+                value = sum(ranges[:period]) / period
+            else:
+                value = (previous * (period - 1) + true_range) / period
+            rows.append((value,))
+            previous = value
+        return rows
+
+
+class Bollinger(Indicator):
+    """Bollinger bands: simple moving average and width standard deviations
+    (of the population) above and below it."""
+
+    names = ("middle", "upper", "lower")
+
+    def __init__(
+        self, period: int = 20, width: float = 2.0, kind: str = "mid", field: str = "c"
+    ):
+        """Initialize indicator with no values.
+
+        Args:
+            period: number of candles the bands look back over.
+            width: number of standard deviations between middle and bands.
+            kind: side of the quote (PriceKind or QuoteKind) to compute from.
+            field: one of "o", "h", "l", or "c" to compute from.
+        """
+        super().__init__(period, kind, field)
+        self.width = width
+
+    @property
+    def middle(self) -> array:
+        return self.arrays["middle"]
+
+    @property
+    def upper(self) -> array:
+        return self.arrays["upper"]
+
+    @property
+    def lower(self) -> array:
+        return self.arrays["lower"]
+
+    def _compute(self, candles: Sequence[Candle], start: int, stop: int) -> list:
+        series, first = self._window(candles, start, stop)
+        period = self.period
+        rows = []
+        for ndx in range(start, stop):
+            if ndx < period - 1:
+                rows.append((NAN, NAN, NAN))
+                continue
+            window = series[ndx - period + 1 - first : ndx + 1 - first]
+            mean = sum(window) / period
+            deviation = sqrt(sum((_ - mean) ** 2 for _ in window) / period)
+            band = self.width * deviation
+            rows.append((mean, mean + band, mean - band))
+        return rows
@@ -0,0 +1,156 @@
+"""Disjoint intervals of older candles held apart from a collector's cache.
+
+A collector's cache is one contiguous run of candles up to the latest, so
+reaching old candles by growing it means requesting every candle in
+between. CandleIntervals instead holds the candles of separate time
+intervals requested on their own, merging intervals as they meet, and
+hands them over to the cache once they reach it.
+"""
+
+from bisect import bisect_left
+from typing import List, Optional, Sequence, Tuple
+
+from oanda_candles.candle import Candle
+
+from .candle_segments import CandleSegments
+from .candle_store import CandleFrame, CandleStore
+
+
+def bisect_time(candles: Sequence[Candle], time: int) -> int:
+    """Get index of first of candles (sorted by time) at or after time."""
+    if isinstance(candles, (CandleFrame, CandleStore)):
+        return bisect_left(candles.times, time)
+    if isinstance(candles, CandleSegments):
+        return candles.bisect(time)
+    low, high = 0, len(candles)
+    while low < high:
+        middle = (low + high) // 2
+        if candles[middle].time < time:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class CandleInterval:
+    """All the candles with times from start up to (not including) stop."""
+
+    __slots__ = ("start", "stop", "candles")
+
+    def __init__(self, start: int, stop: int, candles: Sequence[Candle]):
+        self.start = start
+        self.stop = stop
+        self.candles = candles
+
+    def __repr__(self) -> str:
+        return f"CandleInterval({self.start}, {self.stop}, {len(self.candles)})"
+
+
+class CandleIntervals:
+    """Sorted disjoint intervals of candles.
+
+    Intervals that overlap or touch are merged into one, so there is
+    always a gap of uncovered time between any two of them.
+    """
+
+    def __init__(self, pair, columnar: bool = False, kinds: Tuple[str, ...] = ()):
+        """Initialize with no intervals.
+
+        Args:
+            pair: pair of the candles.
+            columnar: If True merged candles are kept in CandleStores.
+            kinds: price kinds of the candles (for CandleStores).
+        """
+        self.pair = pair
+        self.columnar = columnar
+        self.kinds = kinds
+        self.intervals: List[CandleInterval] = []
+
+    def __len__(self):
+        """Number of candles in all the intervals."""
+        return sum(len(_.candles) for _ in self.intervals)
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes used by interval candles kept in CandleStores."""
+        return sum(
+            _.candles.nbytes
+            for _ in self.intervals
+            if isinstance(_.candles, CandleStore)
+        )
+
+    def gaps(self, start: int, stop: int) -> List[Tuple[int, int]]:
+        """Get the spans of time from start to stop no interval covers."""
+        gaps = []
+        for interval in self.intervals:
+            if interval.stop <= start:
+                continue
+            if interval.start >= stop:
+                break
+            if interval.start > start:
+                gaps.append((start, interval.start))
+            start = max(start, interval.stop)
+        if start < stop:
+            gaps.append((start, stop))
+        return gaps
+
+    def find(self, start: int, stop: int) -> Optional[CandleInterval]:
+        """Get the interval covering all of start to stop, None if none does."""
+        for interval in self.intervals:
+            if interval.start <= start and stop <= interval.stop:
+                return interval
+        return None
+
+    def grab(self, start: int, stop: int) -> Sequence[Candle]:
+        """Get the candles from start to stop, which must be covered."""
+        candles = self.find(start, stop).candles
+        return candles[bisect_time(candles, start) : bisect_time(candles, stop)]
+
+    def add(self, start: int, stop: int, candles: Sequence[Candle]):
+        """Add candles of start to stop, merging intervals it meets."""
+        new = CandleInterval(start, stop, candles)
+        merging = [_ for _ in self.intervals if _.stop >= start and _.start <= stop] + [
+            new
+        ]
+        if len(merging) > 1:
+            merging.sort(key=lambda _: _.start)
+            new = CandleInterval(
+                merging[0].start, max(_.stop for _ in merging), self._merge(merging)
+            )
+        self.intervals = [_ for _ in self.intervals if _ not in merging]
+        self.intervals.insert(
+            bisect_left([_.start for _ in self.intervals], new.start), new
+        )
+
+    def absorb(self, cache: Sequence[Candle]) -> int:
+        """Move intervals reaching the first candle of cache into it.
+
+        Args:
+            cache: candles covering all time from the first one on.
+        Returns:
+            number of candles prepended to cache.
+        """
+        count = 0
+        while self.intervals and cache and self.intervals[-1].stop >= cache[0].time:
+            interval = self.intervals.pop()
+            older = interval.candles[: bisect_time(interval.candles, cache[0].time)]
+            cache[0:0] = older
+            count += len(older)
+        return count
+
+    def clear(self):
+        self.intervals.clear()
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    def _merge(self, intervals: List[CandleInterval]) -> Sequence[Candle]:
+        """Join candles of intervals (sorted by start) whose union has no gaps."""
+        merged = CandleStore(self.pair, kinds=self.kinds) if self.columnar else []
+        for interval in intervals:
+            candles = interval.candles
+            if len(merged):
+                candles = candles[bisect_time(candles, merged[-1].time + 1) :]
+            merged[len(merged) :] = candles
+        return merged
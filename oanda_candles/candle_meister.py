@@ -1,3 +1,4 @@
+from threading import Lock
 from typing import List, Optional
 
 from forex_types import Pair
@@ -15,14 +16,16 @@ class CandleMeister:
     __client: Optional[CandleClient] = None
     __token: Optional[str] = None
     __account_type: Optional[str] = None
+    __lock = Lock()
 
     @classmethod
     def init_meister(cls, token: str, real: bool = False):
         """Make a single internal CandleClient object."""
-        if (cls.__client is None) or (token != cls.__token) or (real != cls.__real):
-            cls.__client = CandleClient(token, real)
-            cls.__token = token
-            cls.__real = real
+        with cls.__lock:
+            if (cls.__client is None) or (token != cls.__token) or (real != cls.__real):
+                cls.__client = CandleClient(token, real)
+                cls.__token = token
+                cls.__real = real
 
     @classmethod
     def get_client(cls):
@@ -42,4 +45,4 @@ class CandleMeister:
         cls, pair: Pair, gran: Gran, offset: int, count: int
     ) -> List[Candle]:
         collector = cls.get_collector(pair, gran)
-        collector.grab_offset(offset, count)
+        return collector.grab_offset(offset, count)
@@ -0,0 +1,116 @@
+from threading import Lock
+from typing import Dict
+
+from forex_types import Pair
+
+from oanda_candles.gran import Gran
+
+
+class CandleObserver:
+    """Receives timing and size events from requesters and collectors.
+
+    The methods do nothing, subclasses override the ones they want. Pass
+    one to CandleClient (or CandleCollector/CandleRequester) as observer.
+    When there is none no events are made, so it costs nothing.
+    """
+
+    def on_request(self, pair: Pair, gran: Gran, seconds: float, nbytes: int):
+        """Called after each response is received.
+
+        Args:
+            pair: pair of the candles requested.
+            gran: granularity of the candles requested.
+            seconds: time from sending the request to having the whole body.
+            nbytes: size of the response body.
+        """
+
+    def on_parse(self, pair: Pair, gran: Gran, seconds: float, candles: int):
+        """Called after each response is parsed into candles.
+
+        Args:
+            pair: pair of the candles parsed.
+            gran: granularity of the candles parsed.
+            seconds: time taken to decode and build the candles.
+            candles: number of candles parsed.
+        """
+
+    def on_page(self, pair: Pair, gran: Gran, method: str, candles: int):
+        """Called for each page of candles prepend, backfill, extend,
+        get_between, or a collector's read ahead adds.
+
+        Args:
+            pair: pair of the candles.
+            gran: granularity of the candles.
+            method: "prepend", "backfill", "extend", "between", or "read_ahead".
+            candles: number of candles in the page.
+        """
+
+    def on_grab(self, pair: Pair, gran: Gran, method: str, hit: bool, seconds: float):
+        """Called after each grab from a collector.
+
+        Args:
+            pair: pair of the collector.
+            gran: granularity of the collector.
+            method: "grab", "grab_offset", or "grab_range".
+            hit: True if the grab was served from cache without requests.
+            seconds: time the grab took in all.
+        """
+
+
+class CandleStats(CandleObserver):
+    """Observer that adds up the events it receives (thread-safe)."""
+
+    def __init__(self):
+        self._lock = Lock()
+        self.reset()
+
+    def reset(self):
+        """Set all the totals back to zero."""
+        with self._lock:
+            self.requests = 0
+            self.request_seconds = 0.0
+            self.bytes = 0
+            self.candles = 0
+            self.parse_seconds = 0.0
+            self.pages: Dict[str, int] = {}
+            self.hits = 0
+            self.misses = 0
+            self.grab_seconds = 0.0
+
+    @property
+    def hit_rate(self) -> float:
+        """Fraction of grabs served from cache (0.0 if there were none)."""
+        grabs = self.hits + self.misses
+        return self.hits / grabs if grabs else 0.0
+
+    def on_request(self, pair: Pair, gran: Gran, seconds: float, nbytes: int):
+        with self._lock:
+            self.requests += 1
+            self.request_seconds += seconds
+            self.bytes += nbytes
+
+    def on_parse(self, pair: Pair, gran: Gran, seconds: float, candles: int):
+        with self._lock:
+            self.candles += candles
+            self.parse_seconds += seconds
+
+    def on_page(self, pair: Pair, gran: Gran, method: str, candles: int):
+        with self._lock:
+            self.pages[method] = self.pages.get(method, 0) + 1
+
+    def on_grab(self, pair: Pair, gran: Gran, method: str, hit: bool, seconds: float):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            self.grab_seconds += seconds
+
+    def __repr__(self) -> str:
+        return (
+            f"CandleStats(requests={self.requests}, "
+            f"request_seconds={self.request_seconds:.3f}, bytes={self.bytes}, "
+            f"candles={self.candles}, parse_seconds={self.parse_seconds:.3f}, "
+            f"pages={self.pages}, hits={self.hits}, misses={self.misses}, "
+            f"grab_seconds={self.grab_seconds:.3f})"
+        )
@@ -0,0 +1,176 @@
+"""Prices of many pairs aligned on candle times, for cross-pair analytics.
+
+A CandlePanel is a time by pair table of one price field (such as the mid
+close) held in a single float64 array, row by row, with NaN where a pair
+has no candle at a time. It can be viewed as a 2-D numpy array without
+copying when numpy is installed (pip install oanda-candles[numpy]).
+"""
+
+from array import array
+from math import isnan, nan
+from typing import Dict, List, Sequence, Tuple
+
+from forex_types import Pair
+
+from oanda_candles.candle import Candle, to_price_kinds
+
+from .candle_store import CandleFrame, CandleStore, TIME_TYPE
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover - depends on environment
+    numpy = None
+
+VALUE_TYPE = "d"
+# Ways of handling times some pairs have no candle at.
+MISSING = ("nan", "ffill", "drop")
+
+
+class CandlePanel:
+    """Time by pair table of one price field, NaN where a candle is missing."""
+
+    def __init__(self, pairs: Sequence[Pair], times: array, values: array):
+        """Initialize panel (see panel_of to make one from candles).
+
+        Args:
+            pairs: pairs of the columns.
+            times: epoch times of the rows, in order.
+            values: prices, row by row (len(times) * len(pairs) of them).
+        """
+        if len(values) != len(times) * len(pairs):
+            raise ValueError(
+                f"Expected {len(times) * len(pairs)} values but got {len(values)}"
+            )
+        self.pairs: Tuple[Pair, ...] = tuple(pairs)
+        self.times = times
+        self.values = values
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return len(self.times), len(self.pairs)
+
+    def row(self, ndx: int) -> memoryview:
+        """Get the prices of all the pairs at the time of row ndx (no copy)."""
+        width = len(self.pairs)
+        ndx = range(len(self.times))[ndx]
+        return memoryview(self.values)[ndx * width : (ndx + 1) * width]
+
+    def column(self, pair: Pair) -> array:
+        """Get the prices of pair at each time."""
+        width = len(self.pairs)
+        return self.values[self.pairs.index(pair) :: width]
+
+    def missing(self) -> int:
+        """Count the prices that are missing (NaN)."""
+        return sum(1 for _ in self.values if isnan(_))
+
+    def fill_forward(self) -> "CandlePanel":
+        """Get panel with missing prices filled from the time before.
+
+        Prices missing before a pair's first candle stay NaN.
+        """
+        values = array(VALUE_TYPE, self.values)
+        width = len(self.pairs)
+        for ndx in range(width, len(values)):
+            if isnan(values[ndx]):
+                values[ndx] = values[ndx - width]
+        return CandlePanel(self.pairs, array(TIME_TYPE, self.times), values)
+
+    def drop_missing(self) -> "CandlePanel":
+        """Get panel of only the times every pair has a candle at."""
+        width = len(self.pairs)
+        times = array(TIME_TYPE)
+        values = array(VALUE_TYPE)
+        for ndx, time in enumerate(self.times):
+            row = self.values[ndx * width : (ndx + 1) * width]
+            if not any(isnan(_) for _ in row):
+                times.append(time)
+                values.extend(row)
+        return CandlePanel(self.pairs, times, values)
+
+    def to_numpy(self):
+        """View prices as a 2-D numpy array of float64 (needs numpy).
+
+        The array shares memory with the panel, rows are times and columns
+        are pairs in the order of pairs.
+        """
+        if numpy is None:
+            raise ImportError(
+                "numpy is needed for numpy arrays: pip install oanda-candles[numpy]"
+            )
+        return numpy.frombuffer(self.values, numpy.float64).reshape(self.shape)
+
+    def __repr__(self) -> str:
+        rows, columns = self.shape
+        return f"CandlePanel({rows} times x {columns} pairs)"
+
+
+def panel_of(
+    candles: Dict[Pair, Sequence[Candle]],
+    count: int,
+    side: str = "mid",
+    field: str = "c",
+    missing: str = "nan",
+) -> CandlePanel:
+    """Align the candles of many pairs on their times.
+
+    The rows are the latest count times any of the pairs has a candle at.
+
+    Args:
+        candles: candles of each pair (lists, CandleStores, or CandleFrames,
+            of the same gran), in the column order wanted.
+        count: most times (rows) to have.
+        side: price kind, such as PriceKind.MID (or QuoteKind.MID).
+        field: one of "o", "h", "l", or "c".
+        missing: what to do at times a pair has no candle at, "nan" leaves
+            the price NaN, "ffill" fills it from the time before (see
+            fill_forward), and "drop" drops the time (see drop_missing).
+    Returns:
+        CandlePanel of prices as floats.
+    """
+    if missing not in MISSING:
+        raise ValueError(f"Expected missing to be one of {MISSING} but got {missing}")
+    if field not in ("o", "h", "l", "c"):
+        raise ValueError(f"Expected field to be o, h, l, or c but got {field}")
+    (side,) = to_price_kinds([side])
+    pairs = list(candles)
+    columns = [_times_and_prices(candles[_], _, side, field) for _ in pairs]
+    times = sorted(set().union(*(_[0] for _ in columns)))[-count:] if count else []
+    rows = {time: ndx for ndx, time in enumerate(times)}
+    width = len(pairs)
+    values = array(VALUE_TYPE, [nan]) * (len(times) * width)
+    for column, (pair_times, prices) in enumerate(columns):
+        for time, price in zip(pair_times, prices):
+            row = rows.get(time)
+            if row is not None:
+                values[row * width + column] = price
+    panel = CandlePanel(pairs, array(TIME_TYPE, times), values)
+    if missing == "ffill":
+        return panel.fill_forward()
+    if missing == "drop":
+        return panel.drop_missing()
+    return panel
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _times_and_prices(
+    candles: Sequence[Candle], pair: Pair, side: str, field: str
+) -> Tuple[Sequence[int], List[float]]:
+    """Get the times and the prices (as floats) of one field of candles."""
+    # Dividing fractional pips gives the float nearest the quoted price.
+    fpu = pair.quote.fpu
+    if isinstance(candles, CandleStore):
+        candles = candles.frame()
+    if isinstance(candles, CandleFrame):
+        return candles.times, [_ / fpu for _ in candles.column(side, field)]
+    return (
+        [_.time for _ in candles],
+        [getattr(getattr(_, side), f"{field}_fp") / fpu for _ in candles],
+    )
@@ -0,0 +1,162 @@
+"""Bulk decoding of V20 candle query responses.
+
+The json decoder used is orjson when it is installed, otherwise the
+standard library json module.
+
+Responses can also be decoded as they arrive, a chunk at a time (see
+CandleChunks), so that neither the whole body nor a dict tree of all its
+candles is ever held at once.
+"""
+
+from array import array
+from typing import Iterable, Iterator, List
+
+from forex_types import Pair
+
+from .candle import Candle, PRICE_KINDS
+from .candle_store import CandleFrame, FLAG_TYPE, PRICE_TYPE, TIME_TYPE, kind_columns
+
+try:
+    from orjson import loads
+except ImportError:  # pragma: no cover - depends on environment
+    from json import loads
+
+
+def price_places(pair: Pair) -> int:
+    """Number of decimal places in prices quoted for pair (5, or 3 for yen)."""
+    return len(str(pair.quote.fpu)) - 1
+
+
+def to_frac_pips(text: str, places: int) -> int:
+    """Convert price text with up to places decimal places to fractional pips."""
+    whole, _, frac = text.partition(".")
+    return int(whole + (frac + "0" * places)[:places])
+
+
+def parse_candles(body: bytes) -> List[Candle]:
+    """Decode V20 candle response body into list of Candle objects."""
+    return [Candle.from_oanda(_) for _ in loads(body)["candles"]]
+
+
+def parse_frame(
+    body: bytes, pair: Pair, kinds: Iterable[str] = PRICE_KINDS
+) -> CandleFrame:
+    """Decode V20 candle response body straight into columns.
+
+    Prices are converted from their text form directly to fractional pips
+    without building any Price or Decimal objects, one column at a time.
+
+    Args:
+        body: raw bytes of candle query response.
+        pair: pair the candles are for (determines decimal places of prices).
+        kinds: price kinds that were requested.
+    Returns:
+        CandleFrame over freshly allocated columns.
+    """
+    return frame_of(loads(body)["candles"], pair, kinds)
+
+
+def frame_of(
+    candles: List[dict], pair: Pair, kinds: Iterable[str] = PRICE_KINDS
+) -> CandleFrame:
+    """Convert decoded V20 candle dicts into columns (see parse_frame)."""
+    places = price_places(pair)
+    times = array(TIME_TYPE, [int(_["time"].partition(".")[0]) for _ in candles])
+    flags = array(FLAG_TYPE, [_["complete"] for _ in candles])
+    prices = {
+        (kind, field): array(
+            PRICE_TYPE, [to_frac_pips(_[kind][field], places) for _ in candles]
+        )
+        for kind, field in kind_columns(kinds)
+    }
+    return CandleFrame.from_arrays(pair, times, flags, prices)
+
+
+class CandleChunks:
+    """Splits a V20 candle response arriving in pieces into its candles.
+
+    Feed it the pieces of the body in order and it decodes the candles
+    that are complete so far, holding on to no more of the body than the
+    part of a candle cut off at the end of a piece. Candles are found by
+    their braces, as none of the strings in a V20 candle response have
+    braces in them.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+        # Whether the buffer is past the start of the candles array.
+        self._started = False
+
+    def feed(self, data: bytes) -> List[dict]:
+        """Decode the candles completed by the next piece of the body."""
+        buffer = self._buffer + data
+        if not self._started:
+            start = buffer.find(b"[")
+            if start < 0:
+                self._buffer = buffer
+                return []
+            buffer = buffer[start + 1 :]
+            self._started = True
+        end = self._end(buffer)
+        self._buffer = buffer[end:]
+        if not end:
+            return []
+        # The candles are separated by commas, so make one array of them.
+        return loads(b"[" + buffer[buffer.find(b"{") : end] + b"]")
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    @staticmethod
+    def _end(buffer: bytes) -> int:
+        """Get index just past the last complete candle in buffer, 0 if none.
+
+        The buffer starts between candles (inside the array, which is inside
+        the response object), so the brace depth at its end follows from
+        the counts of braces, and the last complete candle is found walking
+        back from there until a closing brace leaves depth 1.
+        """
+        depth = 1 + buffer.count(b"{") - buffer.count(b"}")
+        high = len(buffer)
+        while True:
+            opened = buffer.rfind(b"{", 0, high)
+            closed = buffer.rfind(b"}", 0, high)
+            if closed < 0:
+                return 0
+            if closed > opened:
+                if depth == 1:
+                    return closed + 1
+                depth += 1
+                high = closed
+            else:
+                depth -= 1
+                high = opened
+
+
+def iter_candles(chunks: Iterable[bytes]) -> Iterator[List[Candle]]:
+    """Decode a V20 candle response body arriving in chunks.
+
+    Yields:
+        list of the Candle objects completed by each chunk (if any were).
+    """
+    splitter = CandleChunks()
+    for chunk in chunks:
+        candles = splitter.feed(chunk)
+        if candles:
+            yield [Candle.from_oanda(_) for _ in candles]
+
+
+def iter_frames(
+    chunks: Iterable[bytes], pair: Pair, kinds: Iterable[str] = PRICE_KINDS
+) -> Iterator[CandleFrame]:
+    """Decode a V20 candle response body arriving in chunks into columns.
+
+    Yields:
+        CandleFrame of the candles completed by each chunk (if any were).
+    """
+    splitter = CandleChunks()
+    for chunk in chunks:
+        candles = splitter.feed(chunk)
+        if candles:
+            yield frame_of(candles, pair, kinds)
@@ -0,0 +1,218 @@
+"""Replay recorded candles against a simulated clock, for backtesting.
+
+A ReplayClient is a CandleClient whose collectors get their candles from
+recorded ones (a CandleArchive, such as the cache_dir of a client, or a
+mapping of candles) instead of Oanda. Only candles that started by the
+time on its clock are ever given, the latest as an incomplete candle
+whose prices are all its open (the rest of it has not happened yet), so
+code run against it can not see the future. Nothing is requested over
+HTTP, so history replays as fast as the candles can be sliced.
+"""
+
+from bisect import bisect_left, bisect_right
+from typing import Dict, Iterable, Iterator, Mapping, Optional, Sequence, Tuple, Union
+
+from forex_types import Pair
+
+from oanda_candles.candle import Candle, to_price_kinds
+from oanda_candles.gran import Gran
+
+from .candle_archive import CandleArchive
+from .candle_client import CandleClient
+from .candle_collector import CandleCollector
+from .candle_observer import CandleObserver
+from .candle_requester import LocalRequester
+from .candle_store import CandleFrame, CandleStore
+from .market_calendar import MarketCalendar
+
+
+class ReplayClock:
+    """Simulated epoch time that only moves when told to."""
+
+    def __init__(self, time: int):
+        self.time = int(time)
+
+    def __call__(self) -> int:
+        return self.time
+
+    def advance(self, seconds: int) -> int:
+        self.time += int(seconds)
+        return self.time
+
+    def set(self, time: int) -> int:
+        self.time = int(time)
+        return self.time
+
+
+class ReplayRequester(LocalRequester):
+    """Requester answering requests from a replay client's recorded candles."""
+
+    def __init__(
+        self,
+        client: "ReplayClient",
+        pair: Pair,
+        gran: Gran,
+        columnar: bool = False,
+        kinds: Optional[Iterable[str]] = None,
+        observer: Optional[CandleObserver] = None,
+    ):
+        super().__init__(client, pair, gran, columnar, kinds, observer)
+        self.client = client
+        self.clock = client.clock
+        self._recorded: Dict[Tuple[str, ...], CandleFrame] = {}
+
+    def recorded(self, kinds: Tuple[str, ...]) -> CandleFrame:
+        """Get all the recorded candles with price kinds (loaded once)."""
+        frame = self._recorded.get(kinds)
+        if frame is None:
+            frame = self._recorded[kinds] = self.client.load(
+                self.pair, self.gran, kinds
+            )
+        return frame
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    def _request(
+        self,
+        count: int = None,
+        before: int = None,
+        after: int = None,
+        kinds: Optional[Iterable[str]] = None,
+    ) -> Sequence[Candle]:
+        """Slice the recorded candles as Oanda would answer the request."""
+        kinds = self.kinds if kinds is None else to_price_kinds(kinds)
+        self._count_request()
+        recorded = self.recorded(kinds)
+        now = self.clock()
+        times = recorded.times
+        start = 0 if after is None else bisect_left(times, after)
+        stop = bisect_right(times, now)
+        if before is not None:
+            stop = min(stop, bisect_left(times, before))
+        if count is None and (after is None or before is None):
+            count = 500
+        if count is not None:
+            if after is not None:
+                stop = min(stop, start + count)
+            else:
+                start = max(start, stop - count)
+        candles = CandleStore(self.pair, recorded[start:stop], kinds)
+        if stop > start and times[stop - 1] + self.gran.duration > now:
+            # Only the open of the latest candle has happened yet.
+            candles.flags[-1] = 0
+            for kind in kinds:
+                opened = candles.prices[(kind, "o")][-1]
+                for field in "hlc":
+                    candles.prices[(kind, field)][-1] = opened
+        if self.columnar:
+            return candles.frame()
+        return candles.frame().candles()
+
+
+class ReplayCollector(CandleCollector):
+    """Collector of a ReplayClient, it refreshes whenever its clock moved."""
+
+    def __init__(self, client: "ReplayClient", pair: Pair, gran: Gran, **kwargs):
+        super().__init__(client, pair, gran, **kwargs)
+        self.requester = ReplayRequester(
+            client,
+            pair,
+            gran,
+            columnar=self.requester.columnar,
+            kinds=self.kinds,
+            observer=self.observer,
+        )
+        # Clock time of the last refresh.
+        self.replayed_to: Optional[int] = None
+
+    def update_recent(self) -> bool:
+        with self._lock:
+            if self.replayed_to != self.requester.clock() and self.closed_until is None:
+                self.refresh()
+                return True
+            return False
+
+    def refresh(self):
+        self.replayed_to = self.requester.clock()
+        super().refresh()
+
+
+class ReplayClient(CandleClient):
+    """CandleClient that replays recorded candles as of a simulated time.
+
+    For example, to step through a month of M5 candles:
+
+        client = ReplayClient(cache_dir, start)
+        for now in client.run(start + 30 * 86400, 300):
+            candles = client.grab(Pair.EUR_USD, Gran.M5, 50)
+    """
+
+    collector_class = ReplayCollector
+
+    def __init__(
+        self,
+        source: Union[str, CandleArchive, Mapping[Tuple[Pair, Gran], Sequence]],
+        start: int,
+        columnar: bool = False,
+        max_candles: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        observer: Optional[CandleObserver] = None,
+        resample: Optional[Dict[Gran, Gran]] = None,
+    ):
+        """Initialize client with its clock at start.
+
+        Args:
+            source: recorded candles, a CandleArchive (or the directory of
+                one, e.g. the cache_dir of a CandleClient) or a mapping of
+                (pair, gran) to candles (list, CandleStore, or CandleFrame,
+                such as the candles of a CandleBatch).
+            start: epoch time the clock starts at.
+            columnar: as for CandleClient.
+            max_candles: as for CandleClient.
+            max_bytes: as for CandleClient.
+            observer: as for CandleClient.
+            resample: as for CandleClient, so only the candles of the finer
+                granularities need to have been recorded.
+        """
+        self.clock = ReplayClock(start)
+        self.source = CandleArchive(source) if isinstance(source, str) else source
+        super().__init__(
+            "replay",
+            columnar=columnar,
+            max_candles=max_candles,
+            max_bytes=max_bytes,
+            root_url="replay://",
+            observer=observer,
+            calendar=MarketCalendar(self.clock),
+            resample=resample,
+        )
+
+    @property
+    def now(self) -> int:
+        """Time on the simulated clock."""
+        return self.clock()
+
+    def advance(self, seconds: int) -> int:
+        """Move the clock forward seconds, return the new time."""
+        return self.clock.advance(seconds)
+
+    def set_time(self, time: int) -> int:
+        """Move the clock to time (going back drops what was collected)."""
+        if time < self.clock():
+            for collector in self.collectors():
+                collector.clear()
+        return self.clock.set(time)
+
+    def run(self, end: int, step: int) -> Iterator[int]:
+        """Advance the clock step seconds at a time up to end, yielding each time."""
+        while self.clock() + step <= end:
+            yield self.clock.advance(step)
+
+    def load(self, pair: Pair, gran: Gran, kinds: Tuple[str, ...]) -> CandleFrame:
+        """Get recorded candles of pair and gran, with price kinds."""
+        if isinstance(self.source, CandleArchive):
+            return self.source.load(pair, gran, kinds)
+        candles = self.source.get((pair, gran), ())
+        return CandleStore(pair, candles, kinds).frame()
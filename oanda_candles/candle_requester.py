@@ -1,24 +1,55 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter
 from requests import Session
-from typing import List
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple
 from urllib.parse import urljoin
 
 from forex_types import Pair
 from time_int import TimeInt
 
 from oanda_candles.gran import Gran
-from oanda_candles.candle import Candle
+from oanda_candles.candle import Candle, oanda_price, to_price_kinds
+
+from .candle_observer import CandleObserver
+from .candle_parser import CandleChunks, frame_of
+from .candle_segments import CandleSegments
+from .candle_store import CandleFrame, CandleStore
+from .market_calendar import FOREX_CALENDAR, MarketCalendar
 
 
 class UrlRoot:
     real_url = "https://api-fxtrade.oanda.com"
     practice_url = "https://api-fxpractice.oanda.com"
+    real_stream_url = "https://stream-fxtrade.oanda.com"
+    practice_stream_url = "https://stream-fxpractice.oanda.com"
 
 
 class CandleRequester:
-    def __init__(self, client, pair: Pair, gran: Gran):
+
+    # Bytes of a response read (and decoded) at a time.
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(
+        self,
+        client,
+        pair: Pair,
+        gran: Gran,
+        columnar: bool = False,
+        kinds: Optional[Iterable[str]] = None,
+        observer: Optional[CandleObserver] = None,
+    ):
+        self.pair = pair
+        self.gran = gran
+        self.columnar = columnar
+        self.kinds = to_price_kinds(kinds)
+        self.observer = observer
+        # Number of requests made, collectors compare it to tell cache hits.
+        # Requests can be made from many threads at once (see backfill).
+        self.request_count = 0
+        self._count_lock = Lock()
         self.session: Session = client.session
-        root_url = UrlRoot.real_url if client.real else UrlRoot.practice_url
-        self.url = urljoin(root_url, f"/v3/instruments/{pair}/candles")
+        self.url = urljoin(client.root_url, f"/v3/instruments/{pair}/candles")
         self.headers = {
             "Accept-Datetime-Format": "UNIX",
             "Authorization": f"Bearer {client.token}",
@@ -28,54 +59,215 @@ class CandleRequester:
             "alignmentTimezone": "Etc/GMT+1",
             "dailyAlignment": 23,
             "granularity": str(gran),
-            "price": "BAM",
+            "price": oanda_price(self.kinds),
             "weeklyAlignment": "Sunday",
         }
         self.history_reached: bool = False
 
-    def get(self, count: int) -> List[Candle]:
+    def get(self, count: int) -> Sequence[Candle]:
         """Request the most recent count candles."""
         if count < 5000:
             return self._request(count=count)
         candles = self._request(count=2000)
+        if self.columnar:
+            candles = CandleStore(self.pair, candles, self.kinds)
+        else:
+            candles = CandleSegments(candles)
         if len(candles) >= 2000:
             extra = count - 2000
             self.prepend(candles, extra)
         return candles
 
-    def get_before(self, time: TimeInt, count: int) -> List[Candle]:
+    def get_before(self, time: TimeInt, count: int) -> Sequence[Candle]:
         return self._request(count=count, before=time)
 
-    def get_after(self, time: TimeInt):
-        return self._request(after=time)
+    def get_after(
+        self,
+        time: TimeInt,
+        count: Optional[int] = None,
+        kinds: Optional[Iterable[str]] = None,
+    ) -> Sequence[Candle]:
+        """Request candles starting at time.
+
+        Args:
+            time: time of the first candle.
+            count: number of candles, None for Oanda's default of 500.
+            kinds: price kinds to request if not the ones of this requester.
+        """
+        return self._request(count=count, after=time, kinds=kinds)
+
+    def get_between(
+        self, start: int, end: int, kinds: Optional[Iterable[str]] = None
+    ) -> Sequence[Candle]:
+        """Request all the candles with times from start up to (not including) end.
+
+        Spans of more than 5000 candle durations are requested in windows
+        of that many, as Oanda gives at most 5000 candles per request.
+
+        Args:
+            start: time of the earliest candle.
+            end: time to stop before.
+            kinds: price kinds to request if not the ones of this requester.
+        """
+        kinds = self.kinds if kinds is None else to_price_kinds(kinds)
+        span = 5000 * self.gran.duration
+        candles = CandleStore(self.pair, kinds=kinds) if self.columnar else []
+        for after in range(start, end, span):
+            page = self._request(
+                after=after, before=min(end, after + span), kinds=kinds
+            )
+            if self.observer is not None:
+                self.observer.on_page(self.pair, self.gran, "between", len(page))
+            candles[len(candles) :] = page
+        return candles
+
+    def stream(
+        self,
+        count: Optional[int] = None,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        kinds: Optional[Iterable[str]] = None,
+    ) -> Iterator[Sequence[Candle]]:
+        """Request candles, decoding the response as it arrives.
+
+        The body is read CHUNK_SIZE bytes at a time and the candles
+        completed by each chunk are decoded on their own, so memory used
+        for decoding does not grow with the number of candles requested.
+
+        Args:
+            count: number of candles (Oanda's default of 500 if None).
+            before: time candles are to be before.
+            after: time of the first candle.
+            kinds: price kinds to request if not the ones of this requester.
+        Yields:
+            list of candles, or CandleFrame if columnar, for each chunk that
+            completed any candles.
+        """
+        kinds = self.kinds if kinds is None else to_price_kinds(kinds)
+        params = self._params(count, before, after, kinds)
+        self._count_request()
+        start = perf_counter()
+        response = self.session.get(
+            self.url, headers=self.headers, params=params, stream=True
+        )
+        waited = perf_counter() - start
+        decoding = 0.0
+        nbytes = 0
+        decoded = 0
+        try:
+            response.raise_for_status()
+            splitter = CandleChunks()
+            chunks = response.iter_content(self.CHUNK_SIZE)
+            while True:
+                start = perf_counter()
+                data = next(chunks, None)
+                parsing = perf_counter()
+                waited += parsing - start
+                if data is None:
+                    break
+                nbytes += len(data)
+                candles = self._decode(splitter.feed(data), kinds)
+                decoding += perf_counter() - parsing
+                if candles:
+                    decoded += len(candles)
+                    yield candles
+        finally:
+            response.close()
+            if self.observer is not None:
+                self.observer.on_request(self.pair, self.gran, waited, nbytes)
+        if self.observer is not None:
+            self.observer.on_parse(self.pair, self.gran, decoding, decoded)
 
     def prepend(self, candles: List[Candle], count: int) -> bool:
-        """Prepend candles to front of a list (recurse if needed).
+        """Prepend candles to front of a list, a page at a time.
 
         Args:
-            candles: list of candles that is prepended with older candles.
+            candles: list (or CandleSegments or CandleStore) of candles that
+                is prepended with older candles.
             count: number of candles to prepend. If 0 or less do nothing.
         Returns:
             True if the requested number of candles is provided.
             False if Oanda ran out of candles to give us.
         """
-        if count <= 0:
-            return True
-        first_candle_time = candles[0].time if candles else TimeInt.now()
-        pull_size = count if count <= 5000 else 2000
-        new_candles = self._request(count=pull_size, before=first_candle_time)
-        if len(new_candles):
+        while count > 0:
+            first_candle_time = _time_at(candles, 0) if candles else TimeInt.now()
+            pull_size = count if count <= 5000 else 2000
+            new_candles = self._request(count=pull_size, before=first_candle_time)
+            if self.observer is not None:
+                self.observer.on_page(self.pair, self.gran, "prepend", len(new_candles))
             candles[0:0] = new_candles
             if len(new_candles) < pull_size:
                 return False
-            else:
-                if count > pull_size:
-                    return self.prepend(candles, count - pull_size)
-                return True
-        return False
+            count -= pull_size
+        return True
+
+    def backfill(
+        self,
+        candles: List[Candle],
+        count: int,
+        workers: int = 4,
+        calendar: Optional[MarketCalendar] = None,
+    ) -> bool:
+        """Prepend candles to front of a list fetching windows in parallel.
+
+        Rather than walking back one page at a time like prepend, the time
+        count candles take is split into windows of about 2000 candles each
+        (per the market calendar, so weekends are skipped over) that are
+        requested concurrently by their from and to times. Windows that come
+        back short (e.g. from holidays) are fine, the next round continues
+        from the earliest time covered until count candles are provided.
+
+        Args:
+            candles: list of candles that is prepended with older candles.
+            count: number of candles to prepend. If 0 or less do nothing.
+            workers: maximum number of requests in flight at once.
+            calendar: market hours to size windows by (FOREX_CALENDAR if None).
+        Returns:
+            True if the requested number of candles is provided.
+            False if Oanda ran out of candles to give us.
+        """
+        calendar = FOREX_CALENDAR if calendar is None else calendar
+        end = _time_at(candles, 0) if candles else TimeInt.now()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while count > 0:
+                windows = []
+                wanted = count
+                window_end = end
+                while wanted > 0:
+                    size = min(wanted, 2000)
+                    start = self._window_start(window_end, size, calendar)
+                    windows.append((start, window_end))
+                    window_end = start
+                    wanted -= size
+                pages = pool.map(
+                    lambda _: self._request(after=_[0], before=_[1]), windows
+                )
+                found = 0
+                for page in pages:
+                    if self.observer is not None:
+                        self.observer.on_page(
+                            self.pair, self.gran, "backfill", len(page)
+                        )
+                    found += self._prepend_page(candles, page)
+                end = windows[-1][0]
+                if not found:
+                    # The windows could all have landed in a market holiday or
+                    # before the start of history, a count request tells these
+                    # apart.
+                    found = self._prepend_page(
+                        candles, self._request(count=min(count, 5000), before=end)
+                    )
+                    if not found:
+                        return False
+                    end = _time_at(candles, 0)
+                count -= found
+        return True
 
     def extend(self, candles: List[Candle]) -> bool:
-        """Extend candles to back of a list up to current time (recurse if needed).
+        """Extend candles to back of a list up to current time.
+
+        The last candle (which may have been incomplete) is replaced by the
+        first one requested, as it starts at the same time.
 
         Args:
             candles: list of candles that is extended with newer candles.
@@ -83,31 +275,124 @@ class CandleRequester:
             True if the last candle we end up with is complete
             False if the lst candle we end up with is partial
         """
-        if candles:
-            last_candle_time = candles[-1].time
+        if not candles:
+            candles[:] = self._request(count=100)
+            return candles[-1].complete
+        while True:
+            last_candle_time = _time_at(candles, -1)
             new_candles = self._request(after=last_candle_time, count=5000)
+            if self.observer is not None:
+                self.observer.on_page(self.pair, self.gran, "extend", len(new_candles))
             candles[-1:] = new_candles
-            if len(new_candles) >= 5000:
-                self.extend(candles)
-        else:
-            candles[:] = self._request(count=100)
+            if len(new_candles) < 5000:
+                break
         return candles[-1].complete
 
     # ---------------------------------------------------------------------------
     # Helpers
     # ---------------------------------------------------------------------------
 
+    def _count_request(self):
+        with self._count_lock:
+            self.request_count += 1
+
+    def _window_start(self, end: int, size: int, calendar: MarketCalendar) -> int:
+        """Get start of window ending at end the market has size candles in."""
+        duration = self.gran.duration
+        start = end - size * duration
+        # Each pass moves start back by the candles still missing, which
+        # steps over a weekend at a time.
+        for _ in range(8):
+            missing = size - calendar.candle_count(start, end, self.gran)
+            if missing <= 0:
+                break
+            start -= missing * duration
+        return start
+
+    @staticmethod
+    def _prepend_page(candles: List[Candle], page: Sequence[Candle]) -> int:
+        """Prepend the part of page older than candles, return how many."""
+        size = len(page)
+        if candles:
+            first_time = _time_at(candles, 0)
+            while size and _time_at(page, size - 1) >= first_time:
+                size -= 1
+        if size:
+            candles[0:0] = page[:size]
+        return size
+
     def _request(
-        self, count: int = None, before: int = None, after: int = None
-    ) -> List[Candle]:
+        self,
+        count: int = None,
+        before: int = None,
+        after: int = None,
+        kinds: Optional[Iterable[str]] = None,
+    ) -> Sequence[Candle]:
+        """Make request, gathering the pieces it streams into one sequence."""
+        kinds = self.kinds if kinds is None else to_price_kinds(kinds)
+        pieces = self.stream(count, before, after, kinds)
+        candles = next(pieces, None)
+        if candles is None:
+            return self._decode([], kinds)
+        for piece in pieces:
+            if isinstance(candles, CandleFrame):
+                candles = CandleStore(self.pair, candles, candles.kinds)
+            candles[len(candles) :] = piece
+        if isinstance(candles, CandleStore):
+            return candles.frame()
+        return candles
+
+    def _params(
+        self,
+        count: Optional[int],
+        before: Optional[int],
+        after: Optional[int],
+        kinds: Tuple[str, ...],
+    ) -> dict:
         params = dict(self.params)
+        params["price"] = oanda_price(kinds)
         if count is not None:
             params["count"] = count
         if after is not None:
             params["from"] = after
         if before is not None:
             params["to"] = before
-        response = self.session.get(self.url, headers=self.headers, params=params)
-        response.raise_for_status()
-        data = response.json()
-        return [Candle.from_oanda(_) for _ in data["candles"]]
+        return params
+
+    def _decode(self, candles: List[dict], kinds: Tuple[str, ...]) -> Sequence[Candle]:
+        if self.columnar:
+            return frame_of(candles, self.pair, kinds)
+        return [Candle.from_oanda(_) for _ in candles]
+
+
+class LocalRequester(CandleRequester):
+    """Requester answering requests from candles at hand rather than HTTP.
+
+    Subclasses implement _request to answer a request the way Oanda would,
+    and the candles are streamed in one piece.
+    """
+
+    def stream(
+        self,
+        count: Optional[int] = None,
+        before: Optional[int] = None,
+        after: Optional[int] = None,
+        kinds: Optional[Iterable[str]] = None,
+    ) -> Iterator[Sequence[Candle]]:
+        """Yield the candles of the request in one piece."""
+        candles = self._request(count, before, after, kinds)
+        if len(candles):
+            yield candles
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+
+
+def _time_at(candles: Sequence[Candle], ndx: int) -> int:
+    """Get time of candles[ndx], from the times column of a CandleStore or
+    CandleFrame rather than building a Candle."""
+    if isinstance(candles, (CandleStore, CandleFrame)):
+        return candles.times[ndx]
+    return candles[ndx].time
@@ -0,0 +1,297 @@
+"""Build candles of a coarser granularity from candles of a finer one.
+
+Candles are bucketed the way CandleRequester asks Oanda to align them:
+days start at 00:00 UTC (dailyAlignment 23 in Etc/GMT+1), weeks on Sunday
+(weeklyAlignment), and months on the first of the month. Granularities
+under a day are counted from the epoch, as Oanda's are, so for example a
+resampled H4 candle starts when the H4 candle from Oanda would.
+
+A CandleClient made with resample={Gran.H1: Gran.M5} collects H1 candles
+with a ResampledCollector, which builds them from the candles of the
+client's M5 collector instead of requesting them. Only the M5 candles are
+ever requested, and the two series always agree with each other.
+"""
+
+from array import array
+from bisect import bisect_left
+from typing import Any, Iterable, Optional, Sequence, Tuple
+
+from forex_types import Pair
+
+from oanda_candles.candle import Candle, to_price_kinds
+from oanda_candles.gran import Gran, bucket_end, bucket_start
+
+from .candle_collector import CandleCollector
+from .candle_observer import CandleObserver
+from .candle_requester import LocalRequester
+from .candle_store import (
+    CandleFrame,
+    FLAG_TYPE,
+    PRICE_TYPE,
+    TIME_TYPE,
+    kind_columns,
+    to_frame,
+)
+from .gran_unit import SecondsPer
+from .market_calendar import FOREX_CALENDAR, MarketCalendar
+
+
+def can_resample(source_gran: Gran, gran: Gran) -> bool:
+    """Tell if candles of gran can be built from candles of source_gran.
+
+    Every candle of gran has to be made of whole candles of source_gran,
+    so source_gran has to divide gran (or divide a day, for weeks and months).
+    """
+    if source_gran.duration >= gran.duration:
+        return False
+    if gran.duration > SecondsPer.DAY:
+        return SecondsPer.DAY % source_gran.duration == 0
+    return gran.duration % source_gran.duration == 0
+
+
+def resample(
+    candles: Sequence[Candle],
+    pair: Pair,
+    source_gran: Gran,
+    gran: Gran,
+    kinds: Optional[Iterable[str]] = None,
+    calendar: Optional[MarketCalendar] = None,
+) -> CandleFrame:
+    """Build candles of gran from consecutive candles of a finer granularity.
+
+    Works a column at a time: the candles of each bucket are found by
+    bisecting the times, and the high and low are the max and min of slices
+    of the price columns. A resampled candle is complete when all of its
+    candles are, and no more of them can come (a later bucket has candles,
+    or the market is closed for the rest of it per the calendar).
+
+    Args:
+        candles: candles of source_gran in order (list, CandleStore, or
+            CandleFrame), starting at the start of a bucket of gran.
+        pair: pair of the candles.
+        source_gran: granularity of candles.
+        gran: granularity to build (see can_resample).
+        kinds: price kinds to build, None for all those candles have.
+        calendar: market hours (FOREX_CALENDAR if None).
+    Returns:
+        CandleFrame over freshly allocated columns.
+    """
+    calendar = FOREX_CALENDAR if calendar is None else calendar
+    frame = to_frame(candles, pair, kinds)
+    kinds = frame.kinds if kinds is None else to_price_kinds(kinds)
+    source_times = frame.times
+    source_flags = frame.flags
+    columns = kind_columns(kinds)
+    times = array(TIME_TYPE)
+    flags = array(FLAG_TYPE)
+    prices = {col: array(PRICE_TYPE) for col in columns}
+    size = len(source_times)
+    first = 0
+    while first < size:
+        start = bucket_start(source_times[first], gran)
+        end = bucket_end(start, gran)
+        stop = bisect_left(source_times, end, first)
+        times.append(start)
+        last_end = source_times[stop - 1] + source_gran.duration
+        flags.append(
+            all(source_flags[first:stop])
+            and (stop < size or calendar.candle_count(last_end, end, source_gran) == 0)
+        )
+        for kind in kinds:
+            prices[(kind, "o")].append(frame.prices[(kind, "o")][first])
+            prices[(kind, "h")].append(max(frame.prices[(kind, "h")][first:stop]))
+            prices[(kind, "l")].append(min(frame.prices[(kind, "l")][first:stop]))
+            prices[(kind, "c")].append(frame.prices[(kind, "c")][stop - 1])
+        first = stop
+    return CandleFrame.from_arrays(pair, times, flags, prices)
+
+
+class ResampledRequester(LocalRequester):
+    """Requester answering requests by resampling another collector's candles.
+
+    Requests are answered as Oanda would answer them for gran, from the
+    candles of the client's collector of the same pair and source_gran.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        pair: Pair,
+        gran: Gran,
+        source_gran: Gran,
+        columnar: bool = False,
+        kinds: Optional[Iterable[str]] = None,
+        observer: Optional[CandleObserver] = None,
+        calendar: Optional[MarketCalendar] = None,
+    ):
+        super().__init__(client, pair, gran, columnar, kinds, observer)
+        self.client = client
+        self.source_gran = source_gran
+        self.calendar = FOREX_CALENDAR if calendar is None else calendar
+        # The source collector's last_update as of the latest request.
+        self.synced: Optional[float] = None
+
+    @property
+    def source(self) -> CandleCollector:
+        """Collector of the candles resampled (made when first needed)."""
+        return self.client.get_collector(self.pair, self.source_gran, self.kinds)
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    def _request(
+        self,
+        count: int = None,
+        before: int = None,
+        after: int = None,
+        kinds: Optional[Iterable[str]] = None,
+    ) -> Sequence[Candle]:
+        """Resample source candles as Oanda would answer the request."""
+        kinds = self.kinds if kinds is None else to_price_kinds(kinds)
+        source = self.client.get_collector(self.pair, self.source_gran, kinds)
+        self._count_request()
+        if count is None and (after is None or before is None):
+            count = 500
+        # Resampled candles are only ever made of whole buckets.
+        start = None
+        if after is not None:
+            start = bucket_start(after, self.gran)
+            if start < after:
+                start = bucket_end(start, self.gran)
+        end = None
+        if before is not None:
+            end = bucket_end(bucket_start(before - 1, self.gran), self.gran)
+        # Buckets up to the one of the latest source candle can have candles.
+        # Requests are made while the resampled collector holds its lock, so
+        # the source is grabbed from without telling the budget, which could
+        # empty either collector part way through (see ResampledCollector).
+        latest = source._grab(1)
+        if not len(latest):
+            candles = resample(latest, self.pair, self.source_gran, self.gran, kinds)
+        else:
+            until = bucket_end(bucket_start(latest[-1].time, self.gran), self.gran)
+            if end is not None and end >= until:
+                end = None
+            if count is None:
+                candles = self._resample(source, start, end, kinds)
+            elif start is not None:
+                candles = self._resample_after(source, start, end, until, count, kinds)
+                candles = candles[:count]
+            else:
+                until = until if end is None else end
+                candles = self._resample_before(source, end, until, count, kinds)
+                candles = candles[max(0, len(candles) - count) :]
+        self.synced = source.last_update
+        if self.columnar:
+            return candles
+        return candles.candles()
+
+    def _resample(
+        self,
+        source: CandleCollector,
+        start: int,
+        end: Optional[int],
+        kinds: Tuple[str, ...],
+    ) -> CandleFrame:
+        candles = source._grab_range(start, end)
+        return resample(
+            candles, self.pair, self.source_gran, self.gran, kinds, self.calendar
+        )
+
+    def _resample_after(
+        self,
+        source: CandleCollector,
+        start: int,
+        end: Optional[int],
+        until: int,
+        count: int,
+        kinds: Tuple[str, ...],
+    ) -> CandleFrame:
+        """Resample the first count buckets from start (before end, or until
+        the end of the latest bucket if end is None)."""
+        span = count * self.gran.duration
+        while True:
+            stop = start + span if end is None else min(end, start + span)
+            if stop >= until:
+                return self._resample(source, start, end, kinds)
+            candles = self._resample(source, start, stop, kinds)
+            if len(candles) >= count or stop == end:
+                return candles
+            span *= 2
+
+    def _resample_before(
+        self,
+        source: CandleCollector,
+        end: Optional[int],
+        until: int,
+        count: int,
+        kinds: Tuple[str, ...],
+    ) -> CandleFrame:
+        """Resample the last count buckets before end (until if end is None).
+
+        The span of time looked back over doubles until it holds count
+        candles, or looking a week further back finds nothing more.
+        """
+        span = count * self.gran.duration
+        found = -1
+        while True:
+            start = bucket_start(until - span, self.gran)
+            candles = self._resample(source, start, end, kinds)
+            if len(candles) >= count:
+                return candles
+            if len(candles) == found and span >= SecondsPer.WEEK:
+                return candles
+            found = len(candles)
+            span *= 2
+
+
+class ResampledCollector(CandleCollector):
+    """Collector of candles resampled from a collector of a finer granularity.
+
+    It refreshes whenever the source collector has, so it never requests
+    anything itself. The source is reported to the budget as used along with
+    it, after each grab, rather than by the grabs made from it.
+    """
+
+    def __init__(
+        self, client: Any, pair: Pair, gran: Gran, source_gran: Gran, **kwargs
+    ):
+        """Initialize collector.
+
+        Args:
+            client: CandleClient the source collector is got from.
+            pair: pair the candles are for.
+            gran: granularity of the candles.
+            source_gran: granularity of the candles they are built from.
+            kwargs: as for CandleCollector.
+        """
+        if not can_resample(source_gran, gran):
+            raise ValueError(f"Can not resample {source_gran} candles to {gran}")
+        super().__init__(client, pair, gran, **kwargs)
+        self.source_gran = source_gran
+        self.requester = ResampledRequester(
+            client,
+            pair,
+            gran,
+            source_gran,
+            columnar=self.requester.columnar,
+            kinds=self.kinds,
+            observer=self.observer,
+            calendar=self.calendar,
+        )
+
+    def update_recent(self) -> bool:
+        with self._lock:
+            source = self.requester.source
+            if not source.scheduled:
+                source.update_recent()
+            if self.requester.synced != source.last_update:
+                self.refresh()
+                return True
+            return False
+
+    def _used(self, method: str, observed: Optional[Tuple[float, int]]):
+        if self.budget is not None:
+            self.budget.used(self.requester.source)
+        super()._used(method, observed)
@@ -0,0 +1,134 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event, Thread
+from time import monotonic, time
+from typing import Any, Optional
+
+from .candle_collector import CandleCollector
+
+logger = logging.getLogger(__name__)
+
+
+class RefreshScheduler:
+    """Keeps the recent candles of all of a client's collectors fresh.
+
+    Each collector is refreshed once its gran's freshness has passed since
+    its last refresh, or shortly after its next candle is expected to
+    start if that comes sooner. Collectors that come due within the same
+    batch window are refreshed together on a small thread pool. While the
+    scheduler runs, grab on its collectors serves recent candles from the
+    cache instead of requesting them itself.
+    """
+
+    def __init__(
+        self, client: Any, lag: float = 1.0, batch: float = 0.25, workers: int = 4
+    ):
+        """Initialize scheduler (it does not start running).
+
+        Args:
+            client: CandleClient whose collectors are refreshed.
+            lag: seconds after a candle boundary to wait for new candle.
+            batch: collectors due within this many seconds of the earliest
+                due one are refreshed with it.
+            workers: maximum number of refreshes run at once.
+        """
+        self.client = client
+        self.lag = lag
+        self.batch = batch
+        self.workers = workers
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def due(self, collector: CandleCollector) -> float:
+        """Get monotonic time collector should next be refreshed."""
+        closed_until = collector.closed_until
+        if closed_until is not None:
+            # Nothing new comes until the market opens again.
+            wait = closed_until - collector.calendar.now()
+            return monotonic() + wait + self.lag
+        due = collector.last_update + collector.gran.freshness
+        try:
+            last_time = collector._cache[-1].time
+        except IndexError:
+            # Collector is empty (it may have been emptied by a budget since
+            # it was listed), there is no boundary to wait for.
+            return due
+        # Convert boundary of the next candle to a monotonic time, it only
+        # matters if the last refresh was before it.
+        boundary = last_time + collector.gran.duration + monotonic() - time()
+        if collector.last_update < boundary:
+            due = min(due, boundary + self.lag)
+        return due
+
+    def run_pending(self, pool: Optional[ThreadPoolExecutor] = None) -> float:
+        """Refresh the collectors that are due now.
+
+        Args:
+            pool: thread pool to refresh with, if None they are done in turn.
+        Returns:
+            Seconds until the next collector comes due.
+        """
+        collectors = [_ for _ in self.client.collectors() if len(_)]
+        for collector in collectors:
+            collector.hold(self)
+        if not collectors:
+            return CandleCollector.LONG_ENOUGH
+        now = monotonic()
+        due_times = [self.due(_) for _ in collectors]
+        if min(due_times) <= now:
+            cutoff = now + self.batch
+            batch = [c for c, t in zip(collectors, due_times) if t <= cutoff]
+            if pool is None:
+                for collector in batch:
+                    self._refresh(collector)
+            else:
+                list(pool.map(self._refresh, batch))
+            due_times = [self.due(_) for _ in collectors]
+        return max(0.0, min(due_times) - monotonic())
+
+    def run_forever(self):
+        """Refresh collectors as they come due until stop is called."""
+        self._stop.clear()
+        self._run()
+
+    def start(self) -> Thread:
+        """Run run_forever in a background (daemon) thread."""
+        if not self.running:
+            self._stop.clear()
+            self._thread = Thread(
+                target=self._run, name="RefreshScheduler", daemon=True
+            )
+            self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop running, waiting for background thread if there is one."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    def _run(self):
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as pool:
+                while not self._stop.is_set():
+                    self._stop.wait(self.run_pending(pool))
+        finally:
+            for collector in self.client.collectors():
+                collector.release(self)
+
+    @staticmethod
+    def _refresh(collector: CandleCollector):
+        try:
+            collector.refresh()
+        except Exception:
+            # Keep going, the collector is retried once it comes due again.
+            logger.exception("Failed to refresh %s %s", collector.pair, collector.gran)
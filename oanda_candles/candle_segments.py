@@ -0,0 +1,139 @@
+from bisect import bisect_right
+from itertools import chain
+from typing import Iterable, Iterator, List, Union
+
+from oanda_candles.candle import Candle
+
+
+class CandleSegments:
+    """List-like cache of Candle objects held in segments.
+
+    A collector's cache mostly grows at its ends: pages of history are
+    prepended and recent candles patched in at the back. In a flat list
+    every prepend moves the whole cache, so here a page becomes a segment
+    of its own instead, and the back of the last segment is patched in
+    place. Indexing finds the segment by bisection, and slicing copies
+    just the candles asked for into a list.
+    """
+
+    # Pages prepended to a first segment of fewer candles than this are
+    # joined with it rather than made a segment of their own.
+    SEGMENT_SIZE = 2000
+
+    def __init__(self, candles: Iterable[Candle] = ()):
+        self._segments: List[List[Candle]] = []
+        # Index of the first candle of each segment.
+        self._starts: List[int] = []
+        self._size = 0
+        self[:] = candles
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self) -> Iterator[Candle]:
+        return chain.from_iterable(self._segments)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Candle, List[Candle]]:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._size)
+            if step != 1:
+                return list(self)[key]
+            return self._slice(start, stop)
+        if key < 0:
+            key += self._size
+        if not 0 <= key < self._size:
+            raise IndexError("CandleSegments index out of range")
+        ndx = bisect_right(self._starts, key) - 1
+        return self._segments[ndx][key - self._starts[ndx]]
+
+    def __setitem__(self, key: slice, candles: Iterable[Candle]) -> None:
+        start, stop = self._span(key)
+        candles = list(candles)
+        if start == 0 and stop == self._size:
+            self._segments = [candles] if candles else []
+        elif start == stop == 0:
+            self._prepend(candles)
+        elif self._segments and stop == self._size and start >= self._starts[-1]:
+            # Only the back of the last segment changes, patch it in place.
+            self._segments[-1][start - self._starts[-1] :] = candles
+        else:
+            flat = list(self)
+            flat[start:stop] = candles
+            self._segments = [flat] if flat else []
+        self._index()
+
+    def __delitem__(self, key: slice) -> None:
+        start, stop = self._span(key)
+        if start != 0 or stop == self._size:
+            self[key] = ()
+            return
+        # Drop the front, only the segment cut in two is moved.
+        while len(self._segments[0]) <= stop:
+            stop -= len(self._segments.pop(0))
+        if stop:
+            del self._segments[0][:stop]
+        self._index()
+
+    def bisect(self, time: int) -> int:
+        """Get index of first candle at or after time (candles are in order)."""
+        for ndx, segment in enumerate(self._segments):
+            if segment[-1].time >= time:
+                low, high = 0, len(segment)
+                while low < high:
+                    middle = (low + high) // 2
+                    if segment[middle].time < time:
+                        low = middle + 1
+                    else:
+                        high = middle
+                return self._starts[ndx] + low
+        return self._size
+
+    def __repr__(self) -> str:
+        sizes = [len(_) for _ in self._segments]
+        return f"CandleSegments({self._size} candles in segments of {sizes})"
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    def _span(self, key: slice):
+        if not isinstance(key, slice):
+            raise TypeError("CandleSegments only supports slice assignment")
+        start, stop, step = key.indices(self._size)
+        if step != 1:
+            raise ValueError("CandleSegments does not support extended slices")
+        return start, max(start, stop)
+
+    def _prepend(self, candles: List[Candle]):
+        if not candles:
+            return
+        if self._segments and len(self._segments[0]) < self.SEGMENT_SIZE:
+            candles.extend(self._segments[0])
+            self._segments[0] = candles
+        else:
+            self._segments.insert(0, candles)
+
+    def _index(self):
+        """Recompute starts (and size) after the segments changed."""
+        self._segments = [_ for _ in self._segments if _]
+        self._starts = []
+        size = 0
+        for segment in self._segments:
+            self._starts.append(size)
+            size += len(segment)
+        self._size = size
+
+    def _slice(self, start: int, stop: int) -> List[Candle]:
+        if start >= stop:
+            return []
+        ndx = bisect_right(self._starts, start) - 1
+        offset = start - self._starts[ndx]
+        segment = self._segments[ndx]
+        if stop - self._starts[ndx] <= len(segment):
+            return segment[offset : stop - self._starts[ndx]]
+        candles = segment[offset:]
+        for segment in self._segments[ndx + 1 :]:
+            candles.extend(segment[: stop - start - len(candles)])
+            if len(candles) >= stop - start:
+                break
+        return candles
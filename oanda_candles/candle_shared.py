@@ -0,0 +1,353 @@
+"""Share collected candles between processes through shared memory.
+
+One process owns the CandleClient and a SharedCandlePublisher, which
+copies the cache of each collector into a named shared memory segment.
+Any number of other processes attach SharedCandleReader objects to those
+segments and grab CandleFrame views straight out of shared memory.
+
+Each segment starts with a header holding a version counter that the
+publisher makes odd while it writes and even once done (a seqlock), so
+readers can tell whether what they read was whole and whether it has
+changed since. The candles follow in columns: int64 times, uint8 complete
+flags, and an int32 fractional pip column per price field of each kind.
+"""
+
+from multiprocessing import shared_memory
+from struct import Struct
+from threading import Event, Thread
+from time import monotonic, sleep
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from forex_types import Pair
+
+from oanda_candles.candle import oanda_price, to_price_kinds
+from oanda_candles.gran import Gran
+
+from .candle_collector import CandleCollector
+from .candle_store import (
+    CandleFrame,
+    CandleStore,
+    ColumnKey,
+    FLAG_TYPE,
+    PRICE_TYPE,
+    TIME_TYPE,
+    kind_columns,
+)
+
+MAGIC = b"OACSHM01"
+# Magic, version, capacity, length, and price letters (e.g. BAM).
+HEADER = Struct("<8sQQQ3s")
+COUNTER = Struct("<Q")
+HEADER_SIZE = 64
+VERSION_OFFSET = 8
+LENGTH_OFFSET = 24
+DEFAULT_NAMESPACE = "oac"
+
+
+def segment_name(pair: Pair, gran: Gran, kinds: Iterable[str], namespace: str) -> str:
+    """Get name of shared memory segment for pair, gran, and price kinds."""
+    return f"{namespace}_{pair}_{gran}_{oanda_price(kinds)}"
+
+
+def segment_size(capacity: int, kinds: Iterable[str]) -> int:
+    """Get bytes needed for a segment holding capacity candles."""
+    return HEADER_SIZE + _columns_size(capacity, kind_columns(kinds))
+
+
+class SharedCandlePublisher:
+    """Publishes the candles of a client's collectors to shared memory.
+
+    Publishing only writes what changed when it can: the candles from the
+    previously last one on if the cache just grew at the end, otherwise
+    everything.
+    """
+
+    def __init__(
+        self, client: Any, capacity: int = 100_000, namespace: str = DEFAULT_NAMESPACE
+    ):
+        """Initialize publisher (nothing is published yet).
+
+        Args:
+            client: CandleClient whose collectors are published.
+            capacity: most candles per segment, the latest are published
+                when a collector has more.
+            namespace: prefix of the segment names, readers must use the same.
+        """
+        self.client = client
+        self.capacity = capacity
+        self.namespace = namespace
+        self._segments: Dict[str, shared_memory.SharedMemory] = {}
+        # What was last published by segment name: version of the
+        # collector, time of first candle, and number of candles.
+        self._published: Dict[str, Tuple[int, int, int]] = {}
+        self._stop = Event()
+        self._thread: Optional[Thread] = None
+
+    def publish(self, collector: CandleCollector) -> int:
+        """Write the collector's candles to its segment if they changed.
+
+        Returns:
+            version of the segment after publishing.
+        """
+        name = segment_name(
+            collector.pair, collector.gran, collector.kinds, self.namespace
+        )
+        segment = self._segment(name, collector.kinds)
+        with collector._lock:
+            cache = collector._cache
+            size = min(len(cache), self.capacity)
+            first_time = cache[len(cache) - size].time if size else 0
+            state = (collector.version, first_time, size)
+            published = self._published.get(name)
+            if state == published:
+                return _read_version(segment)
+            start = 0
+            if published is not None and published[1] == first_time:
+                start = max(0, min(published[2], size) - 1)
+            tail = cache[len(cache) - size + start :]
+            if not isinstance(tail, CandleFrame):
+                tail = CandleStore(collector.pair, tail, collector.kinds).frame()
+            version = _read_version(segment) + 1
+            _write_version(segment, version)
+            times, flags, prices = _views(segment, self.capacity, collector.kinds)
+            times[start:size] = tail.times
+            flags[start:size] = tail.flags
+            for column, view in prices.items():
+                view[start:size] = tail.prices[column]
+            COUNTER.pack_into(segment.buf, LENGTH_OFFSET, size)
+            _write_version(segment, version + 1)
+            for view in (times, flags, *prices.values()):
+                view.release()
+            self._published[name] = state
+            return version + 1
+
+    def publish_all(self):
+        """Publish every collector of the client (that has candles)."""
+        for collector in self.client.collectors():
+            if len(collector):
+                self.publish(collector)
+
+    def start(self, interval: float = 0.5) -> Thread:
+        """Publish all collectors every interval seconds in a daemon thread.
+
+        Use with client.scheduler.start() to keep them fresh as well.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = Thread(
+                target=self._run, args=(interval,), name="SharedPublisher", daemon=True
+            )
+            self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def close(self):
+        """Stop and remove the segments (attached readers keep their maps)."""
+        self.stop()
+        for segment in self._segments.values():
+            segment.close()
+            segment.unlink()
+        self._segments.clear()
+        self._published.clear()
+
+    def __enter__(self) -> "SharedCandlePublisher":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    def _segment(self, name: str, kinds: Tuple[str, ...]) -> shared_memory.SharedMemory:
+        segment = self._segments.get(name)
+        if segment is None:
+            size = segment_size(self.capacity, kinds)
+            try:
+                segment = shared_memory.SharedMemory(name, create=True, size=size)
+            except FileExistsError:
+                # Left behind by a publisher that did not close, take it over.
+                segment = shared_memory.SharedMemory(name)
+                if segment.size < size:
+                    segment.close()
+                    raise
+            HEADER.pack_into(
+                segment.buf, 0, MAGIC, 0, self.capacity, 0, oanda_price(kinds).encode()
+            )
+            self._segments[name] = segment
+        return segment
+
+    def _run(self, interval: float):
+        while not self._stop.is_set():
+            self.publish_all()
+            self._stop.wait(interval)
+
+
+class SharedCandleReader:
+    """Read only access to candles published by a SharedCandlePublisher.
+
+    grab and grab_offset return CandleFrame views of the shared memory, so
+    they do not copy, but they show whatever is published later at their
+    positions too. Check changed (or version) before relying on an old
+    view, or copy it (e.g. into a CandleStore) to keep it. Views must be
+    let go of before close is called.
+    """
+
+    def __init__(
+        self,
+        pair: Pair,
+        gran: Gran,
+        kinds: Optional[Iterable] = None,
+        namespace: str = DEFAULT_NAMESPACE,
+    ):
+        """Attach to the segment for pair, gran, and price kinds.
+
+        Raises:
+            FileNotFoundError: if nothing has been published for them yet.
+        """
+        self.pair = pair
+        self.gran = gran
+        self.kinds = to_price_kinds(kinds)
+        name = segment_name(pair, gran, self.kinds, namespace)
+        self._segment = _attach(name)
+        magic, _, capacity, _, letters = HEADER.unpack_from(self._segment.buf)
+        if magic != MAGIC or letters != oanda_price(self.kinds).encode():
+            self._segment.close()
+            raise ValueError(f"Not a candle segment for {pair} {gran}: {name}")
+        self.capacity = capacity
+        self._times, self._flags, self._prices = _views(
+            self._segment, capacity, self.kinds
+        )
+        # Version the last grab was consistent with.
+        self.grab_version = 0
+
+    @property
+    def version(self) -> int:
+        """Version of the segment, it changes whenever candles are published."""
+        return _read_version(self._segment)
+
+    @property
+    def changed(self) -> bool:
+        """True if candles were published since the last grab."""
+        return self.version != self.grab_version
+
+    def __len__(self):
+        return self._consistent(self._length)[0]
+
+    def frame(self) -> CandleFrame:
+        """Get view of all the published candles."""
+        return self._grab(lambda length: (0, length))
+
+    def grab(self, count: int) -> CandleFrame:
+        """Get view of the latest count candles (fewer if not published)."""
+        return self._grab(lambda length: (max(0, length - count), length))
+
+    def grab_offset(self, offset: int, count: int) -> CandleFrame:
+        """Get view of count candles ending offset candles before the latest."""
+        return self._grab(
+            lambda length: (max(0, length - offset - count), max(0, length - offset))
+        )
+
+    def wait(self, version: int, timeout: Optional[float] = None) -> bool:
+        """Wait until the version is different from version.
+
+        Returns:
+            False if timeout seconds passed first.
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        while self.version == version:
+            if deadline is not None and monotonic() >= deadline:
+                return False
+            sleep(0.001)
+        return True
+
+    def close(self):
+        for view in (self._times, self._flags, *self._prices.values()):
+            view.release()
+        self._segment.close()
+
+    def __enter__(self) -> "SharedCandleReader":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    def _consistent(self, read):
+        """Call read until it runs while no publishing is under way."""
+        while True:
+            version = _read_version(self._segment)
+            if version % 2:
+                sleep(0)
+                continue
+            result = read()
+            if _read_version(self._segment) == version:
+                return result, version
+
+    def _length(self) -> int:
+        return COUNTER.unpack_from(self._segment.buf, LENGTH_OFFSET)[0]
+
+    def _grab(self, span) -> CandleFrame:
+        def read():
+            start, stop = span(self._length())
+            return CandleFrame(
+                self.pair,
+                self._times[start:stop],
+                self._flags[start:stop],
+                {col: view[start:stop] for col, view in self._prices.items()},
+            )
+
+        frame, self.grab_version = self._consistent(read)
+        return frame
+
+
+def _read_version(segment: shared_memory.SharedMemory) -> int:
+    return COUNTER.unpack_from(segment.buf, VERSION_OFFSET)[0]
+
+
+def _write_version(segment: shared_memory.SharedMemory, version: int):
+    COUNTER.pack_into(segment.buf, VERSION_OFFSET, version)
+
+
+def _columns_size(capacity: int, columns: Tuple[ColumnKey, ...]) -> int:
+    flags = -(-capacity // 8) * 8
+    return capacity * 8 + flags + len(columns) * capacity * 4
+
+
+def _views(
+    segment: shared_memory.SharedMemory, capacity: int, kinds: Iterable[str]
+) -> Tuple[memoryview, memoryview, Dict[ColumnKey, memoryview]]:
+    """Get typed views of the columns of a segment."""
+    buf = segment.buf
+    offset = HEADER_SIZE
+    times = buf[offset : offset + capacity * 8].cast(TIME_TYPE)
+    offset += capacity * 8
+    flags = buf[offset : offset + capacity].cast(FLAG_TYPE)
+    offset += -(-capacity // 8) * 8
+    prices = {}
+    for column in kind_columns(kinds):
+        prices[column] = buf[offset : offset + capacity * 4].cast(PRICE_TYPE)
+        offset += capacity * 4
+    return times, flags, prices
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """Attach to existing segment without the resource tracker owning it."""
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:  # pragma: no cover - before Python 3.13
+        from multiprocessing import resource_tracker
+
+        segment = shared_memory.SharedMemory(name)
+        # Otherwise the segment is unlinked when this process exits.
+        resource_tracker.unregister(segment._name, "shared_memory")
+        return segment
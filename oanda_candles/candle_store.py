@@ -0,0 +1,288 @@
+from array import array
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from forex_types import Pair
+from time_int import TimeInt
+
+from .candle import Candle, PRICE_KINDS, to_price_kinds
+from .ohlc import Ohlc
+
+# Order of the sides and price fields in a store, used for column keys.
+KINDS: Tuple[str, ...] = PRICE_KINDS
+FIELDS: Tuple[str, ...] = ("o", "h", "l", "c")
+
+# Typecodes: candle times are int64 epoch seconds, complete flags one byte
+# each, and prices are fixed point int32 fractional pips.
+TIME_TYPE = "q"
+FLAG_TYPE = "B"
+PRICE_TYPE = "i"
+
+ColumnKey = Tuple[str, str]
+COLUMNS: Tuple[ColumnKey, ...] = tuple(
+    (kind, field) for kind in KINDS for field in FIELDS
+)
+
+
+def kind_columns(kinds: Iterable[str]) -> Tuple[ColumnKey, ...]:
+    """Get keys of the price columns for price kinds, in COLUMNS order."""
+    return tuple(_ for _ in COLUMNS if _[0] in kinds)
+
+
+def _splice(column: array, start: int, stop: int, values: array) -> array:
+    """Replace column[start:stop] with values, returning resulting column.
+
+    Frames hold memoryviews of the store's columns, and an array that is
+    exporting its buffer can not be resized. When that happens the column
+    is copied instead of mutated, which leaves outstanding frames looking
+    at the old (unchanged) data.
+    """
+    try:
+        del column[start:stop]
+        column[start:start] = values
+    except BufferError:
+        column = column[:start] + values + column[stop:]
+    return column
+
+
+def _copy(typecode: str, view: memoryview) -> array:
+    """Copy a contiguous memoryview into a new array."""
+    column = array(typecode)
+    column.frombytes(view.cast("B"))
+    return column
+
+
+class CandleFrame:
+    """Read only zero-copy view of a run of candles in columnar form.
+
+    Candle objects are only built when indexed or iterated. The columns
+    themselves are memoryviews, so they support the buffer protocol (for
+    example numpy.asarray(frame.times) does not copy). Frames only have
+    price columns for the price kinds that were requested.
+    """
+
+    def __init__(
+        self,
+        pair: Pair,
+        times: memoryview,
+        flags: memoryview,
+        prices: Dict[ColumnKey, memoryview],
+    ):
+        self.pair = pair
+        self.times = times
+        self.flags = flags
+        self.prices = prices
+
+    @classmethod
+    def from_arrays(
+        cls, pair: Pair, times: array, flags: array, prices: Dict[ColumnKey, array]
+    ) -> "CandleFrame":
+        """Make frame viewing entire arrays."""
+        return cls(
+            pair,
+            memoryview(times),
+            memoryview(flags),
+            {col: memoryview(values) for col, values in prices.items()},
+        )
+
+    def __len__(self):
+        return len(self.times)
+
+    @property
+    def kinds(self) -> Tuple[str, ...]:
+        """Price kinds the frame has columns for."""
+        return tuple(_ for _ in KINDS if (_, "o") in self.prices)
+
+    def __iter__(self) -> Iterator[Candle]:
+        for ndx in range(len(self.times)):
+            yield self._candle(ndx)
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Candle, "CandleFrame"]:
+        if isinstance(key, slice):
+            return CandleFrame(
+                self.pair,
+                self.times[key],
+                self.flags[key],
+                {col: view[key] for col, view in self.prices.items()},
+            )
+        return self._candle(key)
+
+    def column(self, kind: str, field: str) -> memoryview:
+        """Get the fractional pip values of one price field of one side.
+
+        Args:
+            kind: side of the quote, such as PriceKind.BID (or QuoteKind.BID).
+            field: one of "o", "h", "l", or "c".
+        """
+        return self.prices[(str(kind), field)]
+
+    def candles(self) -> List[Candle]:
+        """Build list of Candle objects for the whole frame."""
+        return list(self)
+
+    def _candle(self, ndx: int) -> Candle:
+        prices = self.prices
+        unit = self.pair.quote.rounder
+
+        def ohlc(kind: str) -> Optional[Ohlc]:
+            if (kind, "o") not in prices:
+                return None
+            return Ohlc.from_fp(*(prices[(kind, _)][ndx] for _ in FIELDS), unit)
+
+        return Candle(
+            ohlc(KINDS[0]),
+            ohlc(KINDS[1]),
+            ohlc(KINDS[2]),
+            TimeInt(self.times[ndx]),
+            bool(self.flags[ndx]),
+        )
+
+
+class CandleStore:
+    """Columnar list-like container of candles for a single pair.
+
+    Supports the list operations CandleRequester relies on (len, indexing,
+    and slice assignment) so it can stand in for the List[Candle] cache of
+    a CandleCollector. Indexing builds a Candle, slicing returns a
+    CandleFrame: a copy of the columns for up to COPY_LIMIT candles, a
+    view of them rather than a copy for more.
+
+    The columns can not be resized while a view of them is held, so the
+    first change made to the store then copies every column instead (see
+    _splice). Small slices, such as grabbing the latest candles, are
+    copied so that holding them does not make each refresh copy it all.
+    """
+
+    # Most candles in a slice that is copied rather than viewed.
+    COPY_LIMIT = 5000
+
+    def __init__(
+        self,
+        pair: Pair,
+        candles: Iterable[Candle] = (),
+        kinds: Iterable[str] = KINDS,
+    ):
+        """Initialize store.
+
+        Args:
+            pair: pair of the candles.
+            candles: initial candles (or CandleFrame).
+            kinds: price kinds to store, candles must have these.
+        """
+        self.pair = pair
+        self.times = array(TIME_TYPE)
+        self.flags = array(FLAG_TYPE)
+        self.prices: Dict[ColumnKey, array] = {
+            col: array(PRICE_TYPE) for col in kind_columns(kinds)
+        }
+        self[:] = candles
+
+    @property
+    def kinds(self) -> Tuple[str, ...]:
+        """Price kinds the store has columns for."""
+        return tuple(_ for _ in KINDS if (_, "o") in self.prices)
+
+    def __len__(self):
+        return len(self.times)
+
+    def __iter__(self) -> Iterator[Candle]:
+        return iter(self.frame())
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[Candle, CandleFrame]:
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self.times))
+            if step == 1 and stop - start <= self.COPY_LIMIT:
+                return CandleFrame.from_arrays(
+                    self.pair,
+                    self.times[start:stop],
+                    self.flags[start:stop],
+                    {col: values[start:stop] for col, values in self.prices.items()},
+                )
+        return self.frame()[key]
+
+    def __setitem__(
+        self, key: slice, candles: Union[Iterable[Candle], CandleFrame]
+    ) -> None:
+        start, stop = self._span(key)
+        if isinstance(candles, CandleFrame):
+            times = _copy(TIME_TYPE, candles.times)
+            flags = _copy(FLAG_TYPE, candles.flags)
+            prices = {
+                col: _copy(PRICE_TYPE, candles.prices[col]) for col in self.prices
+            }
+        else:
+            times, flags, prices = self._to_columns(candles, self.kinds)
+        self.times = _splice(self.times, start, stop, times)
+        self.flags = _splice(self.flags, start, stop, flags)
+        for col, values in prices.items():
+            self.prices[col] = _splice(self.prices[col], start, stop, values)
+
+    def __delitem__(self, key: slice) -> None:
+        self[key] = ()
+
+    def frame(self) -> CandleFrame:
+        """Get a CandleFrame view of the entire store."""
+        return CandleFrame.from_arrays(self.pair, self.times, self.flags, self.prices)
+
+    @property
+    def nbytes(self) -> int:
+        """Number of bytes used by the column data."""
+        columns = [self.times, self.flags, *self.prices.values()]
+        return sum(len(_) * _.itemsize for _ in columns)
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    def _span(self, key: slice) -> Tuple[int, int]:
+        if not isinstance(key, slice):
+            raise TypeError("CandleStore only supports slice assignment")
+        start, stop, step = key.indices(len(self.times))
+        if step != 1:
+            raise ValueError("CandleStore does not support extended slices")
+        return start, max(start, stop)
+
+    @staticmethod
+    def _to_columns(
+        candles: Iterable[Candle], kinds: Tuple[str, ...]
+    ) -> Tuple[array, array, Dict[ColumnKey, array]]:
+        times = array(TIME_TYPE)
+        flags = array(FLAG_TYPE)
+        prices = {col: array(PRICE_TYPE) for col in kind_columns(kinds)}
+        for candle in candles:
+            times.append(candle.time)
+            flags.append(candle.complete)
+            for kind in kinds:
+                o, h, l, c = getattr(candle, kind).to_fp()
+                prices[(kind, "o")].append(o)
+                prices[(kind, "h")].append(h)
+                prices[(kind, "l")].append(l)
+                prices[(kind, "c")].append(c)
+        return times, flags, prices
+
+
+def to_frame(
+    candles: Sequence[Candle], pair: Pair, kinds: Optional[Iterable[str]] = None
+) -> CandleFrame:
+    """Get candles as a CandleFrame with price columns for just kinds.
+
+    A frame or store that has the kinds is viewed without copying, other
+    candles (e.g. a list of Candle objects) are converted.
+
+    Args:
+        candles: list of candles, CandleStore, or CandleFrame.
+        pair: pair of the candles.
+        kinds: price kinds, None for the kinds of a frame or store, or of
+            the first candle of a list.
+    """
+    if isinstance(candles, CandleStore):
+        candles = candles.frame()
+    if isinstance(candles, CandleFrame):
+        if kinds is None:
+            return candles
+        kinds = to_price_kinds(kinds)
+        if all(_ in candles.kinds for _ in kinds):
+            prices = {_: candles.prices[_] for _ in kind_columns(kinds)}
+            return CandleFrame(pair, candles.times, candles.flags, prices)
+    elif kinds is None and len(candles):
+        kinds = [_ for _ in KINDS if getattr(candles[0], _) is not None]
+    return CandleStore(pair, candles, to_price_kinds(kinds)).frame()
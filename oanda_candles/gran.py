@@ -1,6 +1,7 @@
+from datetime import datetime, timezone
 from typing import Optional, Set, Dict
 
-from .gran_unit import GranUnit
+from .gran_unit import GranUnit, SecondsPer
 
 
 class Gran:
@@ -95,3 +96,30 @@ GRAN_TUPLE = (
 
 GRAN_SET: Set[Gran] = set(GRAN_TUPLE)
 GRAN_DICT: Dict[str, Gran] = {_.oanda: _ for _ in GRAN_TUPLE}
+
+# Days from the epoch (a Thursday) back to the Sunday before it.
+EPOCH_SUNDAY = 4
+
+
+def bucket_start(time: int, gran: Gran) -> int:
+    """Get start time of the candle of gran that time falls in.
+
+    Candles are aligned as CandleRequester asks Oanda to align them: days
+    start at 00:00 UTC, weeks on Sunday, and months on the first.
+    """
+    if gran == Gran.M:
+        day = datetime.fromtimestamp(time, timezone.utc)
+        return int(datetime(day.year, day.month, 1, tzinfo=timezone.utc).timestamp())
+    if gran == Gran.W:
+        days = time // SecondsPer.DAY
+        return (days - (days + EPOCH_SUNDAY) % 7) * SecondsPer.DAY
+    return time - time % gran.duration
+
+
+def bucket_end(start: int, gran: Gran) -> int:
+    """Get start time of the candle of gran after the one starting at start."""
+    if gran == Gran.M:
+        day = datetime.fromtimestamp(start, timezone.utc)
+        year, month = divmod(day.year * 12 + day.month, 12)
+        return int(datetime(year, month + 1, 1, tzinfo=timezone.utc).timestamp())
+    return start + gran.duration
@@ -0,0 +1,142 @@
+"""Weekly hours of the forex market.
+
+The market opens Sunday at 5pm New York time and closes Friday at 5pm New
+York time, which is 21:00 UTC while New York is on daylight saving time
+and 22:00 UTC otherwise. Holidays, when Oanda may still give candles, are
+not accounted for.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+from time import time as wall_time
+from typing import Callable, Iterator, Optional, Tuple
+
+from oanda_candles.gran import Gran
+
+# Hour the market opens and closes in New York.
+NY_HOUR = 17
+WEEK = 7 * 86400
+
+
+def ny_dst(day: date) -> bool:
+    """Tell if New York is on daylight saving time on day."""
+    if day.year >= 2007:
+        start = _nth_sunday(day.year, 3, 2)
+        end = _nth_sunday(day.year, 11, 1)
+    else:
+        start = _nth_sunday(day.year, 4, 1)
+        end = _nth_sunday(day.year, 10, 5)
+    return start <= day < end
+
+
+def ny_time(day: date, hour: int) -> int:
+    """Get UTC epoch time of hour o'clock in New York on day."""
+    offset = 4 if ny_dst(day) else 5
+    midnight = datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+    return int(midnight.timestamp()) + (hour + offset) * 3600
+
+
+class MarketCalendar:
+    """Tells when the forex market is open and how many candles fit in a span.
+
+    Times are UTC epoch seconds, and default to now according to clock.
+    """
+
+    def __init__(self, clock: Callable[[], float] = wall_time):
+        """Initialize calendar.
+
+        Args:
+            clock: function giving the current epoch time (e.g. a simulated
+                one for replaying history).
+        """
+        self.clock = clock
+
+    def now(self) -> int:
+        return int(self.clock())
+
+    def is_open(self, time: Optional[int] = None) -> bool:
+        time = self.now() if time is None else time
+        start, _ = self.session(time)
+        return start <= time
+
+    def session(self, time: Optional[int] = None) -> Tuple[int, int]:
+        """Get open and close times of session open at time, or next one."""
+        friday = self._closing_friday(self.now() if time is None else time)
+        return self._open(friday), self._close(friday)
+
+    def next_open(self, time: Optional[int] = None) -> int:
+        """Get time market next opens after time (time if it opens then)."""
+        time = self.now() if time is None else time
+        start, close = self.session(time)
+        return start if time <= start else self.session(close)[0]
+
+    def next_close(self, time: Optional[int] = None) -> int:
+        """Get time market next closes after time."""
+        return self.session(time)[1]
+
+    def last_close(self, time: Optional[int] = None) -> int:
+        """Get time market last closed at or before time."""
+        return self.session(time)[1] - WEEK
+
+    def sessions(self, start: int, end: int) -> Iterator[Tuple[int, int]]:
+        """Get open and close times of sessions overlapping start to end."""
+        friday = self._closing_friday(start)
+        while self._open(friday) < end:
+            yield self._open(friday), self._close(friday)
+            friday += timedelta(days=7)
+
+    def candle_count(self, start: int, end: int, gran: Gran) -> int:
+        """Get number of candles of gran with times from start up to end.
+
+        Candles are counted for each period of gran that the market is open
+        for some of. Week and month candles are estimated by duration.
+        """
+        duration = gran.duration
+        if end <= start:
+            return 0
+        if duration >= WEEK:
+            return -(-(end - start) // duration)
+        first = -(-start // duration)
+        stop = -(-end // duration)
+        count = 0
+        for open_time, close_time in self.sessions(start, end + duration):
+            count += max(
+                0,
+                min(stop, -(-close_time // duration))
+                - max(first, open_time // duration),
+            )
+        return count
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    @staticmethod
+    def _open(friday: date) -> int:
+        """Get open of the session closing on friday."""
+        return ny_time(friday - timedelta(days=5), NY_HOUR)
+
+    @staticmethod
+    def _close(friday: date) -> int:
+        return ny_time(friday, NY_HOUR)
+
+    def _closing_friday(self, time: int) -> date:
+        """Get Friday the session open at time (or next one) closes on."""
+        day = datetime.fromtimestamp(time, timezone.utc).date()
+        friday = day - timedelta(days=(day.weekday() - 4) % 7)
+        if time >= self._close(friday):
+            friday += timedelta(days=7)
+        return friday
+
+
+def _nth_sunday(year: int, month: int, nth: int) -> date:
+    """Get nth Sunday of month, or the last one if there are fewer."""
+    first = date(year, month, 1)
+    sunday = first + timedelta(days=(6 - first.weekday()) % 7)
+    day = sunday + timedelta(days=7 * (nth - 1))
+    while day.month != month:
+        day -= timedelta(days=7)
+    return day
+
+
+# Calendar using the system clock, shared by default.
+FOREX_CALENDAR = MarketCalendar()
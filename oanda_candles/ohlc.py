@@ -1,35 +1,123 @@
+from decimal import Decimal
 from forex_types import Price, FracPips
-from typing import Tuple
+from forex_types.price import NinjaPrice
+from typing import Optional, Tuple
+
+# Price per fractional pip for most quote currencies and for Japanese yen.
+STANDARD_UNIT = Decimal("0.00001")
+NINJA_UNIT = Decimal("0.001")
+
+
+def _unit_of(price: Price) -> Decimal:
+    return NINJA_UNIT if isinstance(price, NinjaPrice) else STANDARD_UNIT
+
+
+def _frac_pips(text: str) -> Optional[Tuple[int, Decimal]]:
+    """Parse price string like "1.10203" to fractional pips and unit.
+
+    Returns None if the string has more decimal places than the unit has.
+    """
+    whole, _, frac = text.partition(".")
+    if int(whole) >= Price.NINJA_MIN:
+        places, unit = 3, NINJA_UNIT
+    else:
+        places, unit = 5, STANDARD_UNIT
+    if len(frac) > places:
+        return None
+    return int(whole + frac + "0" * (places - len(frac))), unit
 
 
 class Ohlc:
-    """Open, High, Low, Close prices"""
+    """Open, High, Low, Close prices
+
+    The prices are held as integer fractional pips. The Price and FracPips
+    objects for them are only made when they are first asked for, and are
+    kept after that.
+    """
+
+    __slots__ = ("_o", "_h", "_l", "_c", "_unit", "_prices")
 
     def __init__(self, o: Price, h: Price, l: Price, c: Price):
-        self.o = o
-        self.h = h
-        self.l = l
-        self.c = c
+        self._o = FracPips.from_price(o)
+        self._h = FracPips.from_price(h)
+        self._l = FracPips.from_price(l)
+        self._c = FracPips.from_price(c)
+        self._unit = _unit_of(o)
+        self._prices = [o, h, l, c]
+
+    @classmethod
+    def from_fp(cls, o: int, h: int, l: int, c: int, unit: Decimal) -> "Ohlc":
+        """Make Ohlc from fractional pips without making any Price objects.
+
+        Args:
+            o, h, l, c: open, high, low, and close in fractional pips.
+            unit: price of one fractional pip (e.g. pair.quote.rounder).
+        """
+        self = cls.__new__(cls)
+        self._o = o
+        self._h = h
+        self._l = l
+        self._c = c
+        self._unit = unit
+        self._prices = None
+        return self
+
+    @property
+    def o(self) -> Price:
+        """Open price."""
+        return self._price(0, self._o)
+
+    @property
+    def h(self) -> Price:
+        """High price."""
+        return self._price(1, self._h)
+
+    @property
+    def l(self) -> Price:
+        """Low price."""
+        return self._price(2, self._l)
+
+    @property
+    def c(self) -> Price:
+        """Closing price."""
+        return self._price(3, self._c)
 
     @property
     def o_fp(self) -> FracPips:
         """Open price as Fractional Pips."""
-        return FracPips.from_price(self.o)
+        if type(self._o) is not FracPips:
+            self._o = FracPips(self._o)
+        return self._o
 
     @property
     def h_fp(self) -> FracPips:
         """High price as Fractional Pips."""
-        return FracPips.from_price(self.h)
+        if type(self._h) is not FracPips:
+            self._h = FracPips(self._h)
+        return self._h
 
     @property
     def l_fp(self) -> FracPips:
         """Low price as Fractional Pips."""
-        return FracPips.from_price(self.l)
+        if type(self._l) is not FracPips:
+            self._l = FracPips(self._l)
+        return self._l
 
     @property
     def c_fp(self) -> FracPips:
         """Closing price as Fractional Pips."""
-        return FracPips.from_price(self.c)
+        if type(self._c) is not FracPips:
+            self._c = FracPips(self._c)
+        return self._c
+
+    @property
+    def unit(self) -> Decimal:
+        """Price of one fractional pip."""
+        return self._unit
+
+    def to_fp(self) -> Tuple[int, int, int, int]:
+        """Get open, high, low, and close as fractional pip integers."""
+        return self._o, self._h, self._l, self._c
 
     def to_tuple(self) -> Tuple[str, str, str, str]:
         """Get tuple that can be used in json serialization of Ohlc."""
@@ -38,23 +126,36 @@ class Ohlc:
     @classmethod
     def from_tuple(cls, data: Tuple[str, str, str, str]) -> "Ohlc":
         """Create Ohlc object from tuple like one created by to_tuple method."""
-        return cls(Price(data[0]), Price(data[1]), Price(data[2]), Price(data[3]))
+        return cls.from_oanda(dict(zip("ohlc", data)))
 
     @classmethod
     def from_oanda(cls, data: dict) -> "Ohlc":
         """Put together ohlc from dict data returned from V20 candle query."""
-        return cls(
-            Price(data["o"]), Price(data["h"]), Price(data["l"]), Price(data["c"])
-        )
+        parsed = [_frac_pips(data[_]) for _ in "ohlc"]
+        if None in parsed:
+            return cls(
+                Price(data["o"]), Price(data["h"]), Price(data["l"]), Price(data["c"])
+            )
+        (o, unit), (h, _), (l, _), (c, _) = parsed
+        return cls.from_fp(o, h, l, c, unit)
 
     def __eq__(self, other) -> bool:
         """Equal only when all four prices are equal."""
         if isinstance(other, Ohlc):
             return (
-                self.o == other.o
-                and self.h == other.h
-                and self.l == other.l
-                and self.c == other.c
+                self._o == other._o
+                and self._h == other._h
+                and self._l == other._l
+                and self._c == other._c
+                and self._unit == other._unit
             )
         else:
             return NotImplemented
+
+    def _price(self, ndx: int, fp: int) -> Price:
+        if self._prices is None:
+            self._prices = [None, None, None, None]
+        price = self._prices[ndx]
+        if price is None:
+            price = self._prices[ndx] = Price(fp * self._unit)
+        return price
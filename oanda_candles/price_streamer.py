@@ -0,0 +1,219 @@
+"""Keep the latest candles current from the V20 pricing stream.
+
+Rather than polling the candles endpoint for the incomplete candle again
+and again, a PriceStreamer holds one connection to the pricing stream for
+all the pairs subscribed, and moves the high, low, and close of each
+subscribed collector's latest candle as prices arrive. The candles
+endpoint is only asked again when a price shows a candle has completed
+(see CandleCollector.apply_price), or after reconnecting, to catch up on
+any prices missed.
+"""
+
+import logging
+from threading import Event, Lock, Thread
+from typing import Any, Dict, List, Optional
+from urllib.parse import urljoin
+
+from requests import Response, Session
+
+from forex_types import Pair
+
+from oanda_candles.gran import Gran
+
+from .candle_collector import CandleCollector
+from .candle_parser import loads, price_places, to_frac_pips
+from .candle_requester import UrlRoot
+
+logger = logging.getLogger(__name__)
+
+
+class PriceStreamer:
+    """Updates the latest candles of subscribed collectors from price ticks.
+
+    For example, to keep the M1 and H1 candles of EUR_USD current:
+
+        streamer = PriceStreamer(client, account_id)
+        streamer.subscribe(Pair.EUR_USD, Gran.M1)
+        streamer.subscribe(Pair.EUR_USD, Gran.H1)
+        streamer.start()
+
+    While subscribed, grab on the collectors serves the latest candles from
+    the cache instead of requesting them (as with RefreshScheduler, which
+    is not needed for them).
+    """
+
+    # Seconds to wait before reconnecting after the stream failed.
+    RECONNECT_WAIT = 1.0
+
+    def __init__(self, client: Any, account_id: str, stream_url: Optional[str] = None):
+        """Initialize streamer (it does not start streaming).
+
+        Args:
+            client: CandleClient of the collectors updated.
+            account_id: Oanda account id the stream is opened for.
+            stream_url: If given, URL of the pricing stream host, otherwise
+                Oanda's for the client's account (or the client's root_url
+                if that is not Oanda's, e.g. a local stand-in server).
+        """
+        if stream_url is None:
+            if client.root_url == UrlRoot.real_url:
+                stream_url = UrlRoot.real_stream_url
+            elif client.root_url == UrlRoot.practice_url:
+                stream_url = UrlRoot.practice_stream_url
+            else:
+                stream_url = client.root_url
+        self.client = client
+        self.url = urljoin(stream_url, f"/v3/accounts/{account_id}/pricing/stream")
+        self.headers = {
+            "Accept-Datetime-Format": "UNIX",
+            "Authorization": f"Bearer {client.token}",
+        }
+        self.session = Session()
+        # Number of prices received, and of times the stream was connected.
+        self.prices = 0
+        self.connects = 0
+        self._collectors: Dict[Pair, List[CandleCollector]] = {}
+        self._lock = Lock()
+        self._stop = Event()
+        # Set when the pairs subscribed changed, to reconnect for them.
+        self._resubscribe = Event()
+        self._response: Optional[Response] = None
+        self._thread: Optional[Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def pairs(self) -> List[Pair]:
+        """Pairs subscribed to."""
+        with self._lock:
+            return list(self._collectors)
+
+    def subscribe(self, pair: Pair, gran: Gran) -> CandleCollector:
+        """Keep the latest candle of the client's collector for pair and gran
+        up to date, return the collector."""
+        collector = self.client.get_collector(pair, gran)
+        with self._lock:
+            collectors = self._collectors.setdefault(pair, [])
+            if collector not in collectors:
+                collectors.append(collector)
+            if self.running:
+                collector.hold(self)
+            if len(collectors) == 1:
+                self._reconnect()
+        return collector
+
+    def unsubscribe(self, pair: Pair, gran: Gran):
+        """Stop updating the collector for pair and gran, grab refreshes it again."""
+        collector = self.client.get_collector(pair, gran)
+        with self._lock:
+            collectors = self._collectors.get(pair, [])
+            if collector in collectors:
+                collectors.remove(collector)
+                collector.release(self)
+            if not collectors and self._collectors.pop(pair, None) is not None:
+                self._reconnect()
+
+    def apply(self, message: dict) -> int:
+        """Apply a message from the pricing stream to the subscribed collectors.
+
+        Args:
+            message: decoded line of the stream, heartbeats are ignored.
+        Returns:
+            Number of collectors whose candles changed.
+        """
+        if message.get("type") != "PRICE" or not message.get("tradeable", True):
+            return 0
+        pair = Pair(message["instrument"])
+        with self._lock:
+            collectors = list(self._collectors.get(pair, ()))
+        places = price_places(pair)
+        time = int(message["time"].partition(".")[0])
+        bid = to_frac_pips(message["bids"][0]["price"], places)
+        ask = to_frac_pips(message["asks"][0]["price"], places)
+        self.prices += 1
+        return sum(_.apply_price(time, bid, ask) for _ in collectors)
+
+    def run_forever(self):
+        """Stream prices, reconnecting as needed, until stop is called."""
+        self._stop.clear()
+        self._run()
+
+    def start(self) -> Thread:
+        """Run run_forever in a background (daemon) thread."""
+        if not self.running:
+            self._stop.clear()
+            self._thread = Thread(target=self._run, name="PriceStreamer", daemon=True)
+            self._thread.start()
+        return self._thread
+
+    def stop(self, timeout: Optional[float] = None):
+        """Stop streaming, waiting for background thread if there is one.
+
+        The subscribed collectors are left subscribed, but refresh on grab
+        again until streaming starts again.
+        """
+        self._stop.set()
+        self._reconnect()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                self._resubscribe.clear()
+                try:
+                    self._stream()
+                except Exception:
+                    if self._stop.is_set() or self._resubscribe.is_set():
+                        continue
+                    logger.exception("Price stream failed, reconnecting")
+                if not self._resubscribe.is_set():
+                    self._stop.wait(self.RECONNECT_WAIT)
+        finally:
+            for collector in self._subscribed():
+                collector.release(self)
+
+    def _stream(self):
+        """Stream prices for the pairs subscribed until told to reconnect."""
+        pairs = self.pairs
+        if not pairs:
+            self._resubscribe.wait(self.RECONNECT_WAIT)
+            return
+        params = {"instruments": ",".join(str(_) for _ in pairs)}
+        response = self.session.get(
+            self.url, headers=self.headers, params=params, stream=True
+        )
+        self._response = response
+        try:
+            response.raise_for_status()
+            self.connects += 1
+            for collector in self._subscribed():
+                # Catch up on the candles while not connected.
+                collector.hold(self)
+                collector.refresh()
+            for line in response.iter_lines():
+                if self._stop.is_set() or self._resubscribe.is_set():
+                    break
+                if line:
+                    self.apply(loads(line))
+        finally:
+            self._response = None
+            response.close()
+
+    def _reconnect(self):
+        """Have the stream reconnect (or stop), closing it if it is open."""
+        self._resubscribe.set()
+        response = self._response
+        if response is not None:
+            response.close()
+
+    def _subscribed(self) -> List[CandleCollector]:
+        with self._lock:
+            return [c for collectors in self._collectors.values() for c in collectors]
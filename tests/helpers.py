@@ -0,0 +1,85 @@
+"""Candles, clients, and requesters shared by the test modules."""
+
+from time import monotonic, sleep
+from types import SimpleNamespace
+
+from forex_types import Pair, Price
+from time_int import TimeInt
+
+from oanda_candles import Candle, CandleCollector, CandleStore, Gran, Ohlc
+from oanda_candles.candle import to_price_kinds
+from oanda_candles.candle_requester import CandleRequester, UrlRoot
+
+# Wednesday 2020-09-16 12:00 UTC.
+NOW = 1_600_257_600
+# First hour FakeRequester has a candle for.
+START = 1_590_000_000 // 3600 * 3600
+
+# Stands in for a CandleClient where no requests are made through it.
+CLIENT = SimpleNamespace(session=None, token="token", root_url=UrlRoot.practice_url)
+
+
+def make_candle(time: int, base: str = "1.10000", complete: bool = True) -> Candle:
+    price = Price(base)
+    ask = Ohlc(
+        price.add_pips(2), price.add_pips(5), price.add_pips(1), price.add_pips(3)
+    )
+    bid = Ohlc(price, price.add_pips(3), price.add_pips(-1), price.add_pips(1))
+    mid = Ohlc(price.add_pips(1), price.add_pips(4), price, price.add_pips(2))
+    return Candle(ask, bid, mid, TimeInt(time), complete)
+
+
+def make_candles(count: int, start: int = 1_590_000_000) -> list:
+    return [make_candle(start + 60 * ndx) for ndx in range(count)]
+
+
+def strip(candle: Candle, kinds) -> Candle:
+    """Copy of candle with only the given price kinds."""
+    sides = [getattr(candle, _) if _ in kinds else None for _ in ("ask", "bid", "mid")]
+    return Candle(*sides, candle.time, candle.complete)
+
+
+class FakeRequester(CandleRequester):
+    """Serves H1 candles from START up to now, with every fourth day missing."""
+
+    def __init__(self, now: int, columnar: bool = False, kinds=None):
+        super().__init__(CLIENT, Pair.EUR_USD, Gran.H1, columnar, kinds)
+        self.times = [
+            _ for _ in range(START, now, 3600) if (_ - START) // 86400 % 4 != 3
+        ]
+        self.calls = []
+
+    def _request(self, count=None, before=None, after=None, kinds=None):
+        kinds = self.kinds if kinds is None else to_price_kinds(kinds)
+        self.calls.append((count, before, after, kinds))
+        times = [
+            _
+            for _ in self.times
+            if (after is None or _ >= after) and (before is None or _ < before)
+        ]
+        if count is not None:
+            times = times[:count] if after is not None else times[-count:]
+        candles = [strip(make_candle(_), kinds) for _ in times]
+        if self.columnar:
+            return CandleStore(self.pair, candles, kinds)[:]
+        return candles
+
+
+def make_collector(
+    hours: int = 3000, columnar: bool = False, **kwargs
+) -> CandleCollector:
+    """Make EUR_USD H1 collector served by a FakeRequester up to hours
+    after START, kwargs are passed on to CandleCollector."""
+    collector = CandleCollector(
+        CLIENT, Pair.EUR_USD, Gran.H1, columnar=columnar, **kwargs
+    )
+    collector.requester = FakeRequester(START + 3600 * hours, columnar)
+    return collector
+
+
+def wait_for(condition, timeout: float = 5.0):
+    """Wait for condition() to be true, failing after timeout seconds."""
+    deadline = monotonic() + timeout
+    while not condition():
+        assert monotonic() < deadline, "timed out"
+        sleep(0.01)
@@ -0,0 +1,296 @@
+"""Local stand-in for the V20 candles endpoint, serving synthetic candles.
+
+    with MockV20Server(now=START + 86400 * 30) as server:
+        client = CandleClient("token", root_url=server.url)
+        client.grab(Pair.EUR_USD, Gran.H1, 100)
+        print(server.requests)
+
+Candles start every gran duration (counted from the epoch) between the
+server's start and now, except over the weekend from Friday 21:00 to
+Sunday 21:00 UTC. The clock is fixed at now, and the candle now falls in
+is incomplete. Prices are a function of pair, gran, and time so the same
+candle always comes back the same.
+
+It also stands in for the pricing stream, sending the prices passed to
+tick to the streams subscribed to their pair, and a heartbeat whenever
+there has been no price for HEARTBEAT seconds.
+"""
+
+import json
+import re
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from queue import Empty, Queue
+from threading import Event, Lock, Thread
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from oanda_candles.gran import GRAN_DICT
+
+MAX_COUNT = 5000
+DEFAULT_COUNT = 500
+WEEK = 7 * 86400
+# Seconds into an epoch week (which starts Thursday 00:00) of Friday 21:00
+# and of Sunday 21:00 UTC.
+WEEKEND_START = 86400 + 21 * 3600
+WEEKEND_END = 3 * 86400 + 21 * 3600
+
+HEARTBEAT = 0.2
+
+URL_PATTERN = re.compile(r"^/v3/instruments/([A-Z]{3}_[A-Z]{3})/candles$")
+STREAM_PATTERN = re.compile(r"^/v3/accounts/([^/]+)/pricing/stream$")
+
+
+def trading(time: int) -> bool:
+    """Check if time is outside of the weekend."""
+    return not WEEKEND_START <= time % WEEK < WEEKEND_END
+
+
+class MockV20Server:
+    """Threaded HTTP server answering candle requests like V20 does.
+
+    Honors the granularity, price, count, from, and to parameters. The
+    from time is inclusive and the to time exclusive, count is limited to
+    5000, and a from/to range with more candles than that is refused.
+    """
+
+    def __init__(self, now: int, start: Optional[int] = None, port: int = 0):
+        """Initialize server (it starts listening when started).
+
+        Args:
+            now: fixed time (epoch seconds) the server treats as current.
+            start: time of the earliest candle there is, default 10 years
+                before now.
+            port: port to listen on, 0 for any free one.
+        """
+        self.now = now
+        self.start_time = now - 3650 * 86400 if start is None else start
+        self.requests = 0
+        self.bytes_sent = 0
+        self.log: List[Dict[str, str]] = []
+        self._lock = Lock()
+        # Instruments and message queue of each open price stream.
+        self._streams: List[Tuple[Set[str], Queue]] = []
+        self._stopping = Event()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._server.daemon_threads = True
+        self._thread: Optional[Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "MockV20Server":
+        self._stopping.clear()
+        self._thread = Thread(
+            target=self._server.serve_forever, args=(0.05,), daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set()
+        if self._thread is not None:
+            self._server.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._server.server_close()
+
+    def __enter__(self) -> "MockV20Server":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def reset(self):
+        """Zero the request counts."""
+        with self._lock:
+            self.requests = 0
+            self.bytes_sent = 0
+            self.log.clear()
+
+    @property
+    def streams(self) -> int:
+        """Number of price streams open."""
+        with self._lock:
+            return len(self._streams)
+
+    def tick(self, pair: str, time: int, bid: str, ask: str):
+        """Send a price to the streams subscribed to pair.
+
+        Args:
+            pair: instrument, e.g. "EUR_USD".
+            time: epoch time of the price.
+            bid: bid price text, e.g. "1.10001".
+            ask: ask price text.
+        """
+        message = {
+            "type": "PRICE",
+            "instrument": pair,
+            "time": f"{time}.000000000",
+            "tradeable": True,
+            "bids": [{"price": bid, "liquidity": 1000000}],
+            "asks": [{"price": ask, "liquidity": 1000000}],
+        }
+        with self._lock:
+            for instruments, queue in self._streams:
+                if pair in instruments:
+                    queue.put(message)
+
+    def times(
+        self,
+        duration: int,
+        after: Optional[int] = None,
+        before: Optional[int] = None,
+        count: Optional[int] = None,
+    ) -> List[int]:
+        """Get candle times like the candles request with the same params.
+
+        Args:
+            duration: seconds per candle.
+            after: earliest time wanted (inclusive).
+            before: time to stop before (exclusive).
+            count: most candles wanted, taken from after if it is given,
+                otherwise the ones just before before (or now).
+        """
+        first = -(-max(self.start_time, after or 0) // duration) * duration
+        stop = self.now + 1 if before is None else min(before, self.now + 1)
+        if after is not None or count is None:
+            # Without a count one more than the most allowed is enough to
+            # know the range is too long.
+            limit = MAX_COUNT + 1 if count is None else count
+            times = []
+            time = first
+            while time < stop and len(times) < limit:
+                if trading(time):
+                    times.append(time)
+                time += duration
+            return times
+        times = []
+        time = (stop - 1) // duration * duration
+        while time >= first and len(times) < count:
+            if trading(time):
+                times.append(time)
+            time -= duration
+        return times[::-1]
+
+    def candles(self, pair: str, gran: str, price: str, times: List[int]) -> dict:
+        """Get V20 style response body dict for candles at times."""
+        duration = GRAN_DICT[gran].duration
+        places, base = (3, 108.0) if "JPY" in pair else (5, 1.1)
+        scale = 10 ** (5 - places)
+        sides = {"B": "bid", "A": "ask", "M": "mid"}
+
+        def price_text(value: float) -> str:
+            return f"{value:.{places}f}"
+
+        candles = []
+        for time in times:
+            step = time // duration
+            mid = base + ((step * 7 + len(pair)) % 200 - 100) * 0.00003 * scale
+            move = (step % 11 - 5) * 0.00002 * scale
+            candle = {
+                "complete": time + duration <= self.now,
+                "volume": 100 + step % 50,
+                "time": f"{time}.000000000",
+            }
+            for letter in price:
+                shift = {"B": -0.00007, "A": 0.00007, "M": 0.0}[letter] * scale
+                open_ = mid + shift
+                close = open_ + move
+                candle[sides[letter]] = {
+                    "o": price_text(open_),
+                    "h": price_text(max(open_, close) + 0.0003 * scale),
+                    "l": price_text(min(open_, close) - 0.0003 * scale),
+                    "c": price_text(close),
+                }
+            candles.append(candle)
+        return {"instrument": pair, "granularity": gran, "candles": candles}
+
+    # ---------------------------------------------------------------------------
+    # Helpers
+    # ---------------------------------------------------------------------------
+
+    def _handler(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                if STREAM_PATTERN.match(urlparse(self.path).path):
+                    mock._stream(self)
+                    return
+                status, body = mock._answer(self.path, self.headers)
+                data = json.dumps(body).encode()
+                with mock._lock:
+                    mock.bytes_sent += len(data)
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def _stream(self, handler: BaseHTTPRequestHandler):
+        """Stream prices (and heartbeats) as chunks until the client leaves."""
+        params = {k: v[-1] for k, v in parse_qs(urlparse(handler.path).query).items()}
+        instruments = set(params.get("instruments", "").split(","))
+        stream = (instruments, Queue())
+        with self._lock:
+            self.requests += 1
+            self.log.append(params)
+            self._streams.append(stream)
+        handler.close_connection = True
+        handler.send_response(200)
+        handler.send_header("Content-Type", "application/octet-stream")
+        handler.send_header("Transfer-Encoding", "chunked")
+        handler.end_headers()
+        try:
+            while not self._stopping.is_set():
+                try:
+                    message = stream[1].get(timeout=HEARTBEAT)
+                except Empty:
+                    message = {"type": "HEARTBEAT", "time": f"{self.now}.000000000"}
+                line = json.dumps(message).encode() + b"\n"
+                handler.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+                handler.wfile.flush()
+            handler.wfile.write(b"0\r\n\r\n")
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._streams.remove(stream)
+
+    def _answer(self, path: str, headers) -> tuple:
+        url = urlparse(path)
+        params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+        with self._lock:
+            self.requests += 1
+            self.log.append(params)
+        match = URL_PATTERN.match(url.path)
+        if match is None:
+            return 404, {"errorMessage": f"No such path: {url.path}"}
+        if not headers.get("Authorization", "").startswith("Bearer "):
+            return 401, {"errorMessage": "Insufficient authorization"}
+        gran = params.get("granularity", "S5")
+        if gran not in GRAN_DICT:
+            return 400, {"errorMessage": f"Invalid granularity: {gran}"}
+        after = int(float(params["from"])) if "from" in params else None
+        before = int(float(params["to"])) if "to" in params else None
+        count = int(params["count"]) if "count" in params else None
+        if count is not None and (count > MAX_COUNT or count < 1):
+            return 400, {"errorMessage": f"Invalid value for count: {count}"}
+        if count is not None and after is not None and before is not None:
+            return 400, {"errorMessage": "Count cannot be used with from and to"}
+        if count is None and (after is None or before is None):
+            count = DEFAULT_COUNT
+        times = self.times(GRAN_DICT[gran].duration, after, before, count)
+        if len(times) > MAX_COUNT:
+            return 400, {"errorMessage": "Maximum value for 'count' exceeded"}
+        return 200, self.candles(match.group(1), gran, params.get("price", "M"), times)
@@ -0,0 +1,88 @@
+import pytest
+from forex_types import Pair
+
+from oanda_candles import CandleCollector, CandleStore, Gran
+from oanda_candles.candle_archive import CandleArchive
+
+from .helpers import CLIENT, make_candle, make_candles
+
+
+class TestCandleArchive:
+    def test_empty(self, tmp_path):
+        archive = CandleArchive(str(tmp_path))
+        assert len(archive.load(Pair.EUR_USD, Gran.M1)) == 0
+
+    def test_only_complete_candles_saved(self, tmp_path):
+        archive = CandleArchive(str(tmp_path))
+        candles = make_candles(5) + [make_candle(1_590_000_300, complete=False)]
+        assert archive.save(Pair.EUR_USD, Gran.M1, candles) == 5
+        assert archive.load(Pair.EUR_USD, Gran.M1).candles() == candles[:5]
+        assert len(archive.load(Pair.EUR_USD, Gran.M5)) == 0
+
+    def test_append_and_rewrite(self, tmp_path):
+        archive = CandleArchive(str(tmp_path))
+        candles = make_candles(20)
+        archive.save(Pair.EUR_USD, Gran.M1, candles[5:10])
+        assert archive.save(Pair.EUR_USD, Gran.M1, candles[5:15]) == 5
+        assert archive.save(Pair.EUR_USD, Gran.M1, candles[5:15]) == 0
+        assert archive.load(Pair.EUR_USD, Gran.M1).candles() == candles[5:15]
+        store = CandleStore(Pair.EUR_USD, candles)
+        assert archive.save(Pair.EUR_USD, Gran.M1, store[:]) == 20
+        assert archive.load(Pair.EUR_USD, Gran.M1).candles() == candles
+
+    def test_partial_record_ignored(self, tmp_path):
+        archive = CandleArchive(str(tmp_path))
+        candles = make_candles(3)
+        archive.save(Pair.EUR_USD, Gran.M1, candles[:2])
+        with open(archive.path(Pair.EUR_USD, Gran.M1), "ab") as file:
+            file.write(b"\x00" * 7)
+        assert archive.load(Pair.EUR_USD, Gran.M1).candles() == candles[:2]
+        assert archive.save(Pair.EUR_USD, Gran.M1, candles) == 1
+        assert archive.load(Pair.EUR_USD, Gran.M1).candles() == candles
+
+    def test_never_shrinks(self, tmp_path):
+        archive = CandleArchive(str(tmp_path))
+        candles = make_candles(20)
+        path = archive.path(Pair.EUR_USD, Gran.M1)
+        archive.save(Pair.EUR_USD, Gran.M1, candles[5:10])
+        assert archive.save(Pair.EUR_USD, Gran.M1, candles[12:15]) == 0
+        assert archive.gaps[path] == (candles[9].time, candles[12].time)
+        assert archive.save(Pair.EUR_USD, Gran.M1, candles[:7]) == 0
+        assert archive.load(Pair.EUR_USD, Gran.M1).candles() == candles[5:10]
+        assert archive.save(Pair.EUR_USD, Gran.M1, candles[8:15]) == 5
+        assert path not in archive.gaps
+        assert archive.load(Pair.EUR_USD, Gran.M1).candles() == candles[5:15]
+
+    def test_trim_then_save(self, tmp_path):
+        archive = CandleArchive(str(tmp_path))
+        candles = make_candles(20)
+        collector = CandleCollector(CLIENT, Pair.EUR_USD, Gran.M1, archive=archive)
+        collector._cache[:] = candles[:10]
+        assert collector.save() == 10
+        # Newer candles arrive, but the cache is trimmed before they are saved.
+        collector._cache[10:] = candles[10:]
+        collector.trim(3)
+        assert collector.save() == 0
+        assert archive.load(Pair.EUR_USD, Gran.M1).candles() == candles[:10]
+
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_collector_warm_start(self, tmp_path, columnar):
+        archive = CandleArchive(str(tmp_path))
+        candles = make_candles(10)
+        archive.save(Pair.EUR_USD, Gran.M1, candles)
+        collector = CandleCollector(
+            CLIENT, Pair.EUR_USD, Gran.M1, columnar=columnar, archive=archive
+        )
+        assert len(collector) == 10
+        assert list(collector._cache) == candles
+
+    def test_first_grab_saved(self, tmp_path):
+        candles = make_candles(10) + [make_candle(1_590_000_600, complete=False)]
+        for method in ("grab", "grab_offset"):
+            archive = CandleArchive(str(tmp_path / method))
+            collector = CandleCollector(CLIENT, Pair.EUR_USD, Gran.M1, archive=archive)
+            collector.requester.get = lambda count: candles[-count:]
+            args = (6,) if method == "grab" else (1, 5)
+            getattr(collector, method)(*args)
+            saved = archive.load(Pair.EUR_USD, Gran.M1).candles()
+            assert saved == candles[5:10]
@@ -0,0 +1,49 @@
+import pytest
+from forex_types import Pair
+
+from oanda_candles import CandleStore, Gran, PriceKind
+from oanda_candles.candle_batch import dump, load, to_arrow
+
+from .helpers import make_candle, make_candles, strip
+
+
+class TestCandleBatch:
+    def test_round_trip(self):
+        candles = make_candles(20)
+        candles[-1] = make_candle(candles[-1].time, complete=False)
+        for source in (candles, CandleStore(Pair.EUR_USD, candles)):
+            data = dump(source, Pair.EUR_USD, Gran.M1)
+            batch = load(data)
+            assert batch.pair == Pair.EUR_USD
+            assert batch.gran == Gran.M1
+            assert list(batch.candles) == candles
+            assert not batch.candles[-1].complete
+
+    def test_kinds_and_yen(self):
+        candles = [make_candle(1_590_000_000 + _, base="108.123") for _ in range(5)]
+        kinds = [PriceKind.MID, PriceKind.BID]
+        data = dump(candles, Pair.USD_JPY, Gran.H4, kinds)
+        batch = load(data)
+        assert batch.candles.kinds == ("bid", "mid")
+        assert list(batch.candles) == [strip(_, ("bid", "mid")) for _ in candles]
+        assert len(data) == 30 + 5 * (8 + 1 + 4 * 8)
+
+    def test_bad_data(self):
+        data = dump(make_candles(3), Pair.EUR_USD, Gran.M1)
+        with pytest.raises(ValueError):
+            load(data[:-1])
+        with pytest.raises(ValueError):
+            load(b"x" + data[1:])
+
+    def test_to_arrow(self):
+        pytest.importorskip("pyarrow")
+        table = to_arrow(make_candles(4), Pair.EUR_USD, [PriceKind.BID])
+        assert table.column_names == [
+            "time",
+            "complete",
+            "bid_o",
+            "bid_h",
+            "bid_l",
+            "bid_c",
+        ]
+        assert table.column("bid_o").to_pylist() == [1.1] * 4
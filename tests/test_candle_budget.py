@@ -0,0 +1,62 @@
+from threading import Thread
+from time import sleep
+
+import pytest
+
+from oanda_candles import CandleBudget
+
+from .helpers import make_collector, wait_for
+
+
+class TestCandleBudget:
+    def test_least_recently_used_emptied(self):
+        budget = CandleBudget(max_candles=500)
+        first, second, third = [make_collector(budget=budget) for _ in range(3)]
+        first.grab(200)
+        second.grab(200)
+        first.grab(10)
+        third.grab(200)
+        assert len(second) == 0
+        assert len(first) == 200 and len(third) == 200
+        assert budget.candles == 400
+        candles = second.grab(50)
+        assert len(candles) == 50
+        assert candles[-1].time == second.requester.times[-1]
+        assert budget.candles <= 500
+
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_large_collector_trimmed(self, columnar):
+        budget = CandleBudget(max_candles=300)
+        collector = make_collector(columnar=columnar, budget=budget)
+        times = collector.requester.times
+        collector.grab(200)
+        candles = collector.grab_offset(100, 300)
+        assert [_.time for _ in candles] == times[-400:-100]
+        assert len(collector) == 300
+        assert collector._cache[0].time == times[-300]
+        collector.update_history(10000)
+        assert collector.end_of_history
+        collector.grab(10)
+        assert not collector.end_of_history
+        assert len(collector) == 300
+
+    def test_max_bytes(self):
+        budget = CandleBudget(max_bytes=100_000)
+        collector = make_collector(columnar=True, budget=budget)
+        collector.grab(5000)
+        assert 0 < collector.nbytes <= 100_000
+        assert collector.nbytes + collector.nbytes // len(collector) > 100_000
+
+    def test_used_while_holding_collector_lock(self):
+        budget = CandleBudget(max_candles=300)
+        first, second = [make_collector(budget=budget) for _ in range(2)]
+        first.grab(200)
+        with first._lock:
+            # Grabbing second empties first, waiting for its lock.
+            other = Thread(target=second.grab, args=(200,), daemon=True)
+            other.start()
+            sleep(0.1)
+            # Which must not keep first from telling the budget it was used.
+            budget.used(first)
+        wait_for(lambda: not other.is_alive())
+        assert budget.candles <= 300
@@ -0,0 +1,164 @@
+import asyncio
+
+import pytest
+from forex_types import Pair
+
+from oanda_candles import (
+    AsyncCandleClient,
+    CandleClient,
+    CandleStats,
+    Gran,
+    MarketCalendar,
+)
+
+from .helpers import NOW
+from .mock_v20 import MockV20Server, trading
+
+
+class TestMockV20Server:
+    def test_times(self):
+        server = MockV20Server(NOW)
+        times = server.times(3600, count=100)
+        assert len(times) == 100
+        assert times[-1] == NOW
+        assert all(trading(_) for _ in times)
+        assert times == sorted(times)
+        assert server.times(3600, after=times[0], count=100) == times
+        assert server.times(3600, after=times[0], before=times[50]) == times[:50]
+        assert server.times(3600, before=times[50], count=10) == times[40:50]
+        server.stop()
+
+
+class TestCandleClient:
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_grab(self, columnar):
+        with MockV20Server(NOW) as server:
+            client = CandleClient("token", columnar=columnar, root_url=server.url)
+            candles = client.grab(Pair.EUR_USD, Gran.H1, 100)
+            assert server.requests == 1
+            assert server.log[0]["count"] == "100"
+            assert server.log[0]["price"] == "BAM"
+            assert [_.time for _ in candles] == server.times(3600, count=100)
+            assert not candles[-1].complete and candles[-2].complete
+            assert candles[-1].bid.l < candles[-1].ask.h
+            assert client.grab(Pair.EUR_USD, Gran.H1, 50)[-1] == candles[-1]
+            assert server.requests == 1
+
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_grab_offset(self, columnar):
+        with MockV20Server(NOW) as server:
+            client = CandleClient("token", columnar=columnar, root_url=server.url)
+            times = server.times(60, count=5000)
+            candles = client.grab_offset(Pair.USD_JPY, Gran.M1, 12000, 300)
+            assert len(candles) == 300
+            assert candles[-1].time < times[0]
+            collector = client.get_collector(Pair.USD_JPY, Gran.M1)
+            assert collector.pair == Pair.USD_JPY
+            latest = client.grab_offset(Pair.USD_JPY, Gran.M1, 0, 10)
+            assert [_.time for _ in latest] == times[-10:]
+
+    def test_backfill(self):
+        with MockV20Server(NOW) as server:
+            calendar = MarketCalendar(lambda: server.now)
+            client = CandleClient(
+                "token", backfill_workers=4, root_url=server.url, calendar=calendar
+            )
+            serial = CandleClient("token", root_url=server.url, calendar=calendar)
+            candles = client.grab(Pair.GBP_USD, Gran.M5, 12000)
+            requests = server.requests
+            assert candles == serial.grab(Pair.GBP_USD, Gran.M5, 12000)
+            # Windows sized by the calendar do not overshoot into weekends.
+            assert requests <= server.requests - requests + 1
+            assert [_.time for _ in candles] == server.times(300, count=12000)
+
+    def test_history_start(self):
+        with MockV20Server(NOW, start=NOW - 3600 * 200) as server:
+            client = CandleClient("token", root_url=server.url)
+            candles = client.grab(Pair.EUR_USD, Gran.H1, 1000)
+            assert [_.time for _ in candles] == server.times(3600)
+            assert client.get_collector(Pair.EUR_USD, Gran.H1).end_of_history
+
+
+class TestCandleStats:
+    def test_grab_stats(self):
+        with MockV20Server(NOW) as server:
+            stats = CandleStats()
+            client = CandleClient("token", root_url=server.url, observer=stats)
+            client.grab(Pair.EUR_USD, Gran.H1, 100)
+            assert stats.requests == 1 and stats.candles == 100
+            assert stats.bytes == server.bytes_sent
+            assert stats.misses == 1 and stats.hits == 0
+            client.grab(Pair.EUR_USD, Gran.H1, 50)
+            assert stats.hits == 1 and stats.hit_rate == 0.5
+            client.grab_offset(Pair.EUR_USD, Gran.H1, 8000, 100)
+            assert stats.pages == {"prepend": 3}
+            assert stats.requests == server.requests == 4
+            assert stats.misses == 2
+            assert stats.grab_seconds >= stats.request_seconds > 0
+
+
+class TestStreaming:
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_stream_in_chunks(self, columnar):
+        with MockV20Server(NOW) as server:
+            stats = CandleStats()
+            client = CandleClient(
+                "token", columnar=columnar, root_url=server.url, observer=stats
+            )
+            requester = client.get_collector(Pair.EUR_USD, Gran.M1).requester
+            requester.CHUNK_SIZE = 4096
+            pieces = list(requester.stream(count=2000))
+            assert len(pieces) > 10
+            times = [_.time for piece in pieces for _ in piece]
+            assert times == server.times(60, count=2000)
+            candles = requester._request(count=2000)
+            assert [_.time for _ in candles] == times
+            assert stats.candles == 4000 and stats.requests == 2
+
+
+class TestAsyncCandleClient:
+    def test_grab_many(self):
+        pairs = [Pair.EUR_USD, Pair.GBP_USD, Pair.USD_JPY, Pair.AUD_USD]
+        specs = [(_, Gran.M15, 200) for _ in pairs]
+
+        async def grab_many(url):
+            async with AsyncCandleClient("token", root_url=url) as client:
+                return await client.grab_many(specs)
+
+        with MockV20Server(NOW) as server:
+            results = asyncio.run(grab_many(server.url))
+            assert server.requests == len(pairs)
+        times = server.times(900, count=200)
+        for result in results:
+            assert [_.time for _ in result] == times
+
+    def test_options_forwarded(self, tmp_path):
+        client = AsyncCandleClient(
+            "token",
+            cache_dir=str(tmp_path),
+            backfill_workers=4,
+            max_candles=1000,
+            read_ahead=2,
+        )
+        collector = client.get_collector(Pair.EUR_USD, Gran.M1)
+        assert collector.backfill_workers == 4 and collector.read_ahead == 2
+        assert client.client.budget.max_candles == 1000
+        assert collector.archive is client.client.archive
+        bid = client.get_collector(Pair.EUR_USD, Gran.H1, ["bid"])
+        assert bid.kinds == ("bid",)
+        client.close()
+
+    def test_grab_offset_and_same_collector(self):
+        async def grab(url):
+            async with AsyncCandleClient("token", root_url=url) as client:
+                return await asyncio.gather(
+                    client.grab(Pair.EUR_USD, Gran.H1, 100),
+                    client.grab_offset(Pair.EUR_USD, Gran.H1, 50, 50),
+                )
+
+        with MockV20Server(NOW) as server:
+            latest, older = asyncio.run(grab(server.url))
+            assert server.requests == 1
+        times = server.times(3600, count=100)
+        assert [_.time for _ in latest] == times
+        assert [_.time for _ in older] == times[:50]
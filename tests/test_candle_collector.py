@@ -0,0 +1,179 @@
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
+
+import pytest
+
+from .helpers import START, FakeRequester, make_collector
+
+
+class TestGrabRange:
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_grab_range_fetches_only_missing(self, columnar):
+        collector = make_collector(3000, columnar)
+        times = collector.requester.times
+        collector.grab(100)
+        calls = len(collector.requester.calls)
+        start, end = times[-700], times[-650]
+        candles = collector.grab_range(start, end)
+        assert [_.time for _ in candles] == times[-700:-650]
+        new_calls = collector.requester.calls[calls:]
+        assert [_[1:3] for _ in new_calls] == [(times[-650], times[-700])]
+        assert len(collector) == 100
+        calls = len(collector.requester.calls)
+        assert len(collector.grab_range(times[-680], times[-670] + 1)) == 11
+        assert len(collector.requester.calls) == calls
+
+    def test_grab_since(self):
+        collector = make_collector(500)
+        times = collector.requester.times
+        candles = collector.grab_since(times[-30] - 1)
+        assert [_.time for _ in candles] == times[-30:]
+
+    def test_grab_range_before_history(self):
+        collector = make_collector(500)
+        times = collector.requester.times
+        candles = collector.grab_range(START - 3600 * 100, START + 3600 * 10)
+        assert [_.time for _ in candles] == times[:10]
+        assert len(collector.grab(1000)) == len(times)
+        assert collector.end_of_history and not collector.intervals.intervals
+        candles = collector.grab_range(START - 3600 * 100, START + 3600 * 10)
+        assert [_.time for _ in candles] == times[:10]
+
+
+class TestIntervals:
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_intervals_merge(self, columnar):
+        collector = make_collector(9000, columnar)
+        times = collector.requester.times
+        collector.grab(100)
+        calls = len(collector.requester.calls)
+        collector.grab_range(times[-5000], times[-4900])
+        collector.grab_range(times[-4800], times[-4700])
+        assert len(collector.requester.calls) == calls + 2
+        # Only the gap between the two is requested, then they merge.
+        candles = collector.grab_range(times[-4950], times[-4750])
+        assert [_.time for _ in candles] == times[-4950:-4750]
+        assert collector.requester.calls[-1][1:3] == (times[-4800], times[-4900])
+        assert len(collector.intervals.intervals) == 1
+        assert len(collector) == 100
+
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_cache_absorbs_intervals(self, columnar):
+        collector = make_collector(9000, columnar)
+        times = collector.requester.times
+        collector.grab(100)
+        collector.grab_range(times[-400], times[-300])
+        candles = collector.grab_range(times[-500], times[-390])
+        assert [_.time for _ in candles] == times[-500:-390]
+        collector.grab(600)
+        assert not collector.intervals.intervals
+        assert [_.time for _ in collector.grab(600)] == times[-600:]
+        collector.grab_range(times[-2000], times[-1000])
+        candles = collector.grab_range(times[-2500], times[-1500])
+        assert [_.time for _ in candles] == times[-2500:-1500]
+        assert [_.time for _ in collector.grab(2500)] == times[-2500:]
+        assert not collector.intervals.intervals
+
+
+class SlowRequester(FakeRequester):
+    def _request(self, *args, **kwargs):
+        sleep(0.05)
+        return super()._request(*args, **kwargs)
+
+
+class TestThreads:
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_concurrent_grabs_share_requests(self, columnar):
+        collector = make_collector(9000, columnar)
+        collector.requester = SlowRequester(START + 3600 * 9000, columnar)
+        times = collector.requester.times
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: collector.grab(7000), range(8)))
+        calls = collector.requester.calls
+        assert len(calls) == 3
+        for candles in results:
+            assert [_.time for _ in candles] == times[-7000:]
+
+    def test_concurrent_refreshes_coalesce(self):
+        collector = make_collector(500)
+        collector.requester = SlowRequester(START + 3600 * 500)
+        collector.grab(100)
+        calls = len(collector.requester.calls)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            first = pool.submit(collector.refresh)
+            while not collector._refreshing:
+                sleep(0.001)
+            others = [pool.submit(collector.refresh) for _ in range(3)]
+            for future in [first, *others]:
+                future.result()
+        assert len(collector.requester.calls) == calls + 1
+        assert [_.time for _ in collector.grab(100)] == collector.requester.times[-100:]
+
+
+    def test_refreshes_waiting_for_lock_coalesce(self):
+        collector = make_collector(500)
+        collector.requester = SlowRequester(START + 3600 * 500)
+        collector.grab(100)
+        calls = len(collector.requester.calls)
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            # As when a grab has the lock while the refreshes start.
+            with collector._lock:
+                futures = [pool.submit(collector.refresh) for _ in range(4)]
+                sleep(0.1)
+            for future in futures:
+                future.result()
+        assert len(collector.requester.calls) == calls + 1
+
+class TestReadAhead:
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_paging_back_reads_ahead(self, columnar):
+        collector = make_collector(9000, columnar)
+        collector.read_ahead = 3
+        times = collector.requester.times
+        calls = collector.requester.calls
+        collector.grab_offset(0, 500)
+        collector.grab_offset(500, 500)
+        collector._reading.join()
+        assert len(collector) == 1000 + 3 * 500
+        requested = len(calls)
+        for offset in (1000, 1500):
+            candles = collector.grab_offset(offset, 500)
+            assert [_.time for _ in candles] == times[-offset - 500 : -offset]
+        collector._reading.join()
+        # Only the read ahead once the lead dropped under half its pages.
+        assert calls[requested:] == [(1000, times[-2500], None, collector.kinds)]
+        assert len(collector) == 2000 + 3 * 500
+
+    def test_grab_waits_for_page_in_flight(self):
+        collector = make_collector(30000)
+        collector.requester = SlowRequester(START + 3600 * 30000)
+        collector.read_ahead = 4
+        times = collector.requester.times
+        calls = collector.requester.calls
+        collector.grab_offset(0, 3000)
+        collector.grab_offset(3000, 3000)
+        requested = len(calls)
+        # Within the first of the pages being read ahead.
+        candles = collector.grab_offset(6000, 3000)
+        assert [_.time for _ in candles] == times[-9000:-6000]
+        assert collector._reading.is_alive()
+        collector._reading.join()
+        kinds = collector.kinds
+        assert calls[requested:] == [
+            (5000, times[-6000], None, kinds),
+            (5000, times[-11000], None, kinds),
+            (2000, times[-16000], None, kinds),
+        ]
+        assert len(collector) == 18000
+
+    def test_cancel(self):
+        collector = make_collector(9000)
+        collector.requester = SlowRequester(START + 3600 * 9000)
+        collector.read_ahead = 4
+        collector.grab_offset(0, 100)
+        collector.grab_offset(100, 100)
+        assert collector._reading.is_alive()
+        collector.cancel_read_ahead()
+        assert len(collector) == 200
+        collector.grab_offset(200, 100)
+        assert len(collector) == 300 and not collector._reading.is_alive()
@@ -0,0 +1,101 @@
+from math import isclose, isnan
+
+import pytest
+
+from forex_types import Pair
+
+from oanda_candles import Atr, Bollinger, CandleClient, Ema, Gran, Sma
+
+from .helpers import NOW
+from .mock_v20 import MockV20Server
+
+
+def make_indicators() -> dict:
+    return {
+        "sma": Sma(10),
+        "ema": Ema(10, field="o"),
+        "atr": Atr(14),
+        "bb": Bollinger(),
+    }
+
+
+def same(first, second) -> bool:
+    return len(first) == len(second) and all(
+        (isnan(a) and isnan(b)) or isclose(a, b, rel_tol=1e-9)
+        for a, b in zip(first, second)
+    )
+
+
+def assert_fresh(collector):
+    """Assert incrementally updated indicators match ones computed anew."""
+    for name, fresh in make_indicators().items():
+        indicator = collector.indicators[name]
+        fresh.reset(collector._cache)
+        assert len(indicator) == len(collector)
+        for key, values in indicator.arrays.items():
+            assert same(values, fresh.arrays[key]), (name, key)
+
+
+class TestIndicators:
+    def test_sma(self):
+        with MockV20Server(NOW) as server:
+            client = CandleClient("token", root_url=server.url)
+            collector = client.get_collector(Pair.EUR_USD, Gran.M5)
+            sma = collector.add_indicator("sma", Sma(5, field="h"))
+            candles = collector.grab(50)
+            highs = [float(str(_.mid.h)) for _ in candles[-5:]]
+            assert isclose(sma[-1], sum(highs) / 5)
+            assert isnan(sma[3]) and not isnan(sma[4])
+
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_incremental_updates(self, columnar):
+        with MockV20Server(NOW) as server:
+            client = CandleClient("token", columnar=columnar, root_url=server.url)
+            collector = client.get_collector(Pair.EUR_USD, Gran.M5)
+            for name, indicator in make_indicators().items():
+                collector.add_indicator(name, indicator)
+            collector.grab(300)
+            assert_fresh(collector)
+            server.now += 300 * 3 + 100
+            collector.refresh()
+            assert collector.grab(1)[-1].time == NOW + 900
+            assert_fresh(collector)
+            first = collector._cache[0].time
+            collector.grab_range(first - 2000 * 300, first - 1800 * 300)
+            collector.grab(3000)
+            assert len(collector) == 3000
+            assert_fresh(collector)
+            values = list(collector.indicators["ema"].values)
+            collector.trim(500)
+            assert list(collector.indicators["ema"].values) == values[-500:]
+            collector.clear()
+            assert len(collector.indicators["bb"].upper) == 0
+
+    def test_kind_must_be_collected(self):
+        client = CandleClient("token")
+        collector = client.get_collector(Pair.EUR_USD, Gran.M5, kinds=["bid"])
+        with pytest.raises(ValueError):
+            collector.add_indicator("ema", Ema(10))
+        assert collector.add_indicator("ema", Ema(10, kind="bid")).kind == "bid"
+
+    def test_recursive_recomputed_once_per_prepend(self):
+        resets = []
+
+        class CountingEma(Ema):
+            def reset(self, candles):
+                resets.append(len(candles))
+                super().reset(candles)
+
+        with MockV20Server(NOW) as server:
+            client = CandleClient("token", root_url=server.url)
+            collector = client.get_collector(Pair.EUR_USD, Gran.M1)
+            collector.add_indicator("ema", CountingEma(10, field="o"))
+            collector.grab(100)
+            requests = server.requests
+            resets.clear()
+            collector.grab_range(collector.grab(1)[-1].time - 12000 * 60)
+            assert server.requests - requests >= 2
+            assert len(resets) == 1
+            fresh = Ema(10, field="o")
+            fresh.reset(collector._cache)
+            assert same(collector.indicators["ema"].values, fresh.values)
@@ -0,0 +1,56 @@
+from math import isnan
+
+import pytest
+from forex_types import Pair
+
+from oanda_candles import CandleClient, Gran
+from oanda_candles.candle_panel import panel_of
+
+from .helpers import NOW
+from .mock_v20 import MockV20Server
+
+PAIRS = [Pair.EUR_USD, Pair.USD_JPY, Pair.GBP_USD]
+
+
+class TestCandlePanel:
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_panel_aligns_pairs(self, columnar):
+        with MockV20Server(NOW) as server:
+            client = CandleClient("token", columnar=columnar, root_url=server.url)
+            panel = client.panel(PAIRS, Gran.H1, 50, side="bid", field="h")
+            assert server.requests == 3
+            assert all(_["price"] == "BAM" for _ in server.log)
+            assert panel.shape == (50, 3)
+            assert list(panel.times) == server.times(3600, count=50)
+            yen = client.grab(Pair.USD_JPY, Gran.H1, 50)
+            assert list(panel.column(Pair.USD_JPY)) == [
+                float(str(_.bid.h)) for _ in yen
+            ]
+            assert panel.row(-1)[1] == float(str(yen[-1].bid.h))
+            assert panel.missing() == 0
+            client.panel(PAIRS, Gran.H1, 20)
+            assert server.requests == 3
+            candles = client.grab(Pair.EUR_USD, Gran.H1, 5)
+            assert candles[-1].ask is not None and candles[-1].bid is not None
+            narrow = client.get_collector(Pair.AUD_USD, Gran.H1, kinds=["bid"])
+            client.panel([Pair.AUD_USD], Gran.H1, 5, side="ask")
+            assert set(narrow.kinds) == {"bid", "ask"}
+
+    def test_missing(self):
+        with MockV20Server(NOW) as server:
+            client = CandleClient("token", root_url=server.url)
+            candles = {_: client.grab(_, Gran.H1, 10) for _ in PAIRS}
+        candles[Pair.USD_JPY] = candles[Pair.USD_JPY][:4] + candles[Pair.USD_JPY][5:]
+        panel = panel_of(candles, 10)
+        assert panel.missing() == 1 and isnan(panel.column(Pair.USD_JPY)[4])
+        filled = panel_of(candles, 10, missing="ffill").column(Pair.USD_JPY)
+        assert filled[4] == filled[3]
+        dropped = panel_of(candles, 10, missing="drop")
+        assert len(dropped) == 9 and dropped.times[4] == panel.times[5]
+        with pytest.raises(ValueError):
+            panel_of(candles, 10, missing="zero")
+        numpy = pytest.importorskip("numpy")
+        array = panel.to_numpy()
+        assert array.shape == (10, 3) and numpy.isnan(array[4, 1])
+        array[0, 0] = 0.0
+        assert panel.column(Pair.EUR_USD)[0] == 0.0
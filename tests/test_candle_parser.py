@@ -0,0 +1,73 @@
+import json
+
+from forex_types import FracPips, Pair, Price
+
+from oanda_candles import Candle, Ohlc
+from oanda_candles.candle_parser import (
+    CandleChunks,
+    iter_candles,
+    iter_frames,
+    parse_candles,
+    parse_frame,
+)
+
+
+def make_body(prices: dict) -> bytes:
+    candle = {
+        "complete": False,
+        "volume": 12,
+        "time": "1590177600.000000000",
+        "ask": prices,
+        "bid": prices,
+        "mid": prices,
+    }
+    return json.dumps({"candles": [candle, dict(candle, complete=True)]}).encode()
+
+
+def test_parse_frame_matches_per_candle():
+    body = make_body({"o": "1.10001", "h": "1.10050", "l": "1.09990", "c": "1.1"})
+    expected = [Candle.from_oanda(_) for _ in json.loads(body)["candles"]]
+    assert parse_candles(body) == expected
+    frame = parse_frame(body, Pair.EUR_USD)
+    assert frame.candles() == expected
+    assert frame.column("ask", "c")[0] == 110000
+
+
+def test_parse_frame_yen():
+    body = make_body({"o": "108.001", "h": "108.500", "l": "107.990", "c": "108.1"})
+    expected = [Candle.from_oanda(_) for _ in json.loads(body)["candles"]]
+    frame = parse_frame(body, Pair.USD_JPY)
+    assert frame.candles() == expected
+    assert list(frame.times) == [1590177600, 1590177600]
+    assert list(frame.flags) == [0, 1]
+
+
+def test_decode_in_chunks():
+    body = make_body({"o": "1.10001", "h": "1.10050", "l": "1.09990", "c": "1.1"})
+    body = body.replace(b"]}", b", " + body[body.index(b"[") + 1 :])
+    expected = parse_candles(body)
+    for size in (1, 5, 64, len(body)):
+        chunks = [body[_ : _ + size] for _ in range(0, len(body), size)]
+        assert [_ for got in iter_candles(chunks) for _ in got] == expected
+        frames = list(iter_frames(chunks, Pair.EUR_USD))
+        assert [_ for frame in frames for _ in frame] == expected
+    splitter = CandleChunks()
+    half = len(body) // 2
+    assert len(splitter.feed(body[:half])) + len(splitter.feed(body[half:])) == 4
+    assert splitter._buffer == b"]}"
+
+
+def test_ohlc_prices_made_lazily():
+    ohlc = Ohlc.from_oanda({"o": "1.10001", "h": "1.1005", "l": "1.0999", "c": "1.1"})
+    assert ohlc._prices is None
+    assert ohlc.to_fp() == (110001, 110050, 109990, 110000)
+    assert ohlc.h == Price("1.1005")
+    assert ohlc.h is ohlc.h
+    assert ohlc.l_fp == FracPips.from_price(Price("1.0999"))
+    assert ohlc == Ohlc(
+        Price("1.10001"), Price("1.1005"), Price("1.0999"), Price("1.1")
+    )
+    assert Ohlc.from_tuple(ohlc.to_tuple()) == ohlc
+    yen = Ohlc.from_oanda({"o": "108.1", "h": "108.5", "l": "107.99", "c": "108"})
+    assert yen.to_fp() == (108100, 108500, 107990, 108000)
+    assert yen.c == Price("108.000")
@@ -0,0 +1,72 @@
+import pytest
+from forex_types import Pair
+
+from oanda_candles import CandleClient, Gran, ReplayClient
+from oanda_candles.candle_batch import dump, load
+
+from .helpers import NOW
+from .mock_v20 import MockV20Server
+
+# Tuesday 8 September 2020 00:02:30 UTC.
+START = 1_599_523_350
+
+
+def record(directory: str) -> list:
+    """Record two weeks of M5 candles up to NOW in directory."""
+    with MockV20Server(NOW) as server:
+        client = CandleClient("token", cache_dir=directory, root_url=server.url)
+        candles = list(client.grab(Pair.EUR_USD, Gran.M5, 3000))
+        client.get_collector(Pair.EUR_USD, Gran.M5).save()
+        return candles
+
+
+class TestReplayClient:
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_no_look_ahead(self, tmp_path, columnar):
+        recorded = {_.time: _ for _ in record(str(tmp_path))}
+        client = ReplayClient(str(tmp_path), START, columnar=columnar)
+        candles = client.grab(Pair.EUR_USD, Gran.M5, 20)
+        last = candles[-1]
+        assert last.time == START - 150 and not last.complete
+        assert last.mid.o == last.mid.h == last.mid.l == last.mid.c
+        assert last.bid.o == recorded[last.time].bid.o
+        assert list(candles[:-1]) == [recorded[_.time] for _ in candles[:-1]]
+        client.advance(300)
+        candles = client.grab(Pair.EUR_USD, Gran.M5, 20)
+        assert candles[-2] == recorded[START - 150]
+        assert candles[-1].time == START + 150 and not candles[-1].complete
+        assert [_.time for _ in client.grab_offset(Pair.EUR_USD, Gran.M5, 5, 3)][
+            -1
+        ] == START - 1350
+
+    def test_run_skips_closed_market(self, tmp_path):
+        record(str(tmp_path))
+        client = ReplayClient(str(tmp_path), START)
+        collector = client.get_collector(Pair.EUR_USD, Gran.M5)
+        steps = 0
+        for now in client.run(START + 7 * 86400, 300):
+            candles = collector.grab(50)
+            assert candles[-1].time <= now < candles[-1].time + 300 or (
+                not client.calendar.is_open(now)
+            )
+            steps += 1
+        assert steps == 7 * 288
+        # The weekend is not requested once the final candle is in.
+        assert collector.requester.request_count < steps - 500
+
+    def test_set_time_back(self, tmp_path):
+        record(str(tmp_path))
+        client = ReplayClient(str(tmp_path), START + 86400)
+        client.grab(Pair.EUR_USD, Gran.M5, 10)
+        client.set_time(START)
+        candles = client.grab(Pair.EUR_USD, Gran.M5, 10)
+        assert candles[-1].time == START - 150
+
+    def test_batch_source(self, tmp_path):
+        candles = record(str(tmp_path))
+        batch = load(dump(candles, Pair.EUR_USD, Gran.M5))
+        client = ReplayClient({(batch.pair, batch.gran): batch.candles}, START)
+        archived = ReplayClient(str(tmp_path), START)
+        assert list(client.grab(Pair.EUR_USD, Gran.M5, 100)) == list(
+            archived.grab(Pair.EUR_USD, Gran.M5, 100)
+        )
@@ -0,0 +1,120 @@
+import pytest
+from forex_types import Pair
+
+from oanda_candles import (
+    Candle,
+    CandleClient,
+    CandleCollector,
+    CandleStore,
+    Gran,
+    PriceKind,
+)
+from oanda_candles.candle_requester import CandleRequester
+
+from .helpers import CLIENT, NOW, START, FakeRequester, make_candle, strip
+from .mock_v20 import MockV20Server
+
+
+class TestBackfill:
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_backfill_matches_prepend(self, columnar):
+        now = START + 3600 * 9000
+        requester = FakeRequester(now, columnar)
+        expected = [make_candle(_) for _ in requester.times[-5500:]]
+        candles = CandleStore(Pair.EUR_USD) if columnar else []
+        candles[:] = requester._request(count=500)
+        assert requester.backfill(candles, 5000, workers=3)
+        assert len(candles) >= 5500
+        assert list(candles[-5500:]) == expected
+        times = [_.time for _ in candles]
+        assert times == sorted(set(times))
+        assert all(_[0] is None for _ in requester.calls[1:])
+
+    def test_backfill_end_of_history(self):
+        requester = FakeRequester(START + 3600 * 1500)
+        candles = requester._request(count=100)
+        assert not requester.backfill(candles, 4000, workers=4)
+        assert [_.time for _ in candles] == requester.times
+
+
+class GapRequester(FakeRequester):
+    """FakeRequester lacking the candle at gap when asked for ask prices."""
+
+    gap = None
+
+    def _request(self, count=None, before=None, after=None, kinds=None):
+        candles = super()._request(count, before, after, kinds)
+        if kinds is None or "ask" not in kinds or "mid" in kinds:
+            return candles
+        kept = [_ for _ in candles if _.time != self.gap]
+        if self.columnar:
+            return CandleStore(self.pair, kept, candles.kinds)[:]
+        return kept
+
+
+class TestPriceKinds:
+    def test_params(self):
+        requester = CandleRequester(CLIENT, Pair.EUR_USD, Gran.H1)
+        assert requester.params["price"] == "BAM"
+        requester = CandleRequester(
+            CLIENT, Pair.EUR_USD, Gran.H1, kinds=[PriceKind.MID, PriceKind.BID]
+        )
+        assert requester.kinds == ("bid", "mid")
+        assert requester.params["price"] == "BM"
+
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_add_kinds(self, columnar):
+        now = START + 3600 * 200
+        collector = CandleCollector(
+            CLIENT, Pair.EUR_USD, Gran.H1, columnar, kinds=[PriceKind.MID]
+        )
+        collector.requester = FakeRequester(now, columnar, collector.kinds)
+        collector.grab(100)
+        assert collector._cache[-1].ask is None
+        assert collector._cache[-1].mid is not None
+        collector.requester.calls.clear()
+        assert collector.add_kinds([PriceKind.ASK]) == ("ask", "mid")
+        assert collector.requester.calls[0][3] == ("ask",)
+        assert collector.requester.calls[-1][3] == ("ask", "mid")
+        expected = [
+            strip(make_candle(_), ("ask", "mid"))
+            for _ in range(START + 3600 * 100, now, 3600)
+            if (_ - START) // 86400 % 4 != 3
+        ]
+        assert list(collector._cache)[-len(expected) :] == expected
+
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_add_kinds_with_gap(self, columnar, caplog):
+        now = START + 3600 * 9000
+        collector = CandleCollector(
+            CLIENT, Pair.EUR_USD, Gran.H1, columnar, kinds=[PriceKind.MID]
+        )
+        collector.requester = GapRequester(now, columnar, collector.kinds)
+        times = collector.requester.times
+        collector.grab(6000)
+        collector.requester.gap = times[-1000]
+        collector.add_kinds([PriceKind.ASK])
+        # Only the candles before the gap are dropped, the rest keep their
+        # mid prices and get ask prices.
+        assert [_.time for _ in collector._cache] == times[-999:]
+        assert all(_.ask is not None for _ in collector._cache)
+        assert "Dropped 5001" in caplog.text
+        assert not collector.end_of_history
+        candles = collector.grab(2000)
+        assert [_.time for _ in candles] == times[-2000:]
+
+
+class TestColumnarGet:
+    @pytest.mark.parametrize("count", [5000, 12000])
+    def test_large_get_makes_no_candles(self, count, monkeypatch):
+        def no_candles(*args, **kwargs):
+            raise AssertionError("Candle made")
+
+        with MockV20Server(NOW) as server:
+            client = CandleClient("token", root_url=server.url)
+            requester = CandleRequester(client, Pair.EUR_USD, Gran.M5, columnar=True)
+            monkeypatch.setattr(Candle, "__init__", no_candles)
+            candles = requester.get(count)
+            monkeypatch.undo()
+        assert isinstance(candles, CandleStore)
+        assert list(candles.times) == server.times(300, count=count)
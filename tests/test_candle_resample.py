@@ -0,0 +1,126 @@
+from datetime import datetime, timezone
+from threading import Thread
+from time import sleep
+
+import pytest
+from forex_types import Pair
+
+from oanda_candles import CandleClient, Gran, MarketCalendar
+from oanda_candles.candle_resample import (
+    bucket_end,
+    bucket_start,
+    can_resample,
+    resample,
+)
+
+from .helpers import NOW, wait_for
+from .mock_v20 import MockV20Server
+
+# Saturday 2020-09-19 12:00 UTC, after the market closed at Friday 21:00.
+SATURDAY = NOW + 3 * 86400
+
+
+class SlowServer(MockV20Server):
+    def _answer(self, path: str, headers) -> tuple:
+        sleep(0.02)
+        return super()._answer(path, headers)
+
+
+def utc(*args) -> int:
+    return int(datetime(*args, tzinfo=timezone.utc).timestamp())
+
+
+def test_buckets():
+    assert bucket_start(NOW - 1234, Gran.H4) == NOW - 4 * 3600
+    assert bucket_start(NOW, Gran.D) == utc(2020, 9, 16)
+    assert bucket_start(NOW, Gran.W) == utc(2020, 9, 13)
+    assert bucket_start(utc(2020, 9, 13), Gran.W) == utc(2020, 9, 13)
+    assert bucket_start(NOW, Gran.M) == utc(2020, 9, 1)
+    assert bucket_end(utc(2020, 12, 1), Gran.M) == utc(2021, 1, 1)
+    assert can_resample(Gran.M5, Gran.H1) and can_resample(Gran.H1, Gran.W)
+    assert not can_resample(Gran.H2, Gran.H3) and not can_resample(Gran.W, Gran.M)
+    with pytest.raises(ValueError):
+        CandleClient("token", resample={Gran.M1: Gran.H1})
+
+
+class TestResampledCollector:
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_grab_matches_oanda_alignment(self, columnar):
+        with MockV20Server(NOW) as server:
+            client = CandleClient(
+                "token",
+                columnar=columnar,
+                root_url=server.url,
+                resample={Gran.H1: Gran.M5},
+            )
+            candles = client.grab(Pair.EUR_USD, Gran.H1, 100)
+            assert [_.time for _ in candles] == server.times(3600, count=100)
+            assert not candles[-1].complete and candles[-2].complete
+            fine = client.get_collector(Pair.EUR_USD, Gran.M5).grab_range(
+                candles[-2].time
+            )
+            hour = [_ for _ in fine if _.time < candles[-1].time]
+            assert len(hour) == 12
+            assert candles[-2].bid.o == hour[0].bid.o
+            assert candles[-2].ask.h == max(_.ask.h for _ in hour)
+            assert candles[-2].mid.l == min(_.mid.l for _ in hour)
+            assert candles[-2].mid.c == hour[-1].mid.c
+            assert all(_["granularity"] == "M5" for _ in server.log)
+            requests = server.requests
+            client.grab(Pair.EUR_USD, Gran.H1, 50)
+            assert server.requests == requests
+            collector = client.get_collector(Pair.EUR_USD, Gran.H1)
+            older = collector.grab_range(NOW - 60 * 86400, NOW - 59 * 86400)
+            expected = server.times(3600, NOW - 60 * 86400, NOW - 59 * 86400)
+            assert [_.time for _ in older] == expected
+            assert all(_.complete for _ in older)
+
+    def test_complete_once_market_closed(self):
+        calendar = MarketCalendar(lambda: SATURDAY)
+        with MockV20Server(SATURDAY) as server:
+            client = CandleClient(
+                "token",
+                root_url=server.url,
+                calendar=calendar,
+                resample={Gran.H4: Gran.M5, Gran.W: Gran.H1},
+            )
+            candles = client.grab(Pair.EUR_USD, Gran.H4, 10)
+            assert candles[-1].time == utc(2020, 9, 18, 20)
+            assert candles[-1].complete
+            weeks = client.grab(Pair.EUR_USD, Gran.W, 2)
+            assert [_.time for _ in weeks] == [utc(2020, 9, 6), utc(2020, 9, 13)]
+            assert all(_.complete for _ in weeks)
+            hourly = client.get_collector(Pair.EUR_USD, Gran.H1)
+            week = hourly.grab_range(weeks[-1].time)
+            assert weeks[-1].ask.h == max(_.ask.h for _ in week)
+            frame = resample(week, Pair.EUR_USD, Gran.H1, Gran.D, calendar=calendar)
+            assert list(frame.times) == [utc(2020, 9, 13 + _) for _ in range(6)]
+
+    def test_budget_with_threads(self):
+        with SlowServer(NOW) as server:
+            client = CandleClient(
+                "token",
+                root_url=server.url,
+                resample={Gran.H1: Gran.M5},
+                max_candles=1420,
+            )
+            errors = []
+
+            def hourly():
+                collector = client.get_collector(Pair.EUR_USD, Gran.H1)
+                for count in range(50, 60):
+                    candles = collector.grab(count)
+                    if len(candles) != count:
+                        errors.append(len(candles))
+                    collector.refresh()
+
+            def other():
+                for count in range(1000, 1010):
+                    client.grab(Pair.GBP_USD, Gran.M5, count)
+
+            threads = [Thread(target=_, daemon=True) for _ in (hourly, other) * 2]
+            for thread in threads:
+                thread.start()
+            wait_for(lambda: not any(_.is_alive() for _ in threads), 60)
+            assert not errors
+            assert client.budget.candles <= 1420
@@ -0,0 +1,62 @@
+from time import monotonic, sleep, time
+from types import SimpleNamespace
+
+from forex_types import Pair
+
+from oanda_candles import CandleCollector, Gran
+from oanda_candles.candle_scheduler import RefreshScheduler
+
+from .helpers import CLIENT, make_candle
+
+
+class CountingRequester:
+    def __init__(self):
+        self.extended = 0
+
+    def extend(self, candles):
+        self.extended += 1
+
+
+def counting_collector(gran: Gran, last_time: int) -> CandleCollector:
+    collector = CandleCollector(CLIENT, Pair.EUR_USD, gran)
+    collector.requester = CountingRequester()
+    collector._cache[:] = [make_candle(last_time, complete=False)]
+    return collector
+
+
+class TestRefreshScheduler:
+    def test_due_uses_freshness_and_boundary(self):
+        now = int(time())
+        quick = counting_collector(Gran.M1, now - 58)
+        slow = counting_collector(Gran.H12, now // 43200 * 43200)
+        quick.last_update = slow.last_update = monotonic()
+        scheduler = RefreshScheduler(SimpleNamespace(collectors=lambda: []))
+        assert scheduler.due(quick) < quick.last_update + Gran.M1.freshness
+        assert scheduler.due(slow) == slow.last_update + Gran.H12.freshness
+
+    def test_run_pending_refreshes_due_collectors(self):
+        now = int(time())
+        due = counting_collector(Gran.H12, now // 43200 * 43200)
+        due.last_update = monotonic() - 20
+        fresh = counting_collector(Gran.H12, now // 43200 * 43200)
+        fresh.last_update = monotonic()
+        client = SimpleNamespace(collectors=lambda: [due, fresh])
+        wait = RefreshScheduler(client).run_pending()
+        assert due.requester.extended == 1
+        assert fresh.requester.extended == 0
+        assert due.scheduled and fresh.scheduled
+        assert 0 < wait <= Gran.H12.freshness
+
+    def test_background_thread(self):
+        collector = counting_collector(Gran.H12, int(time()) // 43200 * 43200)
+        collector.last_update = monotonic() - 20
+        scheduler = RefreshScheduler(SimpleNamespace(collectors=lambda: [collector]))
+        scheduler.start()
+        assert scheduler.running
+        deadline = monotonic() + 2
+        while not collector.requester.extended and monotonic() < deadline:
+            sleep(0.01)
+        scheduler.stop()
+        assert not scheduler.running
+        assert collector.requester.extended == 1
+        assert not collector.scheduled
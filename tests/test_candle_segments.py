@@ -0,0 +1,46 @@
+from oanda_candles.candle_segments import CandleSegments
+
+from .helpers import START, make_candle, make_collector
+
+
+def candles(first: int, count: int) -> list:
+    return [make_candle(START + 3600 * _) for _ in range(first, first + count)]
+
+
+class TestCandleSegments:
+    def test_prepend_makes_segments(self):
+        expected = candles(0, 9000)
+        segments = CandleSegments(expected[-3000:])
+        for start in (4000, 1000, 0):
+            segments[0:0] = expected[start : len(expected) - len(segments)]
+        assert len(segments._segments) == 4
+        assert list(segments) == expected
+        assert segments[1500:6500] == expected[1500:6500]
+        assert segments[-1] == expected[-1] and segments[3999] == expected[3999]
+        assert segments.bisect(expected[4321].time) == 4321
+        assert segments.bisect(expected[-1].time + 1) == 9000
+
+    def test_patch_and_trim(self):
+        expected = candles(0, 5000)
+        segments = CandleSegments(expected[2000:])
+        segments[0:0] = expected[:2000]
+        last = segments._segments[-1]
+        newer = candles(4999, 10)
+        segments[-1:] = newer
+        expected[-1:] = newer
+        assert segments._segments[-1] is last
+        assert list(segments) == expected
+        del segments[:2500]
+        assert list(segments) == expected[2500:]
+        assert len(segments._segments) == 1
+        del segments[:]
+        assert not segments and segments[:] == []
+
+    def test_collector_cache(self):
+        collector = make_collector(30000)
+        times = collector.requester.times
+        collector.grab(12000)
+        assert isinstance(collector._cache, CandleSegments)
+        assert len(collector._cache._segments) > 1
+        assert [_.time for _ in collector.grab(12000)] == times[-12000:]
+        assert [_.time for _ in collector.grab_offset(11000, 5)] == times[-11005:-11000]
@@ -0,0 +1,87 @@
+import multiprocessing
+import os
+
+import pytest
+from forex_types import Pair, Price
+
+from oanda_candles import CandleClient, Gran, MarketCalendar, PriceStreamer
+from oanda_candles.candle_shared import SharedCandlePublisher, SharedCandleReader
+
+from .helpers import NOW, wait_for
+from .mock_v20 import MockV20Server
+
+NAMESPACE = f"oactest{os.getpid()}"
+
+
+def read_latest(count: int, namespace: str) -> list:
+    with SharedCandleReader(Pair.EUR_USD, Gran.M5, namespace=namespace) as reader:
+        frame = reader.grab(count)
+        times = list(frame.times)
+        del frame
+    return times
+
+
+class TestSharedCandles:
+    @pytest.mark.parametrize("columnar", [False, True])
+    def test_publish_and_read(self, columnar):
+        with MockV20Server(NOW) as server:
+            client = CandleClient("token", columnar=columnar, root_url=server.url)
+            with SharedCandlePublisher(
+                client, capacity=500, namespace=NAMESPACE
+            ) as publisher:
+                candles = client.grab(Pair.EUR_USD, Gran.M5, 300)
+                publisher.publish_all()
+                reader = SharedCandleReader(Pair.EUR_USD, Gran.M5, namespace=NAMESPACE)
+                frame = reader.grab(10)
+                assert list(frame) == list(candles[-10:])
+                assert len(reader) == 300 and not reader.changed
+                version = reader.version
+                publisher.publish_all()
+                assert reader.version == version
+                server.now += 600
+                collector = client.get_collector(Pair.EUR_USD, Gran.M5)
+                collector.refresh()
+                publisher.publish_all()
+                assert reader.changed and reader.wait(version, 0)
+                frame = reader.grab_offset(2, 5)
+                assert list(frame) == list(collector.grab(7)[:5])
+                client.grab(Pair.EUR_USD, Gran.M5, 800)
+                publisher.publish_all()
+                frame = reader.frame()
+                assert len(frame) == 500
+                assert list(frame) == list(collector.grab(500))
+                del frame
+                reader.close()
+
+    def test_other_process(self):
+        with MockV20Server(NOW) as server:
+            client = CandleClient("token", root_url=server.url)
+            with SharedCandlePublisher(client, namespace=NAMESPACE) as publisher:
+                candles = client.grab(Pair.EUR_USD, Gran.M5, 100)
+                publisher.publish_all()
+                context = multiprocessing.get_context("spawn")
+                with context.Pool(1) as pool:
+                    times = pool.apply(read_latest, (20, NAMESPACE))
+        assert times == [_.time for _ in candles[-20:]]
+
+    def test_publish_streamed_prices(self):
+        with MockV20Server(NOW) as server:
+            calendar = MarketCalendar(lambda: server.now)
+            client = CandleClient("token", root_url=server.url, calendar=calendar)
+            streamer = PriceStreamer(client, "101-001-1-1")
+            collector = streamer.subscribe(Pair.EUR_USD, Gran.M5)
+            with SharedCandlePublisher(client, namespace=NAMESPACE) as publisher:
+                streamer.start()
+                wait_for(lambda: server.streams == 1 and len(collector))
+                publisher.publish_all()
+                reader = SharedCandleReader(Pair.EUR_USD, Gran.M5, namespace=NAMESPACE)
+                version = reader.version
+                server.tick("EUR_USD", NOW + 30, "1.20001", "1.20011")
+                wait_for(lambda: streamer.prices == 1)
+                publisher.publish_all()
+                assert reader.changed and reader.wait(version, 0)
+                frame = reader.grab(1)
+                assert frame[-1].bid.c == Price("1.20001")
+                del frame
+                streamer.stop(5)
+                reader.close()
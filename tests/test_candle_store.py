@@ -0,0 +1,84 @@
+from forex_types import Pair
+
+from oanda_candles import Candle, CandleFrame, CandleStore, PriceKind
+from oanda_candles.candle_store import to_frame
+
+from .helpers import make_candle, make_candles
+
+
+class TestCandleStore:
+    def test_round_trip(self):
+        candles = make_candles(10)
+        store = CandleStore(Pair.EUR_USD, candles)
+        assert len(store) == 10
+        assert store[0] == candles[0]
+        assert store[-1] == candles[-1]
+        assert list(store) == candles
+
+    def test_yen_round_trip(self):
+        candle = make_candle(1_590_000_000, base="108.123")
+        store = CandleStore(Pair.USD_JPY, [candle])
+        assert store[0] == candle
+
+    def test_slice_is_frame(self):
+        store = CandleStore(Pair.EUR_USD, make_candles(10))
+        frame = store[-4:-1]
+        assert isinstance(frame, CandleFrame)
+        assert len(frame) == 3
+        assert frame[0].time == 1_590_000_000 + 6 * 60
+        assert frame.column(PriceKind.BID, "c")[0] == 110010
+        assert frame.candles() == make_candles(10)[-4:-1]
+
+    def test_list_style_mutation(self):
+        candles = make_candles(10)
+        store = CandleStore(Pair.EUR_USD, candles[5:])
+        store[0:0] = candles[:5]
+        assert list(store) == candles
+        partial = make_candle(candles[-1].time, base="1.20000", complete=False)
+        store[-1:] = [partial]
+        assert store[-1] == partial
+        assert len(store) == 10
+        store[:] = store[2:4]
+        assert list(store) == candles[2:4]
+
+    def test_frames_survive_mutation(self):
+        candles = make_candles(10)
+        store = CandleStore(Pair.EUR_USD, candles)
+        frame = store[-3:]
+        store[-1:] = make_candles(2, start=candles[-1].time)
+        store[0:0] = make_candles(2, start=candles[0].time - 120)
+        assert len(store) == 13
+        assert frame.candles() == candles[-3:]
+
+    def test_small_slices_do_not_pin_columns(self):
+        candles = make_candles(20)
+        store = CandleStore(Pair.EUR_USD, candles)
+        store.COPY_LIMIT = 10
+        small = store[-5:]
+        times = store.times
+        store[-1:] = [make_candle(candles[-1].time, base="1.20000")]
+        assert store.times is times
+        assert small.candles() == candles[-5:]
+        large = store[:]
+        store[-1:] = [candles[-1]]
+        assert store.times is not times
+        assert len(large) == 20
+
+    def test_missing_kinds(self):
+        candle = make_candle(1_590_000_000)
+        mid_only = Candle(None, None, candle.mid, candle.time, True)
+        store = CandleStore(Pair.EUR_USD, [mid_only], kinds=[PriceKind.MID])
+        assert store.kinds == ("mid",)
+        assert store[0] == mid_only
+        assert store[0].high == candle.mid.h
+        assert store[:].kinds == ("mid",)
+
+    def test_to_frame(self):
+        candles = make_candles(10)
+        store = CandleStore(Pair.EUR_USD, candles)
+        frame = to_frame(store, Pair.EUR_USD, ["mid"])
+        assert frame.kinds == ("mid",) and frame.times.obj is store.times
+        assert to_frame(frame, Pair.EUR_USD) is frame
+        mid_only = [Candle(None, None, _.mid, _.time, True) for _ in candles]
+        frame = to_frame(mid_only, Pair.EUR_USD)
+        assert frame.kinds == ("mid",) and frame.candles() == mid_only
@@ -0,0 +1,83 @@
+from time import monotonic
+
+from forex_types import Pair
+
+from oanda_candles import CandleClient, Gran, MarketCalendar
+
+from .helpers import NOW
+from .mock_v20 import MockV20Server, trading
+
+# Friday 18 September 2020 21:00 UTC (5pm in New York).
+CLOSE = 1_600_462_800
+# Friday 18 December 2020 22:00 UTC, New York is on standard time.
+WINTER_CLOSE = 1_608_328_800
+
+
+class TestMarketCalendar:
+    def test_open_and_close(self):
+        calendar = MarketCalendar()
+        assert calendar.is_open(NOW) and calendar.is_open(CLOSE - 1)
+        assert not calendar.is_open(CLOSE)
+        assert calendar.next_close(NOW) == CLOSE
+        assert calendar.last_close(CLOSE) == CLOSE
+        assert calendar.next_open(NOW) == CLOSE + 2 * 86400
+        assert calendar.next_open(CLOSE + 3600) == CLOSE + 2 * 86400
+        assert not calendar.is_open(WINTER_CLOSE)
+        assert calendar.is_open(WINTER_CLOSE - 1)
+        assert not calendar.is_open(WINTER_CLOSE + 2 * 86400 - 1)
+        assert calendar.is_open(WINTER_CLOSE + 2 * 86400)
+
+    def test_candle_count(self):
+        calendar = MarketCalendar()
+        start = NOW - 86400 * 10 + 123
+        for gran in (Gran.M5, Gran.H1):
+            for end in (NOW, NOW + 86400 * 4, CLOSE + 7200):
+                times = range(-(-start // gran.duration) * gran.duration, end, 300)
+                expected = sum(
+                    1 for _ in times if trading(_) and _ % gran.duration == 0
+                )
+                assert calendar.candle_count(start, end, gran) == expected
+        assert calendar.candle_count(CLOSE, CLOSE + 86400, Gran.M5) == 0
+
+
+class TestClosedMarket:
+    def test_no_refresh_while_closed(self):
+        with MockV20Server(CLOSE + 3600) as server:
+            calendar = MarketCalendar(lambda: server.now)
+            client = CandleClient("token", root_url=server.url, calendar=calendar)
+            collector = client.get_collector(Pair.EUR_USD, Gran.M5)
+            collector.grab(100)
+            assert collector.closed_until == CLOSE + 2 * 86400
+            server.now += 86400
+            collector.last_update -= 60
+            collector.grab(100)
+            assert server.requests == 1
+            assert client.scheduler.due(collector) - monotonic() > 82000
+            server.now = CLOSE + 2 * 86400 + 600
+            collector.last_update -= 60
+            assert collector.closed_until is None
+            assert collector.grab(1)[0].time == CLOSE + 2 * 86400 + 600
+            assert server.requests == 2
+
+    def test_candles_spanning_close_not_polled(self):
+        with MockV20Server(CLOSE + 3600) as server:
+            calendar = MarketCalendar(lambda: server.now)
+            client = CandleClient("token", root_url=server.url, calendar=calendar)
+            for gran in (Gran.D, Gran.W):
+                collector = client.get_collector(Pair.EUR_USD, gran)
+                candles = collector.grab(2)
+                # Still incomplete, as the candle spans the close.
+                assert not candles[-1].complete
+                assert collector.closed_until == CLOSE + 2 * 86400
+            requests = server.requests
+            server.now += 86400
+            for collector in client.collectors():
+                collector.last_update -= 60
+                collector.grab(2)
+            assert server.requests == requests
+            server.now = CLOSE + 2 * 86400 + 600
+            for collector in client.collectors():
+                collector.last_update -= 60
+                assert collector.closed_until is None
+                collector.grab(2)
+            assert server.requests == requests + 2
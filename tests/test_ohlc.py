@@ -0,0 +1,50 @@
+from forex_types import Pair, Price
+from time_int import TimeInt
+
+from oanda_candles import Candle, Ohlc
+from oanda_candles.ohlc import NINJA_UNIT, STANDARD_UNIT
+
+
+class TestOhlc:
+    def test_from_fp_round_trip(self):
+        for fp, unit in (
+            ((110203, 110310, 110150, 110299), Pair.EUR_USD.quote.rounder),
+            ((108123, 108200, 108001, 108150), Pair.USD_JPY.quote.rounder),
+        ):
+            ohlc = Ohlc.from_fp(*fp, unit)
+            assert ohlc.to_fp() == fp
+            assert ohlc.unit == unit
+            prices = [Price(_ * unit) for _ in fp]
+            assert [ohlc.o, ohlc.h, ohlc.l, ohlc.c] == prices
+            assert ohlc == Ohlc(*prices)
+            assert Ohlc.from_fp(*ohlc.to_fp(), ohlc.unit) == ohlc
+        assert Pair.EUR_USD.quote.rounder == STANDARD_UNIT
+        assert Pair.USD_JPY.quote.rounder == NINJA_UNIT
+
+    def test_lazy_equality_across_units(self):
+        fp = (108123, 108200, 108001, 108150)
+        standard = Ohlc.from_fp(*fp, STANDARD_UNIT)
+        ninja = Ohlc.from_fp(*fp, NINJA_UNIT)
+        # Same fractional pips are different prices in different units.
+        assert standard != ninja
+        assert ninja == Ohlc(*(Price(_ * NINJA_UNIT) for _ in fp))
+        # Making the Price objects does not change equality.
+        assert str(ninja.c) == "108.150"
+        assert ninja == Ohlc.from_fp(*fp, NINJA_UNIT)
+
+    def test_from_oanda(self):
+        ohlc = Ohlc.from_oanda({"o": "1.1", "h": "1.10203", "l": "1.09", "c": "1.1"})
+        assert ohlc.to_fp() == (110000, 110203, 109000, 110000)
+        # Extra decimal places go through Price, which rounds them.
+        ohlc = Ohlc.from_oanda({"o": "1.100001", "h": "1.1", "l": "1.1", "c": "1.1"})
+        assert ohlc.to_fp() == (110000, 110000, 110000, 110000)
+        assert ohlc.unit == STANDARD_UNIT
+
+    def test_from_tuple_round_trip(self):
+        ask = Ohlc.from_oanda({"o": "108.125", "h": "108.2", "l": "108", "c": "108.15"})
+        candle = Candle(ask, None, ask, TimeInt(1_590_000_000), False)
+        data = candle.to_tuple()
+        assert data[0] == ("108.125", "108.200", "108.000", "108.150")
+        copy = Candle.from_tuple(data)
+        assert copy == candle and copy.bid is None and not copy.complete
+        assert copy.ask.unit == NINJA_UNIT
@@ -0,0 +1,76 @@
+from forex_types import Pair, Price
+
+from oanda_candles import CandleClient, Gran, MarketCalendar, PriceStreamer
+from oanda_candles.candle_scheduler import RefreshScheduler
+
+from .helpers import NOW, wait_for
+from .mock_v20 import MockV20Server
+
+
+class TestPriceStreamer:
+    def test_prices_update_latest_candles(self):
+        with MockV20Server(NOW) as server:
+            calendar = MarketCalendar(lambda: server.now)
+            client = CandleClient("token", root_url=server.url, calendar=calendar)
+            streamer = PriceStreamer(client, "101-001-1-1")
+            minutes = streamer.subscribe(Pair.EUR_USD, Gran.M1)
+            hours = streamer.subscribe(Pair.EUR_USD, Gran.H1)
+            streamer.start()
+            wait_for(lambda: server.streams == 1 and len(minutes) and len(hours))
+            assert minutes.scheduled and server.log[0]["instruments"] == "EUR_USD"
+            requests = server.requests
+            server.tick("EUR_USD", NOW + 30, "1.20001", "1.20011")
+            wait_for(lambda: streamer.prices == 1)
+            candle = minutes.grab(1)[-1]
+            assert candle.time == NOW and not candle.complete
+            assert candle.bid.c == Price("1.20001") and candle.ask.c == Price("1.20011")
+            assert (
+                candle.mid.c == Price("1.20006") and candle.bid.h_fp >= candle.bid.c_fp
+            )
+            assert hours.grab(1)[-1].ask.c == Price("1.20011")
+            assert server.requests == requests
+            server.now = NOW + 60
+            server.tick("EUR_USD", NOW + 61, "1.20002", "1.20012")
+            wait_for(lambda: minutes.grab(1)[-1].time == NOW + 60)
+            assert minutes.grab(2)[0].complete
+            assert server.requests == requests + 1
+            assert server.log[-1]["granularity"] == "M1"
+            assert hours.grab(1)[-1].bid.c == Price("1.20002")
+            streamer.stop(5)
+            assert not streamer.running and not minutes.scheduled
+            wait_for(lambda: server.streams == 0)
+
+    def test_resubscribe(self):
+        with MockV20Server(NOW) as server:
+            client = CandleClient("token", root_url=server.url)
+            streamer = PriceStreamer(client, "101-001-1-1")
+            streamer.subscribe(Pair.EUR_USD, Gran.M5)
+            streamer.start()
+            wait_for(lambda: streamer.connects == 1)
+            yen = streamer.subscribe(Pair.USD_JPY, Gran.M5)
+            wait_for(lambda: streamer.connects == 2)
+            streams = [_["instruments"] for _ in server.log if "instruments" in _]
+            assert streams == ["EUR_USD", "EUR_USD,USD_JPY"]
+            server.tick("USD_JPY", NOW + 10, "108.001", "108.011")
+            wait_for(lambda: streamer.prices == 1)
+            assert yen.grab(1)[-1].bid.c == Price("108.001")
+            streamer.stop(5)
+
+    def test_scheduler_keeps_collector_scheduled(self):
+        with MockV20Server(NOW) as server:
+            client = CandleClient("token", root_url=server.url)
+            streamer = PriceStreamer(client, "101-001-1-1")
+            minutes = streamer.subscribe(Pair.EUR_USD, Gran.M1)
+            scheduler = RefreshScheduler(client)
+            streamer.start()
+            wait_for(lambda: minutes.scheduled)
+            scheduler.start()
+            wait_for(lambda: scheduler in minutes._holders)
+            streamer.stop(5)
+            assert minutes.scheduled
+            streamer.start()
+            wait_for(lambda: streamer.connects == 2)
+            scheduler.stop(5)
+            assert minutes.scheduled
+            streamer.stop(5)
+            assert not minutes.scheduled